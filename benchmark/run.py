@@ -0,0 +1,266 @@
+# coding:utf-8
+"""Benchmark the hot paths of xkeys key rings and certificates
+
+Runs offline: SSH key rings are populated with natively generated keys and
+certificates are issued by the stub mkcert next to this script. Results
+are written as JSON, one record per (operation, size, algo, cache).
+
+    python3 -m benchmark.run --sizes 10 100 1000 --algos ed25519 rsa \
+        --output benchmark.json
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime
+from datetime import timezone
+from json import dumps
+from os import chmod
+from os import environ
+from os.path import abspath
+from os.path import dirname
+from os.path import join
+import platform
+from shutil import copyfile
+from statistics import mean
+from statistics import median
+import sys
+from sys import getsizeof
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from xkeys_attr import __version__
+from xkeys_crt.cert import Certificates
+from xkeys_crt.make import CA
+from xkeys_crt.make import MKCert
+from xkeys_crt.meta import GeneralName
+from xkeys_ssh.pair import SSHKeyPair
+from xkeys_ssh.ring import SSHKeyRing
+
+STUB: str = join(dirname(abspath(__file__)), "mkcert")
+ALGOS: List[str] = ["ed25519", "ecdsa", "rsa"]
+CACHES: List[str] = ["cold", "warm"]
+
+
+class Recorder:
+    """Time operations and collect the results"""
+
+    def __init__(self, repeat: int):
+        self.__results: List[Dict[str, Any]] = []
+        self.__repeat: int = repeat
+
+    @property
+    def results(self) -> List[Dict[str, Any]]:
+        return self.__results
+
+    @property
+    def repeat(self) -> int:
+        return self.__repeat
+
+    def measure(self, operation: str, func: Callable[[int], Any],
+                repeat: Optional[int] = None,
+                setup: Optional[Callable[[int], Any]] = None,
+                **labels: Any) -> Dict[str, Any]:
+        """Call func(i) repeat times, setup(i) is called before untimed"""
+        samples: List[float] = []
+        for i in range(repeat or self.repeat):
+            if setup is not None:
+                setup(i)
+            start: float = perf_counter()
+            func(i)
+            samples.append(perf_counter() - start)
+
+        samples.sort()
+        result: Dict[str, Any] = {
+            "operation": operation, **labels, "repeat": len(samples),
+            "min": samples[0], "median": median(samples),
+            "mean": mean(samples), "max": samples[-1],
+            "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],  # noqa:E501
+            "ops_per_sec": len(samples) / sum(samples) if sum(samples) > 0 else None,  # noqa:E501
+        }
+        self.__results.append(result)
+        sys.stderr.write(f"{operation:<24} {dumps(labels):<56} median {result['median'] * 1000:10.3f} ms\n")  # noqa:E501
+        return result
+
+    def record(self, operation: str, **values: Any) -> Dict[str, Any]:
+        """Add a result which is not a timing, such as memory usage"""
+        self.__results.append(result := {"operation": operation, **values})
+        sys.stderr.write(f"{operation:<24} {dumps(values)}\n")
+        return result
+
+
+def native_pairs(algo: str, count: int) -> Iterator[SSHKeyPair]:
+    """SSH key pairs generated in process, much faster than ssh-keygen"""
+    from cryptography.hazmat.primitives import serialization  # noqa:E501, pylint: disable=C0415
+    from cryptography.hazmat.primitives.asymmetric import ec  # noqa:E501, pylint: disable=C0415
+    from cryptography.hazmat.primitives.asymmetric import ed25519  # noqa:E501, pylint: disable=C0415
+    from cryptography.hazmat.primitives.asymmetric import rsa  # noqa:E501, pylint: disable=C0415
+
+    for index in range(count):
+        if algo == "rsa":
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)  # noqa:E501
+        elif algo == "ecdsa":
+            key = ec.generate_private_key(ec.SECP256R1())
+        else:
+            key = ed25519.Ed25519PrivateKey.generate()
+        private = key.private_bytes(serialization.Encoding.PEM,
+                                    serialization.PrivateFormat.OpenSSH,
+                                    serialization.NoEncryption())
+        public = key.public_key().public_bytes(serialization.Encoding.OpenSSH,
+                                               serialization.PublicFormat.OpenSSH)  # noqa:E501
+        yield SSHKeyPair(private=private.decode(), public=f"{public.decode()} bench-{index}")  # noqa:E501
+
+
+def populate(ring: SSHKeyRing, size: int, pool: List[SSHKeyPair]) -> List[str]:  # noqa:E501
+    """Write size archives into the ring, cycling through the pool"""
+    from os import makedirs  # pylint: disable=C0415
+    names: List[str] = [f"key-{index:06d}" for index in range(size)]
+    for index, name in enumerate(names):
+        makedirs(ring.folder(name), mode=0o700, exist_ok=True)
+        pool[index % len(pool)].archive(ring.join(name))
+    return names
+
+
+def bench_ssh(recorder: Recorder, sizes: List[int], algos: List[str],  # noqa:E501, pylint: disable=R0913,R0914,R0917,W0640
+              caches: List[str], pool_size: int, shard: int) -> None:
+    for algo in algos:
+        sys.stderr.write(f"generating {pool_size + recorder.repeat} {algo} keys\n")  # noqa:E501
+        pairs: List[SSHKeyPair] = list(native_pairs(algo, pool_size + recorder.repeat))  # noqa:E501
+        pool: List[SSHKeyPair] = pairs[:pool_size]
+        fresh: List[SSHKeyPair] = pairs[pool_size:]
+
+        with TemporaryDirectory() as temp:
+            ring = SSHKeyRing(join(temp, "generate"))
+            recorder.measure("ssh.generate", lambda i: ring.generate(algo=algo), algo=algo)  # noqa:E501
+
+        for size in sizes:
+            with TemporaryDirectory() as temp:
+                base: str = join(temp, "ring")
+                names: List[str] = populate(SSHKeyRing(base, shard=shard), size, pool)  # noqa:E501
+                probe: Callable[[int], str] = lambda i: names[(i * 7919) % len(names)]  # noqa:E501,E731
+                labels: Dict[str, Any] = {"size": size, "algo": algo, "shard": shard}  # noqa:E501
+
+                for cache in caches:
+                    ring = SSHKeyRing(base, shard=shard)
+                    rings: Dict[int, SSHKeyRing] = {}
+
+                    def fresh_ring(i: int) -> None:
+                        rings[i] = SSHKeyRing(base, shard=shard) if cache == "cold" else ring  # noqa:E501
+
+                    if cache == "warm":  # scanned, indexed and cached
+                        ring.seek(pool[0].fingerprint)
+                        for name in names:
+                            ring.cache.put(name, ring.load(name))
+
+                    recorder.measure("ssh.len", lambda i: len(rings[i]), setup=fresh_ring, cache=cache, **labels)  # noqa:E501
+                    recorder.measure("ssh.getitem", lambda i: rings[i][probe(i)], setup=fresh_ring, cache=cache, **labels)  # noqa:E501
+                    recorder.measure("ssh.attributes", lambda i: rings[i].attributes(probe(i)), setup=fresh_ring, cache=cache, **labels)  # noqa:E501
+                    recorder.measure("ssh.seek", lambda i: rings[i].seek(pool[i % len(pool)].fingerprint), setup=fresh_ring, cache=cache, **labels)  # noqa:E501
+
+                recorder.measure("ssh.load", lambda i: ring.load(probe(i)), **labels)  # noqa:E501
+                recorder.measure("ssh.load_lazy", lambda i: SSHKeyPair.load(ring.join(probe(i)), lazy=True), **labels)  # noqa:E501
+                recorder.measure("ssh.dump", lambda i: ring.dump(f"fresh-{i}", fresh[i]), **labels)  # noqa:E501
+                recorder.measure("ssh.verify_all", lambda i: ring.verify_all(), repeat=1, **labels)  # noqa:E501
+
+
+def allocated(factory: Callable[[int], Any], count: int) -> float:
+    """Average bytes allocated by each object which is kept alive"""
+    tracemalloc.start()
+    try:
+        start: int = tracemalloc.get_traced_memory()[0]
+        objects: List[Any] = [factory(index) for index in range(count)]
+        return (tracemalloc.get_traced_memory()[0] - start - getsizeof(objects)) / count  # noqa:E501
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(recorder: Recorder, algos: List[str], count: int) -> None:
+    for algo in algos:
+        with TemporaryDirectory() as temp:
+            paths: List[str] = []
+            for index, pair in enumerate(native_pairs(algo, 8)):
+                pair.archive(path := join(temp, f"{index}.tar"))
+                paths.append(path)
+            for compact in (False, True):
+                recorder.record("ssh.memory", algo=algo, compact=compact, objects=count,  # noqa:E501
+                                bytes_per_object=allocated(lambda i: SSHKeyPair.load(paths[i % len(paths)], compact=compact), count))  # noqa:E501
+    recorder.record("crt.memory", objects=count,
+                    bytes_per_object=allocated(lambda i: GeneralName(f"host-{i}.example.com"), count))  # noqa:E501
+
+
+def bench_crt(recorder: Recorder, names: List[str]) -> None:
+    with TemporaryDirectory() as temp:
+        environ["CAROOT"] = join(temp, "caroot")
+        copyfile(STUB, join(temp, "mkcert"))
+        chmod(join(temp, "mkcert"), 0o755)
+        mkcert = MKCert(temp)
+        recorder.measure("crt.rootca", lambda i: MKCert(temp).rootCA, repeat=3)  # noqa:E501
+        recorder.measure("crt.generate", lambda i: mkcert.generate(*names), repeat=5, names=len(names))  # noqa:E501
+        cert: CA = mkcert.generate(*names)
+        recorder.measure("crt.dump", lambda i: cert.dump(join(temp, "certs", f"{i}.tar")), names=len(names))  # noqa:E501
+        recorder.measure("crt.load_cold", lambda i: CA.load(join(temp, "certs", f"{i}.tar")), setup=lambda i: CA.clear_cache(), names=len(names))  # noqa:E501
+        # each file is loaded untimed first, so only cache hits are measured
+        recorder.measure("crt.load", lambda i: CA.load(join(temp, "certs", f"{i}.tar")), setup=lambda i: CA.load(join(temp, "certs", f"{i}.tar")), names=len(names))  # noqa:E501
+        recorder.measure("crt.notAfterDays", lambda i: CA.load(join(temp, "certs", f"{i}.tar")).notAfterDays, names=len(names))  # noqa:E501
+        recorder.measure("crt.general_names", lambda i: CA.load(join(temp, "certs", f"{i}.tar")).general_names, names=len(names))  # noqa:E501
+
+        certs = Certificates(join(temp, "certificates"))
+        copyfile(STUB, join(certs.config.cached_cert, "mkcert"))
+        chmod(join(certs.config.cached_cert, "mkcert"), 0o755)
+        custom = certs.config.lookup_cert("bench")
+        for name in names:
+            custom.lookup(name)
+        custom.dumpf()
+        recorder.measure("crt.read_generate", lambda i: certs.lookup("bench").read(auto_generate=True), repeat=1, names=len(names))  # noqa:E501
+        recorder.measure("crt.read_cached", lambda i: certs.lookup("bench").read(auto_generate=True), names=len(names))  # noqa:E501
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = ArgumentParser(description="Benchmark xkeys key rings and certificates")  # noqa:E501
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],  # noqa:E501
+                        help="ring sizes, such as 10 100 1000 10000 100000")
+    parser.add_argument("--algos", nargs="+", choices=ALGOS, default=["ed25519"])  # noqa:E501
+    parser.add_argument("--caches", nargs="+", choices=CACHES, default=CACHES)  # noqa:E501
+    parser.add_argument("--pool", type=int, default=64,
+                        help="distinct key pairs reused to populate rings")
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--names", nargs="+", default=["localhost", "127.0.0.1", "example.com", "*.example.com"],  # noqa:E501
+                        help="general names of benchmark certificates")
+    parser.add_argument("--objects", type=int, default=10000,
+                        help="objects allocated to measure memory per object")
+    parser.add_argument("--skip", nargs="+", choices=["ssh", "crt", "memory"], default=[])  # noqa:E501
+    parser.add_argument("--output", default="-", help="JSON file, '-' for stdout")  # noqa:E501
+    args = parser.parse_args(argv)
+
+    recorder = Recorder(repeat=args.repeat)
+    if "ssh" not in args.skip:
+        bench_ssh(recorder, args.sizes, args.algos, args.caches, args.pool, args.shard)  # noqa:E501
+    if "crt" not in args.skip:
+        bench_crt(recorder, args.names)
+    if "memory" not in args.skip:
+        bench_memory(recorder, args.algos, args.objects)
+
+    report: Dict[str, Any] = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "arguments": vars(args),
+        "results": recorder.results,
+    }
+    if args.output == "-":
+        print(dumps(report, indent=2))
+    else:
+        with open(args.output, "w", encoding="utf-8") as whdl:
+            whdl.write(f"{dumps(report, indent=2)}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
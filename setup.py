@@ -49,8 +49,9 @@ setup(
                   "Bug Tracker": __urlbugs__,
                   "Documentation": __urldocs__},
     packages=find_packages(
-        include=["xkeys_attr*", "xkeys_crt*", "xkeys_ssh*"],
-        exclude=["xkeys_crt.unittest", "xkeys_ssh.unittest"]
+        include=["xkeys_attr*", "xkeys_crt*", "xkeys_ssh*", "xkeys_util*"],
+        exclude=["xkeys_crt.unittest", "xkeys_ssh.unittest",
+                 "xkeys_util.unittest"]
     ),
     install_requires=all_requirements(),
     cmdclass={
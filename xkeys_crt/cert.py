@@ -1,43 +1,259 @@
 # coding:utf-8
 
+from os import remove
+from os.path import basename
 from os.path import dirname
 from os.path import exists
+from os.path import isdir
 from os.path import isfile
 from os.path import join
+from tarfile import TarError
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Set
+from typing import Tuple
 
+from xkeys_crt.expiry import CertExpiryIndex
 from xkeys_crt.make import CA
 from xkeys_crt.make import MKCert
 from xkeys_crt.make import RootCA
 from xkeys_crt.meta import CertConfig
 from xkeys_crt.meta import CustomCert
 from xkeys_crt.meta import GeneralName
+from xkeys_util.lock import FileLock
+from xkeys_util.metrics import Metrics
+
+
+class CertRenewal(NamedTuple):
+    name: str
+    reason: str  # "valid", "missing", "changed", "expiring", "empty" or "error"  # noqa:E501
+    days: Optional[int]  # remaining validity days, after renewed
+    renewed: bool
+    elapsed: float  # seconds to check, or to renew
+    error: Optional[str] = None
+
+
+class CertRenewalReport(NamedTuple):
+    results: List[CertRenewal]
+    elapsed: float
+    dry_run: bool
+
+    @property
+    def pending(self) -> List[CertRenewal]:
+        """Certificates need to be renewed"""
+        return [i for i in self.results if i.reason in Certificate.RENEW and not i.renewed]  # noqa:E501
+
+    @property
+    def renewed(self) -> List[CertRenewal]:
+        return [i for i in self.results if i.renewed]
+
+    @property
+    def failed(self) -> List[CertRenewal]:
+        return [i for i in self.results if i.error is not None]
 
 
 class Certificate:
+    RENEW: Tuple[str, ...] = ("missing", "changed", "expiring")
+    SHARED: str = "shared"  # folder of certificates by general names hash
+
     def __init__(self, custom: CustomCert, mkcert: MKCert):
         self.__custom: CustomCert = custom
         self.__mkcert: MKCert = mkcert
 
+    @property
+    def custom(self) -> CustomCert:
+        return self.__custom
+
     def lookup(self, name: str) -> GeneralName:
         return self.__custom.lookup(name)
 
     def delete(self, name: str) -> bool:
         return self.__custom.delete(name)
 
+    @property
+    def general_names(self) -> List[str]:
+        """Effective general names, with wildcard and address expansions"""
+        general_names: List[str] = []
+        for gn in self.__custom:
+            general_names.extend(v for v in gn.values if v not in general_names)  # noqa:E501
+        return general_names
+
+    @property
+    def names_hash(self) -> str:
+        """Hash of the configured general names, certificates are shared by it
+
+        Addresses are not resolved, a name to get the address of is hashed
+        by the name, so that changed addresses do not cause a reissue.
+        """
+        names: List[str] = []
+        for gn in self.__custom:
+            names.extend(gn.static_values)
+            if gn.getaddress:
+                names.append(f"getaddress:{CA.canonical_name(gn.name)}")
+        return CA.names_hash(names)
+
+    @Metrics.timed("crt.certificate.read")
     def read(self, auto_generate: bool = False) -> "CA":
-        if len(general_names := [gn.name for gn in self.__custom]) <= 0:
+        if len(self.__custom) <= 0:
             raise ValueError("No general name provided")
 
-        if not exists(cert_file := self.__custom.cached_cert) and auto_generate:  # noqa:E501
-            self.__mkcert.generate(*general_names).dump(cert_file)
+        if not auto_generate:
+            return CA.load(self.__custom.cached_cert)
 
-        if (cert := CA.load(cert_file)).notAfterDays < self.__custom.validity and auto_generate:  # noqa:E501
-            cert = self.__mkcert.generate(*general_names)
-            cert.dump(cert_file, forced=True)
+        reason, cert = self.__check()
+        if reason != "valid" or cert is None:
+            Metrics.count("crt.certificate.regenerate", reason=reason)
+            cert = self.__issue()
 
         return cert
 
+    def check(self) -> Tuple[str, Optional[int]]:
+        """Return the reason to renew and the remaining validity days
+
+        The reason is "missing", "changed" (general names differ from the
+        cached certificate), "expiring", "empty" (no general name) or
+        "valid" if the cached certificate does not need to be renewed.
+        No address is resolved.
+        """
+        if len(self.__custom) <= 0:
+            return "empty", None
+
+        reason, cert = self.__check()
+        return reason, None if cert is None else cert.notAfterDays
+
+    def renew(self) -> CA:
+        """Issue (or reuse the shared) certificate, replace the cached one"""
+        if len(self.__custom) <= 0:
+            raise ValueError("No general name provided")
+
+        return self.__issue()
+
+    def __check(self) -> Tuple[str, Optional[CA]]:
+        if not exists(cert_file := self.__custom.cached_cert):
+            return "missing", None
+
+        if not self.__matches((cert := CA.load(cert_file)).general_names):
+            return "changed", cert
+
+        if cert.notAfterDays < self.__custom.validity:
+            return "expiring", cert
+
+        return "valid", cert
+
+    def __matches(self, general_names: Iterable[str]) -> bool:
+        """Whether the general names are issued for the configured names
+
+        Besides the configured names, only the addresses resolved when it
+        was issued are allowed, at least one if any name gets its address,
+        but no more than those names.
+        """
+        from ipaddress import ip_address  # pylint: disable=C0415
+
+        expected: Set[str] = {CA.canonical_name(v) for gn in self.__custom for v in gn.static_values}  # noqa:E501
+        if not expected <= (actual := {CA.canonical_name(v) for v in general_names}):  # noqa:E501
+            return False
+
+        for name in (resolved := actual - expected):
+            try:
+                ip_address(name)
+            except ValueError:
+                return False
+        getaddress: int = sum(1 for gn in self.__custom if gn.getaddress)
+        return bool(resolved) == bool(getaddress) and len(resolved) <= getaddress  # noqa:E501
+
+    def __issue(self) -> CA:
+        """Get the certificate of the general names from the shared store
+
+        Certificates are shared by the hash of their configured names, and
+        only issued (with the addresses resolved) if there is no valid one.
+        The result is also dumped to the cached certificate of this custom
+        certificate, and the shared certificate it replaces is pruned if no
+        other cached certificate uses it.
+        """
+        shared: str = self.shared_cert(self.__custom.cached_cert, self.names_hash)  # noqa:E501
+        with FileLock(self.shared_lock(shared)):
+            cert: Optional[CA] = CA.load(shared) if exists(shared) else None
+            if cert is None or cert.notAfterDays < self.__custom.validity:
+                Metrics.count("crt.certificate.shared", result="miss")
+                (cert := self.__mkcert.generate(*self.general_names)).dump(shared, forced=True)  # noqa:E501
+            else:
+                Metrics.count("crt.certificate.shared", result="hit")
+            replaced: bool = self.__replace(cert)  # before others can prune
+        if replaced:
+            self.prune_shared(dirname(self.__custom.cached_cert))
+        return cert
+
+    def __replace(self, cert: CA) -> bool:
+        """Dump the cached certificate, return whether another is replaced"""
+        try:
+            replaced: bool = CA.load(cached_cert := self.__custom.cached_cert).crt != cert.crt  # noqa:E501
+        except FileNotFoundError:
+            replaced = False
+        except (OSError, KeyError, TarError, ValueError):
+            replaced = True  # broken, may be shared
+        cert.dump(cached_cert, forced=True)
+        CertExpiryIndex(dirname(cached_cert)).put(basename(cached_cert)[:-4], cert.expiry)  # noqa:E501
+        return replaced
+
+    @classmethod
+    def shared_cert(cls, cached_cert: str, names_hash: str) -> str:
+        """Path of the shared certificate of the general names hash"""
+        return join(dirname(cached_cert), cls.SHARED, f"{names_hash}.tar")
+
+    @classmethod
+    def shared_lock(cls, shared_cert: str) -> str:
+        """Path of the lock file of the shared certificate"""
+        return join(dirname(shared_cert), ".locks", f"{basename(shared_cert)}.lock")  # noqa:E501
+
+    @classmethod
+    def prune_shared(cls, cached: str) -> List[str]:
+        """Remove the shared certificates no cached certificate uses
+
+        cached: The cached certificate folder.
+        Return the paths of the removed shared certificates.
+        """
+        from os import listdir  # pylint: disable=import-outside-toplevel
+
+        if not isdir(folder := join(cached, cls.SHARED)):
+            return []
+
+        removed: List[str] = []
+        used: Set[str] = cls.__cached_crts(cached)
+        for item in sorted(listdir(folder)):
+            if not item.endswith(".tar") or not isfile(shared := join(folder, item)):  # noqa:E501
+                continue
+            if cls.__shared_crt(shared) in used:
+                continue
+            with FileLock(cls.shared_lock(shared)) as lock:
+                # listed again, the shared certificate may be used meanwhile
+                if exists(shared) and cls.__shared_crt(shared) not in cls.__cached_crts(cached):  # noqa:E501
+                    remove(shared)
+                    lock.unlink()
+                    removed.append(shared)
+        return removed
+
+    @classmethod
+    def __cached_crts(cls, cached: str) -> Set[str]:
+        from os import listdir  # pylint: disable=import-outside-toplevel
+
+        crts: Set[str] = set()
+        for item in listdir(cached):
+            if item.endswith(".tar") and isfile(path := join(cached, item)):
+                try:
+                    crts.add(CA.load(path).crt)
+                except (OSError, KeyError, TarError, ValueError):
+                    continue  # broken, uses no shared certificate
+        return crts
+
+    @classmethod
+    def __shared_crt(cls, shared: str) -> Optional[str]:
+        try:
+            return CA.load(shared).crt
+        except (OSError, KeyError, TarError, ValueError):
+            return None  # broken, pruned
+
     def save(self) -> bool:
         return self.__custom.dumpf() is None and isfile(self.__custom.config_file)  # noqa:E501
 
@@ -61,7 +277,60 @@ class Certificates:
         return Certificate(custom=self.config.lookup_cert(name), mkcert=self.__mkcert)  # noqa:E501
 
     def delete(self, name: str) -> bool:
-        return self.config.delete_cert(name)
+        """Delete the custom certificate, and the shared one it has used"""
+        if deleted := self.config.delete_cert(name):
+            Certificate.prune_shared(self.config.cached_cert)
+        return deleted
+
+    def renew_all(self, workers: Optional[int] = None, dry_run: bool = False) -> CertRenewalReport:  # noqa:E501
+        """Renew all missing and expiring custom certificates in a thread pool
+
+        All custom certificates are checked concurrently first, then only the
+        certificates need to be renewed are generated concurrently.
+        workers: The maximum number of threads, default by CPU count.
+        dry_run: Check only, report what would be renewed.
+        """
+        from concurrent.futures import ThreadPoolExecutor  # noqa:E501, pylint: disable=C0415
+        from time import perf_counter  # pylint: disable=C0415
+
+        from xkits_logger import Logger  # pylint: disable=C0415
+
+        start: float = perf_counter()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xkeys-renew") as executor:  # noqa:E501
+            results: List[CertRenewal] = list(executor.map(self.__check, sorted(self.config)))  # noqa:E501
+            if not dry_run and any(i.reason in Certificate.RENEW for i in results):  # noqa:E501
+                # load (or create) the root CA once before issuing concurrently
+                self.__mkcert.issuer  # pylint: disable=W0104
+                results = list(executor.map(self.__renew, results))
+
+        report = CertRenewalReport(results=results, elapsed=perf_counter() - start, dry_run=dry_run)  # noqa:E501
+        summary: str = f"checked {len(results)} certificates, {len(report.pending)} to renew, {len(report.renewed)} renewed, {len(report.failed)} failed, in {report.elapsed:.3f}s"  # noqa:E501
+        (Logger.stderr_red if report.failed else Logger.stderr_green)(summary)
+        return report
+
+    def __check(self, name: str) -> CertRenewal:
+        from time import perf_counter  # pylint: disable=C0415
+
+        start: float = perf_counter()
+        try:
+            reason, days = self.lookup(name).check()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            return CertRenewal(name, "error", None, False, perf_counter() - start, f"failed to check: {error}")  # noqa:E501
+        return CertRenewal(name, reason, days, False, perf_counter() - start)
+
+    def __renew(self, result: CertRenewal) -> CertRenewal:
+        if result.reason not in Certificate.RENEW:
+            return result
+
+        from time import perf_counter  # pylint: disable=C0415
+
+        start: float = perf_counter()
+        try:
+            Metrics.count("crt.certificate.regenerate", reason=result.reason)
+            days: int = self.lookup(result.name).renew().notAfterDays
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            return result._replace(elapsed=perf_counter() - start, error=f"failed to renew: {error}")  # noqa:E501
+        return result._replace(days=days, renewed=True, elapsed=perf_counter() - start)  # noqa:E501
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+# coding:utf-8
+
+from bisect import bisect_left
+from bisect import insort
+from os.path import join
+from time import time
+from typing import Any
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from xkeys_util.journal import JournalIndex
+from xkeys_util.lock import FileLock
+
+
+class CertExpiry(NamedTuple):
+    not_after: float  # POSIX timestamp
+    names: str  # canonical hash of the general names, CA.names_hash()
+    issuer: str  # authority key identifier of the issuing root CA
+
+
+class CertExpiryIndex(JournalIndex):
+    """Persistent name to expiry index of cached certificates
+
+    The index is an append-only journal in the cached certificate folder,
+    each line records a name and its expiry (null means the certificate has
+    been removed). Names are also kept ordered by expiry, to find the
+    expiring certificates by bisection.
+    """
+    FILENAME: str = ".expiry"
+
+    def __init__(self, base: str):
+        self.__order: List[Tuple[float, str]] = []  # (not after, name)
+        super().__init__(base=base, filename=self.FILENAME,
+                         lock=FileLock(join(base, f"{self.FILENAME}.lock")))
+
+    def get(self, name: str) -> Optional[CertExpiry]:
+        return self.value(name)
+
+    def expiring(self, within_days: float, now: Optional[float] = None) -> List[Tuple[str, CertExpiry]]:  # noqa:E501
+        """Certificates expire within days (or have expired), soonest first"""
+        deadline: float = (time() if now is None else now) + within_days * 86400  # noqa:E501
+        return [(name, self.value(name)) for _, name in self.__order[:bisect_left(self.__order, (deadline,))]]  # noqa:E501
+
+    def decode(self, value: Any) -> CertExpiry:
+        return CertExpiry(*value)
+
+    def on_put(self, name: str, value: CertExpiry) -> None:
+        insort(self.__order, (value.not_after, name))
+
+    def on_delete(self, name: str, value: CertExpiry) -> None:
+        del self.__order[bisect_left(self.__order, (value.not_after, name))]
+
+    def on_clear(self) -> None:
+        self.__order.clear()
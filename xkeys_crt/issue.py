@@ -0,0 +1,155 @@
+# coding:utf-8
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from getpass import getuser
+from ipaddress import ip_address
+from os import chmod
+from os import makedirs
+from os.path import join
+import re
+from socket import gethostname
+from typing import List
+from typing import Optional
+from typing import Tuple
+from urllib.parse import urlparse
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import ExtendedKeyUsageOID
+from cryptography.x509.oid import NameOID
+
+
+class CertIssuer():
+    """Issue leaf certificates in process, the same as mkcert does
+
+    The root CA certificate and key are PEM strings, such as RootCA.crt and
+    RootCA.key. Names are classified like mkcert: IP addresses, email
+    addresses, URIs and (wildcard) host names, which are IDNA encoded. Leaf
+    certificates are signed by the root CA key, valid for 825 days.
+    """
+    HOSTNAME = re.compile(r"(?i)^(\*\.)?[0-9a-z_-]([0-9a-z._-]*[0-9a-z_-])?$")  # noqa:E501
+    LIFETIME: timedelta = timedelta(days=825)
+    ROOT_LIFETIME: timedelta = timedelta(days=3650)
+
+    def __init__(self, crt: str, key: str, ecdsa: bool = False):
+        self.__root_crt = x509.load_pem_x509_certificate(crt.encode("utf-8"))  # noqa:E501
+        self.__root_key = serialization.load_pem_private_key(key.encode("utf-8"), password=None)  # noqa:E501
+        self.__ecdsa: bool = ecdsa
+
+    @property
+    def issuer(self) -> x509.Name:
+        return self.__root_crt.subject
+
+    @property
+    def ecdsa(self) -> bool:
+        return self.__ecdsa
+
+    def issue(self, *names: str) -> Tuple[str, str]:
+        """Issue a certificate for the names, return PEM (crt, key)"""
+        if not names:
+            raise ValueError("no names to issue certificate for")
+
+        alt_names: List[x509.GeneralName] = [self.general_name(name) for name in names]  # noqa:E501
+        key = ec.generate_private_key(ec.SECP256R1()) if self.ecdsa else rsa.generate_private_key(public_exponent=65537, key_size=2048)  # noqa:E501
+        extended: List[x509.ObjectIdentifier] = [ExtendedKeyUsageOID.SERVER_AUTH]  # noqa:E501
+        if any(isinstance(name, x509.RFC822Name) for name in alt_names):
+            extended.append(ExtendedKeyUsageOID.EMAIL_PROTECTION)
+
+        now: datetime = datetime.now(timezone.utc)
+        cert = (x509.CertificateBuilder()
+                .subject_name(x509.Name([
+                    x509.NameAttribute(NameOID.ORGANIZATION_NAME, "mkcert development certificate"),  # noqa:E501
+                    x509.NameAttribute(NameOID.ORGANIZATIONAL_UNIT_NAME, self.owner()),  # noqa:E501
+                ]))
+                .issuer_name(self.issuer)
+                .public_key(key.public_key())
+                .serial_number(x509.random_serial_number())
+                .not_valid_before(now)
+                .not_valid_after(now + self.LIFETIME)
+                .add_extension(x509.KeyUsage(digital_signature=True, key_encipherment=not self.ecdsa,  # noqa:E501
+                                             content_commitment=False, data_encipherment=False,  # noqa:E501
+                                             key_agreement=False, key_cert_sign=False, crl_sign=False,  # noqa:E501
+                                             encipher_only=False, decipher_only=False), critical=True)  # noqa:E501
+                .add_extension(x509.ExtendedKeyUsage(extended), critical=False)
+                .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(self.__root_key.public_key()), critical=False)  # noqa:E501
+                .add_extension(x509.SubjectAlternativeName(alt_names), critical=False)  # noqa:E501
+                .sign(self.__root_key, hashes.SHA256()))
+        return cert.public_bytes(serialization.Encoding.PEM).decode("utf-8"), self.private_pem(key)  # noqa:E501
+
+    @classmethod
+    def general_name(cls, name: str) -> x509.GeneralName:
+        """Subject alternative name of a name, the same as mkcert"""
+        try:
+            return x509.IPAddress(ip_address(name))
+        except ValueError:
+            pass
+
+        if "@" in name:
+            return x509.RFC822Name(name)
+
+        if (uri := urlparse(name)).scheme and uri.netloc:
+            return x509.UniformResourceIdentifier(name)
+
+        labels: List[str] = name.split(".")
+        wildcard: bool = labels[0] == "*"
+        try:
+            host: str = ".".join(label.encode("idna").decode("ascii") for label in labels[wildcard:])  # noqa:E501
+        except UnicodeError as error:
+            raise ValueError(f"invalid host name '{name}'") from error
+        if wildcard:
+            host = f"*.{host}"
+        if not cls.HOSTNAME.match(host):
+            raise ValueError(f"invalid host name '{name}'")
+        return x509.DNSName(host)
+
+    @classmethod
+    def owner(cls) -> str:
+        """User and host name, which mkcert puts in the subject"""
+        return f"{getuser()}@{gethostname()}"
+
+    @classmethod
+    def private_pem(cls, key) -> str:
+        return key.private_bytes(serialization.Encoding.PEM,
+                                 serialization.PrivateFormat.PKCS8,
+                                 serialization.NoEncryption()).decode("utf-8")  # noqa:E501
+
+    @classmethod
+    def create_root(cls, caroot: str, owner: Optional[str] = None) -> None:
+        """Create a root CA in caroot the same as mkcert does
+
+        The root CA is not installed into any trust store.
+        """
+        key = rsa.generate_private_key(public_exponent=65537, key_size=3072)
+        name = x509.Name([
+            x509.NameAttribute(NameOID.ORGANIZATION_NAME, "mkcert development CA"),  # noqa:E501
+            x509.NameAttribute(NameOID.ORGANIZATIONAL_UNIT_NAME, owner := owner or cls.owner()),  # noqa:E501
+            x509.NameAttribute(NameOID.COMMON_NAME, f"mkcert {owner}"),
+        ])
+        now: datetime = datetime.now(timezone.utc)
+        cert = (x509.CertificateBuilder()
+                .subject_name(name)
+                .issuer_name(name)
+                .public_key(key.public_key())
+                .serial_number(x509.random_serial_number())
+                .not_valid_before(now)
+                .not_valid_after(now + cls.ROOT_LIFETIME)
+                .add_extension(x509.KeyUsage(digital_signature=False, key_encipherment=False,  # noqa:E501
+                                             content_commitment=False, data_encipherment=False,  # noqa:E501
+                                             key_agreement=False, key_cert_sign=True, crl_sign=False,  # noqa:E501
+                                             encipher_only=False, decipher_only=False), critical=True)  # noqa:E501
+                .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True)  # noqa:E501
+                .add_extension(x509.SubjectKeyIdentifier.from_public_key(key.public_key()), critical=False)  # noqa:E501
+                .sign(key, hashes.SHA256()))
+
+        makedirs(caroot, mode=0o700, exist_ok=True)
+        with open(key_file := join(caroot, "rootCA-key.pem"), "w", encoding="utf-8") as whdl:  # noqa:E501
+            whdl.write(cls.private_pem(key))
+        with open(crt_file := join(caroot, "rootCA.pem"), "w", encoding="utf-8") as whdl:  # noqa:E501
+            whdl.write(cert.public_bytes(serialization.Encoding.PEM).decode("utf-8"))  # noqa:E501
+        chmod(key_file, 0o400)
+        chmod(crt_file, 0o644)
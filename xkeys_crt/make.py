@@ -1,20 +1,48 @@
 # coding:utf-8
 
+from collections import OrderedDict
+from datetime import datetime
+from os import environ
 from os import remove
+from os import stat
+from os.path import abspath
 from os.path import dirname
 from os.path import exists
 from os.path import isfile
 from os.path import join
+from stat import S_ISREG
+import tarfile
+from threading import Lock
+from typing import Any
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from xkeys_crt.expiry import CertExpiry
+from xkeys_util.archive import Archive
+from xkeys_util.metrics import Metrics
+from xkeys_util.runner import Command
 
 
 class CA():
+    CACHE_ENTRIES: int = 256  # loaded certificates, shared by the process
+    __cache: "OrderedDict[Tuple[str, int, int, int], CA]" = OrderedDict()
+    __cache_lock: Lock = Lock()
+
     def __init__(self, cert_file: str, key_file: str):
         with open(cert_file, "r", encoding="utf-8") as rhdl:
-            self.__crt: str = rhdl.read().strip()
+            crt: str = rhdl.read()
         with open(key_file, "r", encoding="utf-8") as rhdl:
-            self.__key: str = rhdl.read().strip()
+            key: str = rhdl.read()
+        self.__setup(crt=crt, key=key)
+
+    def __setup(self, crt: str, key: str) -> None:
+        self.__crt: str = crt.strip()
+        self.__key: str = key.strip()
+        self.__parsed: Dict[str, Any] = {}
         self.__x509 = None
 
     def __str__(self) -> str:
@@ -39,23 +67,57 @@ class CA():
             self.__x509 = x509.load_pem_x509_certificate(self.crt.encode("utf-8"))  # noqa:E501
         return self.__x509
 
+    @property
+    def notAfter(self) -> datetime:
+        """Expiration time in UTC (naive), parsed once"""
+        if "notAfter" not in self.__parsed:
+            self.__parsed["notAfter"] = self.x509.not_valid_after
+        return self.__parsed["notAfter"]
+
     @property
     def notAfterDays(self) -> int:
-        from datetime import datetime  # pylint:disable=C0415
-        return (self.x509.not_valid_after - datetime.now()).days - 1
+        return (self.notAfter - datetime.now()).days - 1
 
     @property
     def subjectAltName(self):
-        from cryptography.x509.extensions import \
-            SubjectAlternativeName  # pylint:disable=C0415
-        return self.x509.extensions.get_extension_for_class(SubjectAlternativeName).value  # noqa:E501
+        if "subjectAltName" not in self.__parsed:
+            from cryptography.x509.extensions import \
+                SubjectAlternativeName  # pylint:disable=C0415
+            self.__parsed["subjectAltName"] = self.x509.extensions.get_extension_for_class(SubjectAlternativeName).value  # noqa:E501
+        return self.__parsed["subjectAltName"]
 
     @property
     def general_names(self) -> List[str]:
-        return [str(name.value) for name in self.subjectAltName]
+        if "general_names" not in self.__parsed:
+            self.__parsed["general_names"] = [str(name.value) for name in self.subjectAltName]  # noqa:E501
+        return list(self.__parsed["general_names"])
+
+    @property
+    def expiry(self) -> CertExpiry:
+        from datetime import timezone  # pylint:disable=C0415
+        return CertExpiry(not_after=self.notAfter.replace(tzinfo=timezone.utc).timestamp(),  # noqa:E501
+                          names=self.names_hash(self.general_names),
+                          issuer=self.authority)
+
+    @property
+    def authority(self) -> str:
+        """Key identifier of the issuer, changes when the root CA is replaced
+
+        Certificates without the extension, such as a root CA itself, are
+        identified by the SHA-256 hash of their issuer name.
+        """
+        from cryptography.x509 import AuthorityKeyIdentifier  # noqa:E501, pylint:disable=C0415
+        from cryptography.x509 import ExtensionNotFound  # noqa:E501, pylint:disable=C0415
+        try:
+            identifier = self.x509.extensions.get_extension_for_class(AuthorityKeyIdentifier).value.key_identifier  # noqa:E501
+        except ExtensionNotFound:
+            identifier = None
+        if identifier is None:
+            from hashlib import sha256  # pylint:disable=C0415
+            return sha256(self.x509.issuer.public_bytes()).hexdigest()
+        return identifier.hex()
 
     def dump(self, path: str, forced: bool = False) -> bool:
-        from os.path import abspath  # pylint:disable=C0415
         path = abspath(path)
 
         from os import makedirs  # pylint:disable=import-outside-toplevel
@@ -66,43 +128,85 @@ class CA():
                 raise FileExistsError(f"cert '{path}' already exists")
             remove(path)
 
-        from tempfile import TemporaryDirectory  # pylint:disable=C0415
-        with TemporaryDirectory() as tmpdir:
-            with open(cert_file := join(tmpdir, "crt.pem"), "w", encoding="utf-8") as whdl:  # noqa:E501
-                whdl.write(f"{self.crt}\n")
+        if exists(temp := f"{path}.tmp"):
+            remove(temp)  # pragma: no cover
 
-            with open(key_file := join(tmpdir, "key.pem"), "w", encoding="utf-8") as whdl:  # noqa:E501
-                whdl.write(f"{self.key}\n")
+        with tarfile.open(temp, "w") as thdl:
+            Archive.addfile(thdl, "crt.pem", f"{self.crt}\n")
+            Archive.addfile(thdl, "key.pem", f"{self.key}\n")
 
-            from os import chmod  # pylint:disable=import-outside-toplevel
-            chmod(cert_file, 0o400)
-            chmod(key_file, 0o400)
+        from os import rename  # pylint:disable=import-outside-toplevel
+        rename(temp, path)
+        return isfile(path)
 
-            if exists(temp := f"{path}.tmp"):
-                remove(temp)  # pragma: no cover
+    @classmethod
+    def from_pem(cls, crt: str, key: str) -> "CA":
+        """Certificate from PEM strings, without files"""
+        ca: CA = cls.__new__(cls)
+        ca.__setup(crt=crt, key=key)
+        return ca
 
-            import tarfile  # pylint:disable=import-outside-toplevel
-            with tarfile.open(temp, "w") as thdl:
-                thdl.add(cert_file, arcname="crt.pem")
-                thdl.add(key_file, arcname="key.pem")
+    @classmethod
+    def names_hash(cls, general_names: Iterable[str]) -> str:
+        """Canonical hash of a set of general names
 
-            from os import rename  # pylint:disable=import-outside-toplevel
-            rename(temp, path)
+        Names are compared as they are issued (host names IDNA encoded),
+        order, duplicates and letter case do not change the hash.
+        """
+        from hashlib import sha256  # pylint:disable=C0415
 
-        return isfile(path)
+        names: Set[str] = {cls.canonical_name(name) for name in general_names}  # noqa:E501
+        return sha256("\n".join(sorted(names)).encode("utf-8")).hexdigest()  # noqa:E501
 
     @classmethod
+    def canonical_name(cls, general_name: str) -> str:
+        """General name as it is issued, in lower case"""
+        from xkeys_crt.issue import CertIssuer  # pylint:disable=C0415
+
+        try:
+            general_name = str(CertIssuer.general_name(general_name).value)
+        except ValueError:
+            pass  # cannot be issued, compared as it is
+        return general_name.lower()
+
+    @classmethod
+    @Metrics.timed("crt.ca.load")
     def load(cls, path: str) -> "CA":
-        if not exists(path) or not isfile(path):
+        """Load certificate from file
+
+        Loaded certificates are kept in a process-wide LRU cache, keyed by
+        the path and the inode, modification time and size of the file.
+        """
+        try:
+            stats = stat(path := abspath(path))
+        except FileNotFoundError:
+            stats = None
+        if stats is None or not S_ISREG(stats.st_mode):
             raise FileNotFoundError(f"cert '{path}' not exists")
 
-        from tempfile import TemporaryDirectory  # pylint:disable=C0415
-        with TemporaryDirectory() as tmpdir:
-            import tarfile  # pylint:disable=import-outside-toplevel
-            with tarfile.open(path, "r") as thdl:
-                thdl.extract("crt.pem", path=tmpdir)
-                thdl.extract("key.pem", path=tmpdir)
-            return cls(cert_file=join(tmpdir, "crt.pem"), key_file=join(tmpdir, "key.pem"))  # noqa:E501
+        key = (path, stats.st_ino, stats.st_mtime_ns, stats.st_size)
+        with cls.__cache_lock:
+            if (ca := cls.__cache.get(key)) is not None and isinstance(ca, cls):  # noqa:E501
+                cls.__cache.move_to_end(key)
+                Metrics.count("crt.ca.cache", result="hit")
+                return ca
+
+        Metrics.count("crt.ca.cache", result="miss")
+        with tarfile.open(path, "r") as thdl:
+            ca = cls.from_pem(crt=Archive.readfile(thdl, "crt.pem"), key=Archive.readfile(thdl, "key.pem"))  # noqa:E501
+
+        with cls.__cache_lock:
+            cls.__cache[key] = ca
+            cls.__cache.move_to_end(key)
+            while len(cls.__cache) > max(cls.CACHE_ENTRIES, 0):
+                cls.__cache.popitem(last=False)
+        return ca
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Forget all loaded certificates"""
+        with cls.__cache_lock:
+            cls.__cache.clear()
 
 
 class RootCA(CA):
@@ -125,6 +229,7 @@ class RootCA(CA):
 class MKCert():
     def __init__(self, base: Optional[str] = None):
         self.__base: str = base or dirname(__file__)
+        self.__issuer = None
         self.__root: Optional[RootCA] = None
 
         from os import makedirs  # pylint:disable=import-outside-toplevel
@@ -144,25 +249,60 @@ class MKCert():
         return path
 
     @property
-    def rootCA(self) -> RootCA:
-        if not self.__root:
-            from os import makedirs  # pylint:disable=import-outside-toplevel
-            from os import popen  # pylint:disable=import-outside-toplevel
-            from os import system  # pylint:disable=import-outside-toplevel
+    def caroot(self) -> str:
+        """Root CA folder of mkcert, resolved without running mkcert"""
+        if caroot := environ.get("CAROOT"):
+            return caroot
+
+        import platform  # pylint:disable=import-outside-toplevel
+        from os.path import expanduser  # pylint:disable=C0415
 
-            if not exists(caroot := popen(f"{self.which} -CAROOT").read().strip()):  # noqa:E501
-                makedirs(caroot)  # pragma: no cover
+        if (os_name := platform.system()) == "Windows":
+            base = environ.get("LOCALAPPDATA", "")  # pragma: no cover
+        elif os_name == "Darwin":
+            base = join(expanduser("~"), "Library", "Application Support")  # noqa:E501, pragma: no cover
+        else:
+            base = environ.get("XDG_DATA_HOME") or join(expanduser("~"), ".local", "share")  # noqa:E501
+        return join(base, "mkcert")
 
+    @property
+    def rootCA(self) -> RootCA:
+        if not self.__root:
             try:
-                root: RootCA = RootCA(caroot)
+                root: RootCA = RootCA(self.caroot)
             except FileNotFoundError:
-                system(f"{self.which} -install")
-                root: RootCA = RootCA(caroot)
-
+                root: RootCA = self.install()
             self.__root = root
         return self.__root
 
+    @property
+    def issuer(self):
+        if not self.__issuer:
+            from xkeys_crt.issue import CertIssuer  # pylint:disable=C0415
+            self.__issuer = CertIssuer(crt=self.rootCA.crt, key=self.rootCA.key)  # noqa:E501
+        return self.__issuer
+
+    def install(self) -> RootCA:
+        """Create the root CA with mkcert, or natively if mkcert is missing
+
+        mkcert is never downloaded here, a root CA created natively is not
+        installed into any trust store.
+        """
+        if not isfile(binary := join(self.__base, "mkcert")):
+            from xkeys_crt.issue import CertIssuer  # pylint:disable=C0415
+            CertIssuer.create_root(self.caroot)
+            return RootCA(self.caroot)
+
+        from os import makedirs  # pylint:disable=import-outside-toplevel
+
+        if not exists(caroot := Command.run(binary, "-CAROOT").check().stdout.strip()):  # noqa:E501
+            makedirs(caroot)  # pragma: no cover
+
+        Command.run(binary, "-install")
+        return RootCA(caroot)
+
     def reset(self) -> bool:
+        self.__issuer = None
         self.__root = None
 
         if isfile(crt_file := self.rootCA.crt_file):
@@ -171,18 +311,15 @@ class MKCert():
         if isfile(key_file := self.rootCA.key_file):
             remove(key_file)
 
+        self.__issuer = None
         self.__root = None
         return not exists(crt_file) and not exists(key_file)
 
+    @Metrics.timed("crt.mkcert.generate")
     def generate(self, *names: str) -> CA:
-        from os import system  # pylint:disable=import-outside-toplevel
-        from tempfile import TemporaryDirectory  # pylint:disable=C0415
-
-        with TemporaryDirectory() as temp:
-            cert_file: str = join(temp, "crt.pem")
-            key_file: str = join(temp, "key.pem")
-            system(f"{self.which} -cert-file {cert_file} -key-file {key_file} {' '.join(names)}")  # noqa:E501
-            return CA(cert_file=cert_file, key_file=key_file)
+        """Issue a certificate signed by the root CA, without running mkcert"""
+        crt, key = self.issuer.issue(*names)
+        return CA.from_pem(crt=crt, key=key)
 
     @classmethod
     def download(cls, file: str) -> None:
@@ -1,11 +1,14 @@
 # coding:utf-8
 
 from os import makedirs
+from os import stat
 from os.path import abspath
 from os.path import dirname
 from os.path import exists
+from os.path import isdir
 from os.path import isfile
 from os.path import join
+from time import time_ns
 from typing import Any
 from typing import Dict
 from typing import Iterator
@@ -13,8 +16,13 @@ from typing import List
 from typing import Optional
 from typing import Tuple
 
+from xkeys_crt.expiry import CertExpiry
+from xkeys_crt.expiry import CertExpiryIndex
+
 
 class GeneralName:
+    __slots__ = ("__subdomains", "__getaddress", "__is_domain", "__name")
+
     def __init__(self, domain_or_address: str, subdomains: bool = False, getaddress: bool = False):  # noqa:E501
         name, is_domain = self.format(domain_or_address)
         self.__subdomains: bool = is_domain and subdomains
@@ -59,10 +67,16 @@ class GeneralName:
         return options
 
     @property
-    def values(self) -> List[str]:
+    def static_values(self) -> List[str]:
+        """Values without resolving the address"""
         values: List[str] = [self.name]
         if self.subdomains:
             values.append(f"*.{self.name}")
+        return values
+
+    @property
+    def values(self) -> List[str]:
+        values: List[str] = self.static_values
         if self.getaddress:
             values.append(self.resolve(self.name))
         return values
@@ -189,6 +203,8 @@ class CertConfig:
         global_name: List = data.get(self.GLOBAL_NAME, [])
         makedirs(custom_cert, mode=0o740, exist_ok=True)
 
+        self.__expiry: CertExpiryIndex = CertExpiryIndex(cached_cert)
+        self.__mtime: int = 0  # of the cached certificate folder
         self.__global_name: List[str] = global_name
         self.__custom_cert: str = custom_cert
         self.__cached_cert: str = cached_cert
@@ -228,6 +244,49 @@ class CertConfig:
     def cached_cert(self) -> str:
         return self.__cached_cert
 
+    @property
+    def expiry(self) -> CertExpiryIndex:
+        """Expiry index of the cached certificates, synchronized
+
+        The index is reconciled with the cached certificate folder whenever
+        the folder is modified, such as certificates written or removed
+        without updating the index.
+        """
+        from xkeys_crt.make import CA  # pylint: disable=C0415
+
+        def fetch(name: str) -> CertExpiry:
+            return CA.load(CustomCert.get_cached_cert(self.cached_cert, name)).expiry  # noqa:E501
+
+        try:
+            mtime: int = stat(self.cached_cert).st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+
+        if not self.__expiry.loaded:
+            self.__expiry.load(names=self.cached_names(), fetch=fetch)
+        elif mtime != self.__mtime:
+            self.__expiry.reconcile(names=self.cached_names(), fetch=fetch)
+        else:
+            self.__expiry.sync()
+        # a folder modified within the timestamp granularity is listed again
+        self.__mtime = mtime if time_ns() - mtime > 1_000_000_000 else 0
+        return self.__expiry
+
+    def cached_names(self) -> Iterator[str]:
+        """Names of the cached certificates"""
+        from os import listdir  # pylint: disable=import-outside-toplevel
+        if isdir(self.cached_cert):
+            for item in listdir(self.cached_cert):
+                if item.endswith(".tar") and isfile(CustomCert.get_cached_cert(self.cached_cert, name := item[:-4])):  # noqa:E501
+                    yield name
+
+    def expiring(self, within_days: float) -> List[Tuple[str, CertExpiry]]:
+        """Cached certificates expire within days, soonest first
+
+        Answered from the expiry index without loading any certificate.
+        """
+        return self.expiry.expiring(within_days)
+
     def lookup_cert(self, name: str) -> CustomCert:
         return CustomCert.loadf(cert=self.cached_cert, conf=self.custom_cert, name=name)  # noqa:E501
 
@@ -235,6 +294,7 @@ class CertConfig:
         from os import remove  # pylint: disable=import-outside-toplevel
         if isfile(cached_cert := CustomCert.get_cached_cert(self.cached_cert, name)):  # noqa:E501
             remove(cached_cert)
+            self.__expiry.delete(name)
         if isfile(config_file := CustomCert.get_config_file(self.custom_cert, name)):  # noqa:E501
             remove(config_file)
         return not exists(cached_cert) and not exists(config_file)
@@ -1,8 +1,11 @@
 # coding:utf-8
 
+from os import listdir
+from os import makedirs
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest import main
+from unittest import mock
 
 from xkeys_crt import cert
 
@@ -61,6 +64,165 @@ class TestCertificates(TestCase):
         self.assertIsInstance(crt.read(auto_generate=True), cert.CA)
         self.assertIsInstance(crt.read(auto_generate=True), cert.CA)
 
+    def test_shared(self):
+        with TemporaryDirectory() as temp:
+            keys = cert.Certificates(temp)
+            first = keys.lookup("first")
+            first.lookup("example.com").subdomains = True
+            first.lookup("127.0.0.1")
+            first.save()
+            second = keys.lookup("second")
+            second.lookup("127.0.0.1")
+            second.lookup("EXAMPLE.com").subdomains = True
+            second.save()
+            self.assertEqual(first.general_names, ["example.com", "*.example.com", "127.0.0.1"])  # noqa:E501
+
+            with mock.patch.object(cert.MKCert, "generate", side_effect=cert.MKCert.generate, autospec=True) as generate:  # noqa:E501
+                self.assertEqual(keys.lookup("first").read(auto_generate=True).general_names, ["example.com", "*.example.com", "127.0.0.1"])  # noqa:E501
+                self.assertEqual(keys.lookup("second").read(auto_generate=True).pem, keys.lookup("first").read().pem)  # noqa:E501
+                self.assertEqual(generate.call_count, 1)
+                self.assertEqual(keys.lookup("second").check()[0], "valid")
+
+                (changed := keys.lookup("second")).lookup("example.org")
+                changed.save()
+                self.assertEqual(keys.lookup("second").check()[0], "changed")
+                self.assertIn("example.org", keys.lookup("second").read(auto_generate=True).general_names)  # noqa:E501
+                self.assertEqual(generate.call_count, 2)
+                self.assertEqual(keys.lookup("first").check()[0], "valid")
+
+                custom = keys.config.lookup_cert("first")
+                custom.validity = 1000
+                custom.dumpf()
+                keys.lookup("first").read(auto_generate=True)
+                self.assertEqual(generate.call_count, 3)
+            self.assertTrue(cert.exists(shared := cert.Certificate.shared_cert(custom.cached_cert, first.names_hash)))  # noqa:E501
+            self.assertEqual(sorted(name for name, _ in keys.config.expiring(3650)), ["first", "second"])  # noqa:E501
+            self.assertFalse(cert.exists(cert.join(cert.dirname(custom.cached_cert), cert.Certificate.SHARED, ".expiry")))  # noqa:E501
+
+            self.assertTrue(keys.delete("second"))
+            self.assertTrue(cert.exists(shared))
+            self.assertEqual(sorted(listdir(cert.dirname(shared))), [".locks", cert.basename(shared)])  # noqa:E501, changed "second" pruned
+            self.assertTrue(keys.delete("first"))
+            self.assertFalse(cert.exists(shared))
+            self.assertFalse(cert.exists(cert.Certificate.shared_lock(shared)))  # noqa:E501
+
+    def test_prune_shared(self):
+        with TemporaryDirectory() as temp:
+            keys = cert.Certificates(temp)
+            self.assertEqual(cert.Certificate.prune_shared(keys.config.cached_cert), [])  # noqa:E501
+            (item := keys.lookup("item")).lookup("a.example.com")
+            item.save()
+            item.read(auto_generate=True)
+            shared = cert.Certificate.shared_cert(item.custom.cached_cert, item.names_hash)  # noqa:E501
+            (item := keys.lookup("item")).lookup("b.example.com")
+            item.save()
+            item.read(auto_generate=True)  # reissued
+            self.assertFalse(cert.exists(shared))
+            self.assertTrue(cert.exists(cert.Certificate.shared_cert(item.custom.cached_cert, item.names_hash)))  # noqa:E501
+
+            with open(broken := cert.join(keys.config.cached_cert, "broken.tar"), "w", encoding="utf-8") as whdl:  # noqa:E501
+                whdl.write("invalid")
+            with open(shared, "w", encoding="utf-8") as whdl:
+                whdl.write("invalid")
+            makedirs(cert.join(cert.dirname(shared), "folder.tar"))
+            self.assertEqual(cert.Certificate.prune_shared(keys.config.cached_cert), [shared])  # noqa:E501
+            (broken_item := keys.lookup("broken")).lookup("a.example.com")
+            broken_item.save()
+            self.assertIsInstance(broken_item.renew(), cert.CA)  # broken replaced
+            self.assertTrue(cert.exists(broken))
+            self.assertEqual(cert.Certificate.prune_shared(keys.config.cached_cert), [])  # noqa:E501
+
+    def test_getaddress(self):
+        with TemporaryDirectory() as temp:
+            keys = cert.Certificates(temp)
+            (item := keys.lookup("item")).lookup("example.com").getaddress = True  # noqa:E501
+            item.save()
+            with mock.patch.object(cert.GeneralName, "resolve", return_value="192.0.2.1") as resolve:  # noqa:E501
+                self.assertRaises(FileNotFoundError, keys.lookup("item").read)
+                self.assertEqual(keys.lookup("item").check()[0], "missing")
+                resolve.assert_not_called()
+                self.assertEqual(keys.lookup("item").read(auto_generate=True).general_names, ["example.com", "192.0.2.1"])  # noqa:E501
+                self.assertEqual(resolve.call_count, 1)
+                names_hash = keys.lookup("item").names_hash
+                resolve.return_value = "192.0.2.2"  # address changed
+                self.assertEqual(keys.lookup("item").names_hash, names_hash)
+                self.assertEqual(keys.lookup("item").check()[0], "valid")
+                self.assertEqual(keys.lookup("item").read(auto_generate=True).general_names, ["example.com", "192.0.2.1"])  # noqa:E501
+                self.assertEqual(keys.lookup("item").read().general_names, ["example.com", "192.0.2.1"])  # noqa:E501
+                self.assertEqual(resolve.call_count, 1)
+
+                (other := keys.lookup("other")).lookup("example.com")
+                other.save()
+                self.assertNotEqual(keys.lookup("other").names_hash, names_hash)  # noqa:E501
+                other.custom.validity = 1000
+                self.assertEqual(other.read(auto_generate=True).general_names, ["example.com"])  # noqa:E501
+                (other := keys.lookup("other")).lookup("example.com").getaddress = True  # noqa:E501
+                other.save()
+                self.assertEqual(keys.lookup("other").check()[0], "changed")  # noqa:E501, address is not configured
+                (other := keys.lookup("other")).lookup("www.example.com")
+                other.save()
+                self.assertEqual(keys.lookup("other").check()[0], "changed")
+                self.assertEqual(keys.lookup("other").read(auto_generate=True).general_names, ["example.com", "192.0.2.2", "www.example.com"])  # noqa:E501
+                (other := keys.lookup("other")).delete("www.example.com")
+                other.save()
+                self.assertEqual(keys.lookup("other").check()[0], "changed")
+                item.delete("example.com")
+                item.lookup("localhost")
+                item.save()
+                self.assertEqual(keys.lookup("item").check()[0], "changed")
+
+    def test_idna(self):
+        self.assertEqual(cert.CA.names_hash(["Bücher.example", "*.bücher.example"]), cert.CA.names_hash(["*.xn--bcher-kva.example", "xn--bcher-kva.example"]))  # noqa:E501
+        self.assertEqual(cert.CA.names_hash(["not a name"]), cert.CA.names_hash(["NOT A NAME"]))  # noqa:E501
+        with TemporaryDirectory() as temp:
+            keys = cert.Certificates(temp)
+            (item := keys.lookup("idna")).lookup("bücher.example")
+            item.save()
+            self.assertEqual(keys.lookup("idna").read(auto_generate=True).general_names, ["xn--bcher-kva.example"])  # noqa:E501
+            self.assertEqual(keys.lookup("idna").check()[0], "valid")
+
+    def test_renew_all(self):
+        with TemporaryDirectory() as temp:
+            keys = cert.Certificates(temp)
+            for name in ("valid", "missing", "expiring"):
+                custom = keys.config.lookup_cert(name)
+                custom.lookup(f"{name}.example.com")
+                custom.validity = 1000 if name == "expiring" else 90
+                custom.dumpf()
+            keys.config.lookup_cert("empty").dumpf()
+            keys.lookup("valid").renew()
+            keys.lookup("expiring").renew()
+            (custom := keys.config.lookup_cert("error")).lookup("error.example.com")  # noqa:E501
+            custom.dumpf()
+            with open(custom.cached_cert, "w", encoding="utf-8") as whdl:
+                whdl.write("invalid")
+
+            report = keys.renew_all(workers=2, dry_run=True)
+            self.assertIsInstance(report, cert.CertRenewalReport)
+            self.assertTrue(report.dry_run)
+            self.assertEqual({i.name: i.reason for i in report.results},
+                             {"valid": "valid", "missing": "missing", "expiring": "expiring",  # noqa:E501
+                              "empty": "empty", "error": "error"})
+            self.assertEqual([i.name for i in report.pending], ["expiring", "missing"])  # noqa:E501
+            self.assertEqual([i.name for i in report.failed], ["error"])
+            self.assertEqual(report.renewed, [])
+            self.assertFalse(cert.exists(keys.config.lookup_cert("missing").cached_cert))  # noqa:E501
+
+            report = keys.renew_all(workers=2)
+            self.assertFalse(report.dry_run)
+            self.assertEqual([i.name for i in report.renewed], ["expiring", "missing"])  # noqa:E501
+            self.assertEqual(report.pending, [])
+            self.assertGreater(report.renewed[0].days, 800)
+            self.assertEqual(keys.lookup("missing").check()[0], "valid")
+            self.assertEqual(keys.lookup("missing").custom.validity, 90)
+            self.assertRaises(ValueError, keys.lookup("empty").renew)
+
+            with mock.patch.object(cert.Certificate, "renew", side_effect=OSError("test")):  # noqa:E501
+                report = keys.renew_all()
+            self.assertEqual([i.name for i in report.failed], ["error", "expiring"])  # noqa:E501
+            self.assertEqual(report.failed[1].error, "failed to renew: test")
+            self.assertEqual([i.name for i in report.pending], ["expiring"])
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,94 @@
+# coding:utf-8
+
+from os import remove
+from os.path import isdir
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from xkeys_crt import expiry
+
+
+def fetch(name: str) -> expiry.CertExpiry:
+    return expiry.CertExpiry(float(len(name)) * 86400, f"names-{name}", "issuer")  # noqa:E501
+
+
+class TestCertExpiryIndex(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_not_exists(self):
+        item = expiry.CertExpiryIndex(join(self.temp.name, "test"))
+        self.assertIsNone(item.load(names=[], fetch=fetch))
+        self.assertIsNone(item.put("demo", fetch("demo")))
+        self.assertEqual(item.get("demo"), fetch("demo"))
+        self.assertFalse(isdir(join(self.temp.name, "test")))
+
+    def test_expiring(self):
+        item = expiry.CertExpiryIndex(self.temp.name)
+        self.assertFalse(item.loaded)
+        item.load(names=["a", "bbb", "cc"], fetch=fetch)
+        self.assertTrue(item.loaded)
+        self.assertEqual(item.expiring(0, now=0), [])
+        self.assertEqual([name for name, _ in item.expiring(2.5, now=0)], ["a", "cc"])  # noqa:E501
+        self.assertEqual(item.expiring(1.5, now=0), [("a", fetch("a"))])
+        item.put("a", fetch("aaaa"))
+        item.put("dd", fetch("dd"))
+        item.delete("cc")
+        item.delete("cc")
+        self.assertNotIn("cc", item)
+        self.assertEqual(sorted(item), ["a", "bbb", "dd"])
+        self.assertEqual([name for name, _ in item.expiring(10, now=0)], ["dd", "bbb", "a"])  # noqa:E501
+        self.assertEqual([name for name, _ in item.expiring(0)], ["dd", "bbb", "a"])  # noqa:E501
+
+    def test_journal(self):
+        item = expiry.CertExpiryIndex(self.temp.name)
+        item.load(names=["a", "b"], fetch=fetch)
+        item.put("c", fetch("c"))
+        item.delete("a")
+        with open(item.path, "a", encoding="utf-8") as whdl:
+            whdl.write("[\"corrupted\"]\n[\"wrong\", [1]]\n[\"broken\", ")
+
+        again = expiry.CertExpiryIndex(self.temp.name)
+        again.load(names=["b", "c", "e"], fetch=fetch)
+        self.assertEqual(sorted(again), ["b", "c", "e"])
+        self.assertEqual(again.get("e"), fetch("e"))
+        with open(again.path, "r", encoding="utf-8") as rhdl:
+            self.assertEqual(len(rhdl.readlines()), 3)
+
+    def test_sync(self):
+        first = expiry.CertExpiryIndex(self.temp.name)
+        self.assertFalse(first.sync())
+        first.load(names=[], fetch=fetch)
+        self.assertFalse(first.sync())
+        second = expiry.CertExpiryIndex(self.temp.name)
+        second.load(names=[], fetch=fetch)
+        second.put("a", fetch("a"))
+        self.assertTrue(first.sync())
+        self.assertEqual(first.get("a"), fetch("a"))
+        self.assertFalse(first.sync())
+        second.put("bb", fetch("bb"))
+        second.delete("a")
+        second.compact()
+        self.assertTrue(first.sync())
+        self.assertEqual(list(first), ["bb"])
+        self.assertEqual(first.expiring(3, now=0), [("bb", fetch("bb"))])
+        remove(first.path)
+        self.assertFalse(first.sync())
+
+
+if __name__ == "__main__":
+    main()
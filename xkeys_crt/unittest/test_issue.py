@@ -0,0 +1,87 @@
+# coding:utf-8
+
+from ipaddress import ip_address
+from os import stat
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from cryptography import x509
+
+from xkeys_crt import issue
+from xkeys_crt import make
+
+
+class TestCertIssuer(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp = TemporaryDirectory()  # pylint: disable=R1732
+        issue.CertIssuer.create_root(cls.temp.name, owner="test@example")
+        cls.root = make.RootCA(cls.temp.name)
+        cls.issuer = issue.CertIssuer(crt=cls.root.crt, key=cls.root.key)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp.cleanup()
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_create_root(self):
+        self.assertEqual(self.root.x509.subject.rfc4514_string(),
+                         "CN=mkcert test@example,OU=test@example,O=mkcert development CA")  # noqa:E501
+        self.assertTrue(self.root.x509.extensions.get_extension_for_class(x509.BasicConstraints).value.ca)  # noqa:E501
+        self.assertEqual(stat(self.root.key_file).st_mode & 0o777, 0o400)  # noqa:E501
+
+    def test_general_name(self):
+        self.assertEqual(issue.CertIssuer.general_name("127.0.0.1"), x509.IPAddress(ip_address("127.0.0.1")))  # noqa:E501
+        self.assertEqual(issue.CertIssuer.general_name("::1"), x509.IPAddress(ip_address("::1")))  # noqa:E501
+        self.assertEqual(issue.CertIssuer.general_name("a@example.com"), x509.RFC822Name("a@example.com"))  # noqa:E501
+        self.assertEqual(issue.CertIssuer.general_name("https://example.com/"), x509.UniformResourceIdentifier("https://example.com/"))  # noqa:E501
+        self.assertEqual(issue.CertIssuer.general_name("*.example.com"), x509.DNSName("*.example.com"))  # noqa:E501
+        self.assertEqual(issue.CertIssuer.general_name("bücher.example"), x509.DNSName("xn--bcher-kva.example"))  # noqa:E501
+        self.assertRaises(ValueError, issue.CertIssuer.general_name, "a b")
+        self.assertRaises(ValueError, issue.CertIssuer.general_name, f"{'a' * 64}.example.com")  # noqa:E501
+        self.assertRaises(ValueError, issue.CertIssuer.general_name, "a.*.b")  # noqa:E501
+
+    def test_issue(self):
+        self.assertRaises(ValueError, self.issuer.issue)
+        crt, key = self.issuer.issue("example.com", "*.example.com", "localhost", "127.0.0.1", "a@example.com")  # noqa:E501
+        cert = make.CA.from_pem(crt=crt, key=key)
+        self.assertEqual(cert.general_names, ["example.com", "*.example.com", "localhost", "127.0.0.1", "a@example.com"])  # noqa:E501
+        self.assertEqual(cert.x509.issuer, self.root.x509.subject)
+        cert.x509.verify_directly_issued_by(self.root.x509)
+        self.assertIn("BEGIN PRIVATE KEY", cert.key)
+        self.assertGreaterEqual(cert.notAfterDays, 822)
+        usages = cert.x509.extensions.get_extension_for_class(x509.ExtendedKeyUsage).value  # noqa:E501
+        self.assertEqual(len(list(usages)), 2)
+
+    def test_authority(self):
+        with TemporaryDirectory() as tmpdir:
+            issue.CertIssuer.create_root(tmpdir, owner="test@example")
+            other = make.RootCA(tmpdir)  # replaced, with the same subject
+            self.assertEqual(other.x509.subject, self.root.x509.subject)
+            self.assertEqual(other.authority, self.root.authority)  # no AKI
+            first = make.CA.from_pem(*self.issuer.issue("localhost"))
+            second = make.CA.from_pem(*issue.CertIssuer(crt=other.crt, key=other.key).issue("localhost"))  # noqa:E501
+            self.assertEqual(first.expiry.issuer, make.CA.from_pem(*self.issuer.issue("example.com")).authority)  # noqa:E501
+            self.assertNotEqual(first.expiry.issuer, second.expiry.issuer)
+
+    def test_ecdsa(self):
+        issuer = issue.CertIssuer(crt=self.root.crt, key=self.root.key, ecdsa=True)  # noqa:E501
+        self.assertTrue(issuer.ecdsa)
+        crt, key = issuer.issue("localhost")
+        cert = make.CA.from_pem(crt=crt, key=key)
+        self.assertEqual(cert.general_names, ["localhost"])
+        self.assertFalse(cert.x509.extensions.get_extension_for_class(x509.KeyUsage).value.key_encipherment)  # noqa:E501
+        with TemporaryDirectory() as tmpdir:
+            cert.dump(path := make.join(tmpdir, "localhost"))
+            self.assertEqual(make.CA.load(path).pem, cert.pem)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 # coding:utf-8
 
+from os import chmod
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest import main
 from unittest import mock
 
 from xkeys_crt import make
+from xkeys_util.metrics import Metrics
+from xkeys_util.metrics import MetricsCollector
 
 
 class TestCertificate(TestCase):
@@ -61,8 +64,28 @@ class TestMKCert(TestCase):
             mock_download.side_effect = [Exception("download failed")]
             self.assertRaises(FileNotFoundError, which)
 
+    def test_install(self):
+        with TemporaryDirectory() as tmpdir, mock.patch.dict(make.environ, {"CAROOT": make.join(tmpdir, "caroot")}):  # noqa:E501
+            mkcert = make.MKCert(base=tmpdir)
+            with mock.patch.object(mkcert, "download", side_effect=AssertionError("download")):  # noqa:E501
+                self.assertIsInstance(root := mkcert.install(), make.RootCA)
+            self.assertEqual(root.crt_file, make.join(mkcert.caroot, "rootCA.pem"))  # noqa:E501
+            with open(binary := make.join(tmpdir, "mkcert"), "w", encoding="utf-8") as whdl:  # noqa:E501
+                whdl.write(f"#!/bin/sh\n[ \"$1\" = -CAROOT ] && echo {mkcert.caroot}\nexit 0\n")  # noqa:E501
+            chmod(binary, 0o755)
+            self.assertEqual(mkcert.which, binary)
+            self.assertEqual(mkcert.install().crt, root.crt)
+
+    def test_caroot(self):
+        with mock.patch.dict(make.environ, {"CAROOT": "/tmp/caroot"}):
+            self.assertEqual(self.mkcert.caroot, "/tmp/caroot")
+        with mock.patch.dict(make.environ, {"CAROOT": "", "XDG_DATA_HOME": "/tmp/data"}):  # noqa:E501
+            self.assertEqual(self.mkcert.caroot, make.join("/tmp/data", "mkcert"))  # noqa:E501
+
     def test_rootCA(self):
         self.assertIsInstance(root := self.mkcert.rootCA, make.RootCA)
+        self.assertEqual(make.CA(root.crt_file, root.key_file).pem, root.pem)  # noqa:E501
+        self.assertEqual(make.CA.from_pem(crt=f"{root.crt}\n", key=root.key).pem, root.pem)  # noqa:E501
         self.assertEqual(str(root), f"CA(expire after {root.notAfterDays} days)")  # noqa:E501
 
     def test_generate(self):
@@ -77,6 +100,32 @@ class TestMKCert(TestCase):
             self.assertRaises(FileExistsError, cert.dump, path=path)
             self.assertIsInstance(make.CA.load(path), make.CA)
 
+    def test_cache(self):
+        collector = MetricsCollector()
+        Metrics.register(collector)
+        self.addCleanup(Metrics.unregister, collector)
+        make.CA.clear_cache()
+        cert = self.mkcert.generate("example.com", "127.0.0.1")
+        with TemporaryDirectory() as tmpdir:
+            cert.dump(path := make.join(tmpdir, "a.tar"))
+            self.assertIs(load := make.CA.load(path), make.CA.load(make.join(tmpdir, ".", "a.tar")))  # noqa:E501
+            self.assertEqual(collector.counter("crt.ca.cache", result="miss"), 1)  # noqa:E501
+            self.assertEqual(collector.counter("crt.ca.cache", result="hit"), 1)  # noqa:E501
+            self.assertEqual(load.general_names, ["example.com", "127.0.0.1"])
+            self.assertIs(load.subjectAltName, load.subjectAltName)
+            self.assertEqual(load.notAfter, cert.notAfter)
+            self.assertEqual(load.pem, cert.pem)
+
+            self.mkcert.generate("example.org").dump(path, forced=True)
+            self.assertEqual(make.CA.load(path).general_names, ["example.org"])  # noqa:E501
+            cert.dump(other := make.join(tmpdir, "b.tar"))
+            with mock.patch.object(make.CA, "CACHE_ENTRIES", 1):
+                self.assertIsNot(make.CA.load(other), make.CA.load(path))
+                self.assertIs(make.CA.load(path), make.CA.load(path))
+            self.assertEqual(collector.counter("crt.ca.cache", result="miss"), 4)  # noqa:E501
+            make.CA.clear_cache()
+            self.assertIsNot(make.CA.load(path), load)
+
     @mock.patch("urllib.request.urlretrieve", mock.MagicMock())
     def test_download(self):
         with TemporaryDirectory() as tmpdir:
@@ -1,8 +1,10 @@
 # coding:utf-8
 
+from os import remove
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest import main
+from unittest import mock
 
 from xkeys_crt import meta
 
@@ -31,6 +33,7 @@ class TestGeneralName(TestCase):
     def test_load(self):
         self.assertIsInstance(gn := meta.GeneralName.load(self.options), meta.GeneralName)  # noqa:E501
         self.assertEqual(str(gn), f"GeneralName({gn.name})")
+        self.assertFalse(hasattr(gn, "__dict__"))
         self.assertEqual(gn.name, self.generalname)
         self.assertEqual(gn.options, self.options)
         self.assertEqual(len(gn.values), 1)
@@ -112,6 +115,39 @@ class TestCertConfig(TestCase):
         del self.cert["example"]
         self.assertNotIn("example", self.cert)
 
+    def test_expiring(self):
+        from xkeys_crt.make import MKCert  # pylint: disable=C0415
+        mkcert = MKCert(self.cert.cached_cert)
+        self.assertEqual(self.cert.expiring(3650), [])
+        (item := mkcert.generate("a.example.com")).dump(meta.CustomCert.get_cached_cert(self.cert.cached_cert, "a"))  # noqa:E501
+        self.assertEqual([name for name, _ in self.cert.expiring(3650)], ["a"])  # noqa:E501, not indexed by dump()
+        self.assertEqual(self.cert.expiry.get("a"), item.expiry)
+        self.assertEqual(self.cert.expiring(30), [])
+        self.assertTrue(self.cert.expiry.loaded)
+
+        other = meta.CertConfig.loadf(self.path)
+        mkcert.generate("b.example.com").dump(other["b"].cached_cert)
+        mkcert.generate("c.example.com").dump(meta.join(self.cert.cached_cert, "c"))  # noqa:E501
+        self.assertEqual(sorted(name for name, _ in other.expiring(3650)), ["a", "b"])  # noqa:E501
+        self.assertEqual(sorted(name for name, _ in self.cert.expiring(3650)), ["a", "b"])  # noqa:E501
+        self.assertEqual(self.cert.expiry.get("a").names, mkcert.generate("a.example.com").expiry.names)  # noqa:E501
+        self.assertTrue(other.delete_cert("a"))
+        self.assertEqual([name for name, _ in self.cert.expiring(3650)], ["b"])  # noqa:E501
+        remove(other["b"].cached_cert)
+        self.assertEqual(self.cert.expiring(3650), [])  # removed by hand
+        self.assertEqual(list(meta.CertConfig.loadf(self.path).expiry), [])
+        with mock.patch.object(meta, "time_ns", return_value=meta.stat(self.cert.cached_cert).st_mtime_ns + 2_000_000_000):  # noqa:E501
+            self.assertEqual(self.cert.expiring(3650), [])
+            with mock.patch.object(self.cert.expiry, "reconcile") as reconcile:  # noqa:E501
+                self.assertEqual(self.cert.expiring(3650), [])
+                reconcile.assert_not_called()
+
+    def test_expiring_without_cached(self):
+        with TemporaryDirectory() as temp:
+            cert = meta.CertConfig.loadf(meta.join(temp, meta.CertConfig.DEFAULT_CONFIG))  # noqa:E501
+            self.assertEqual(cert.expiring(3650), [])
+            self.assertEqual(cert.expiring(3650), [])
+
 
 if __name__ == "__main__":
     main()
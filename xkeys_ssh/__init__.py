@@ -1,5 +1,11 @@
 # coding:utf-8
 
+from xkeys_ssh.aio import AsyncSSHKeyRing  # noqa:F401
+from xkeys_ssh.backend import SSHKeyBackend  # noqa:F401
+from xkeys_ssh.cache import SSHKeyCache  # noqa:F401
+from xkeys_ssh.export import SSHKeyExporter  # noqa:F401
 from xkeys_ssh.pair import SSHKeyAlgo  # noqa:F401
 from xkeys_ssh.pair import SSHKeyPair  # noqa:F401
 from xkeys_ssh.ring import SSHKeyRing  # noqa:F401
+from xkeys_ssh.store import SSHKeyStore  # noqa:F401
+from xkeys_ssh.watch import SSHKeyWatcher  # noqa:F401
@@ -0,0 +1,121 @@
+# coding:utf-8
+
+from asyncio import Semaphore
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+from uuid import uuid4
+
+from xkeys_ssh.pair import SSHKeyAlgo
+from xkeys_ssh.pair import SSHKeyAttr
+from xkeys_ssh.pair import SSHKeyPair
+from xkeys_ssh.ring import SSHKeyRing
+
+RT = TypeVar("RT")
+
+
+class AsyncSSHKeyRing:
+    """Asyncio wrapper of SSH key ring
+
+    File I/O is offloaded to a thread pool, mutations of different names
+    run in parallel under the file locks of the ring.
+    concurrency: The maximum number of ssh-keygen processes and I/O threads.
+    """
+
+    def __init__(self, ring: SSHKeyRing, concurrency: int = 4):
+        if concurrency < 1:
+            raise ValueError(f"invalid concurrency: {concurrency}")
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="xkeys-aio")  # noqa:E501
+        self.__semaphore: Optional[Semaphore] = None
+        self.__concurrency: int = concurrency
+        self.__ring: SSHKeyRing = ring
+
+    async def __aenter__(self) -> "AsyncSSHKeyRing":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def ring(self) -> SSHKeyRing:
+        return self.__ring
+
+    @property
+    def concurrency(self) -> int:
+        return self.__concurrency
+
+    @property
+    def semaphore(self) -> Semaphore:
+        """Limit concurrent ssh-keygen processes (created in event loop)"""
+        if self.__semaphore is None:
+            self.__semaphore = Semaphore(self.concurrency)
+        return self.__semaphore
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=True)
+
+    async def run(self, func: Callable[..., RT], *args: Any, **kwargs: Any) -> RT:  # noqa:E501
+        """Run a blocking function in the thread pool"""
+        return await get_running_loop().run_in_executor(self.__executor, partial(func, *args, **kwargs))  # noqa:E501
+
+    async def names(self) -> List[str]:
+        return await self.run(lambda: list(self.ring))
+
+    async def length(self) -> int:
+        return await self.run(self.ring.__len__)
+
+    async def contains(self, name: str) -> bool:
+        return await self.run(self.ring.__contains__, name)
+
+    async def get(self, name: str) -> SSHKeyPair:
+        return await self.run(self.ring.__getitem__, name)
+
+    async def load(self, name: str) -> SSHKeyPair:
+        return await self.run(self.ring.load, name)
+
+    async def attributes(self, name: str) -> SSHKeyAttr:
+        return await self.run(self.ring.attributes, name)
+
+    async def inventory(self) -> List[Tuple[str, SSHKeyAttr]]:
+        return await self.run(lambda: list(self.ring.inventory()))
+
+    async def seek(self, fingerprint: str) -> Optional[str]:
+        return await self.run(self.ring.seek, fingerprint)
+
+    async def dump(self, name: str, pair: SSHKeyPair) -> SSHKeyPair:
+        return await self.run(self.ring.dump, name, pair)
+
+    async def remove(self, name: str) -> bool:
+        return await self.run(self.ring.remove, name)
+
+    async def rename(self, origin: str, target: str) -> bool:
+        return await self.run(self.ring.rename, origin, target)
+
+    async def update(self, name: str, private: str) -> None:
+        return await self.run(self.ring.update, name, private)
+
+    async def create(self, private: str, name: Optional[str] = None) -> str:
+        return await self.run(self.ring.create, private, name)
+
+    async def generate(self,  # pylint: disable=R0913,R0917
+                       algo: SSHKeyAlgo = "rsa",
+                       bits: Optional[int] = None,
+                       name: Optional[str] = None,
+                       comment: Optional[str] = None,
+                       passphrase: Optional[str] = None
+                       ) -> str:
+        index: str = name or comment or str(uuid4())
+        if self.ring.reservoir is not None and not comment and not passphrase:
+            async with self.semaphore:  # claim or generate
+                return await self.run(self.ring.generate, algo=algo, bits=bits, name=index)  # noqa:E501
+
+        async with self.semaphore:
+            value = await SSHKeyPair.agenerate(algo=algo, bits=bits, comment=comment, passphrase=passphrase)  # noqa:E501
+        await self.dump(name=index, pair=value)
+        return index
@@ -0,0 +1,219 @@
+# coding:utf-8
+
+from abc import ABC
+from abc import abstractmethod
+from tarfile import TarError
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from uuid import uuid4
+
+from xkits_lib.cache import CacheMiss
+
+from xkeys_ssh.cache import SSHKeyCache
+from xkeys_ssh.pair import SSHKeyAlgo
+from xkeys_ssh.pair import SSHKeyAttr
+from xkeys_ssh.pair import SSHKeyPair
+from xkeys_util.metrics import Metrics
+
+
+class SSHKeyBackend(ABC):
+    """Storage of named SSH key pairs, such as SSHKeyRing and SSHKeyStore
+
+    Backends implement how key pairs are stored, looked up and mutated.
+    Caching, validation, generation and import are shared by all backends.
+    """
+
+    def __init__(self, cache: Optional[SSHKeyCache] = None,
+                 compact: bool = False):
+        self.__cache: SSHKeyCache = cache if cache is not None else SSHKeyCache()  # noqa:E501
+        self.__compact: bool = compact
+
+    @property
+    def cache(self) -> SSHKeyCache:
+        return self.__cache
+
+    @property
+    def compact(self) -> bool:
+        return self.__compact
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of SSH key pairs"""
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[str]:
+        """Names of SSH key pairs"""
+
+    @abstractmethod
+    def __contains__(self, name: str) -> bool:
+        """Whether the SSH key pair exists"""
+
+    def __getitem__(self, name: str) -> SSHKeyPair:
+        try:
+            pair: SSHKeyPair = self.cache.get(name)
+        except CacheMiss:
+            Metrics.count("ssh.ring.cache", result="miss")
+            self.cache.put(name, pair := self.load(name))
+            return pair
+        Metrics.count("ssh.ring.cache", result="hit")
+        return pair
+
+    def __delitem__(self, name: str):
+        self.remove(name)
+
+    @abstractmethod
+    def seek(self, fingerprint: str) -> Optional[str]:
+        """Name of SSH key pair with the fingerprint"""
+
+    @abstractmethod
+    def dump(self, name: str, pair: SSHKeyPair) -> SSHKeyPair:
+        """Store a new SSH key pair, the name and fingerprint are unique"""
+
+    @abstractmethod
+    def load(self, name: str) -> SSHKeyPair:
+        """Read SSH key pair without the cache"""
+
+    @abstractmethod
+    def attributes(self, name: str) -> SSHKeyAttr:
+        """Attributes of SSH key pair without loading the private key"""
+
+    @abstractmethod
+    def public(self, name: str) -> str:
+        """Public key of SSH key pair without loading the private key"""
+
+    @abstractmethod
+    def stamp(self, name: str) -> str:
+        """Changes whenever the SSH key pair is replaced"""
+
+    @abstractmethod
+    def remove(self, name: str) -> bool:
+        """Remove SSH key pair, return whether it is gone"""
+
+    @abstractmethod
+    def rename(self, origin: str, target: str) -> bool:
+        """Rename SSH key pair, return whether it is renamed"""
+
+    @abstractmethod
+    def update(self, name: str, private: str) -> None:
+        """Replace the private key of SSH key pair"""
+
+    def verify_all(self) -> Dict[str, bool]:
+        """Check the stored attributes of all SSH key pairs
+
+        All public keys are fingerprinted in one batch, return whether the
+        attributes of each SSH key pair match its public key.
+        """
+        results: Dict[str, bool] = {}
+        stored: Dict[str, Tuple[SSHKeyAttr, str]] = {}
+        for name in self:
+            try:
+                stored[name] = (self.attributes(name), self.public(name))
+            except (OSError, KeyError, TarError, ValueError):
+                results[name] = False  # broken file
+
+        extracted = SSHKeyPair.extract_many(public for _, public in stored.values())  # noqa:E501
+        for (name, (attributes, _)), actual in zip(stored.items(), extracted):
+            results[name] = actual == attributes
+        return results
+
+    def audit(self, workers: Optional[int] = None) -> Iterator[Tuple[str, bool, str]]:  # noqa:E501
+        """Load and validate all SSH key pairs in a thread pool
+
+        Yield (name, ok, reason) as soon as each check completes, and print
+        a summary with the throughput to stderr when all are done.
+        workers: The maximum number of threads, default by CPU count.
+        """
+        from concurrent.futures import ThreadPoolExecutor  # noqa:E501, pylint: disable=C0415
+        from concurrent.futures import as_completed  # pylint: disable=C0415
+        from time import perf_counter  # pylint: disable=C0415
+
+        from xkits_logger import Logger  # pylint: disable=C0415
+
+        start: float = perf_counter()
+        total: int = 0
+        failed: int = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xkeys-audit") as executor:  # noqa:E501
+            for future in as_completed([executor.submit(self.check, name) for name in self]):  # noqa:E501
+                total += 1
+                failed += 0 if (result := future.result())[1] else 1
+                yield result
+
+        elapsed: float = perf_counter() - start
+        summary: str = f"audited {total} SSH key pairs, {failed} failed, in {elapsed:.3f}s ({total / elapsed:.1f} keys/s)"  # noqa:E501
+        (Logger.stderr_red if failed else Logger.stderr_green)(summary)
+
+    def check(self, name: str) -> Tuple[str, bool, str]:
+        """Validate SSH key pair, return (name, ok, reason)"""
+        try:
+            pair: SSHKeyPair = self.load(name)
+            if not pair.public_is_valid:
+                return name, False, "public key does not match private key"
+            if not pair.attributes_is_valid:
+                return name, False, "attributes do not match public key"
+        except (OSError, KeyError, TarError, ValueError) as error:
+            return name, False, f"failed to load: {error}"
+        return name, True, ""
+
+    def inventory(self) -> Iterator[Tuple[str, SSHKeyAttr]]:
+        """Iterate over the names and attributes of all SSH key pairs"""
+        for name in self:
+            yield name, self.attributes(name)
+
+    def create(self, private: str, name: Optional[str] = None) -> str:
+        if not (value := SSHKeyPair(private=private)):
+            raise ValueError("invalid private key")  # pragma: no cover
+
+        index: str = name or value.comment or str(uuid4())
+        self.dump(name=index, pair=value)
+        return index
+
+    def generate(self,  # pylint: disable=R0913,R0917
+                 algo: SSHKeyAlgo = "rsa",
+                 bits: Optional[int] = None,
+                 name: Optional[str] = None,
+                 comment: Optional[str] = None,
+                 passphrase: Optional[str] = None
+                 ) -> str:
+        index = name or comment or str(uuid4())
+        value = SSHKeyPair.generate(algo=algo, bits=bits, comment=comment, passphrase=passphrase)  # noqa:E501
+        self.dump(name=index, pair=value)
+        return index
+
+    def generate_many(self, specs: Iterable[Dict[str, Any]],
+                      workers: Optional[int] = None
+                      ) -> Dict[str, Union[SSHKeyPair, Exception]]:
+        """Generate SSH key pairs in a process pool
+
+        specs: Keyword arguments of each generate() call, such as algo,
+        bits, name, comment and passphrase.
+        workers: The maximum number of processes, default by CPU count.
+
+        Return the SSH key pair or the exception of each name, one failure
+        does not abort the others.
+        """
+        from concurrent.futures import Future  # pylint: disable=C0415
+        from concurrent.futures import ProcessPoolExecutor  # noqa:E501, pylint: disable=C0415
+
+        tasks: Dict[str, Dict[str, Any]] = {}
+        for spec in specs:
+            options: Dict[str, Any] = dict(spec)
+            index = options.pop("name", None) or options.get("comment") or str(uuid4())  # noqa:E501
+            if index in tasks:
+                raise ValueError(f"duplicate SSH key pair name '{index}'")
+            tasks[index] = options
+
+        results: Dict[str, Union[SSHKeyPair, Exception]] = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures: Dict[str, Future] = {index: executor.submit(SSHKeyPair.generate, **options)  # noqa:E501
+                                          for index, options in tasks.items()}
+            for index, future in futures.items():
+                try:
+                    results[index] = self.dump(name=index, pair=future.result())  # noqa:E501
+                except Exception as error:  # pylint: disable=broad-exception-caught  # noqa:E501
+                    results[index] = error
+        return results
@@ -0,0 +1,122 @@
+# coding:utf-8
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Dict
+from typing import Iterator
+from typing import Tuple
+
+from xkits_lib.cache import CacheMiss
+
+from xkeys_ssh.pair import SSHKeyPair
+
+
+class SSHKeyCache:  # pylint: disable=R0902
+    """Bounded LRU cache of SSH key pairs
+
+    entries: The maximum number of key pairs, 0 means unlimited.
+    size: The maximum bytes of key material, 0 means unlimited.
+    lifetime: Seconds before a key pair expires, 0 means never.
+    """
+
+    def __init__(self, entries: int = 0, size: int = 0, lifetime: float = 0):
+        self.__pool: OrderedDict[str, Tuple[SSHKeyPair, int, float]] = OrderedDict()  # noqa:E501
+        self.__lifetime: float = float(lifetime)
+        self.__entries: int = entries
+        self.__size: int = size
+        self.__lock: Lock = Lock()
+        self.__expirations: int = 0
+        self.__evictions: int = 0
+        self.__misses: int = 0
+        self.__bytes: int = 0
+        self.__hits: int = 0
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__pool)
+
+    def __iter__(self) -> Iterator[str]:
+        with self.__lock:
+            return iter(list(self.__pool))
+
+    def __contains__(self, name: str) -> bool:
+        with self.__lock:
+            if (item := self.__pool.get(name)) is None:
+                return False
+            if self.__expired(item):
+                self.__pop(name)
+                self.__expirations += 1
+                return False
+            return True
+
+    @property
+    def entries(self) -> int:
+        return self.__entries
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def lifetime(self) -> float:
+        return self.__lifetime
+
+    @property
+    def bytes(self) -> int:
+        return self.__bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {"hits": self.__hits, "misses": self.__misses,
+                    "evictions": self.__evictions,
+                    "expirations": self.__expirations,
+                    "entries": len(self.__pool), "bytes": self.__bytes}
+
+    def put(self, name: str, pair: SSHKeyPair) -> None:
+        size: int = self.sizeof(pair)
+        with self.__lock:
+            self.__pop(name)
+            self.__pool[name] = (pair, size, monotonic())
+            self.__bytes += size
+            while len(self.__pool) > 1 and (
+                    0 < self.entries < len(self.__pool) or
+                    0 < self.size < self.__bytes):
+                self.__pop(next(iter(self.__pool)))
+                self.__evictions += 1
+
+    def get(self, name: str) -> SSHKeyPair:
+        with self.__lock:
+            if (item := self.__pool.get(name)) is None:
+                self.__misses += 1
+                raise CacheMiss(name)
+            if self.__expired(item):
+                self.__pop(name)
+                self.__expirations += 1
+                self.__misses += 1
+                raise CacheMiss(name)
+            self.__pool.move_to_end(name)
+            self.__hits += 1
+            return item[0]
+
+    def delete(self, name: str) -> None:
+        with self.__lock:
+            self.__pop(name)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__pool.clear()
+            self.__bytes = 0
+
+    @classmethod
+    def sizeof(cls, pair: SSHKeyPair) -> int:
+        """Estimated bytes of the key material"""
+        return pair.nbytes
+
+    def __expired(self, item: Tuple[SSHKeyPair, int, float]) -> bool:
+        return 0 < self.lifetime < monotonic() - item[2]
+
+    def __pop(self, name: str) -> None:
+        if (item := self.__pool.pop(name, None)) is not None:
+            self.__bytes -= item[1]
@@ -0,0 +1,97 @@
+# coding:utf-8
+
+from fnmatch import fnmatchcase
+from hashlib import sha256
+from os.path import isfile
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+
+from xkeys_ssh.ring import SSHKeyRing
+
+
+class SSHKeyExporter:
+    """Stream public keys of SSH key ring as authorized_keys lines
+
+    Only the public key of each SSH key pair is read, private keys are
+    neither loaded nor cached.
+    options: Prefix of each line, such as 'no-pty,from="10.0.0.0/8"' for
+    authorized_keys, or host patterns for known_hosts.
+    comment: Override the comment of each line, '{name}' is replaced with
+    the name of the SSH key pair.
+    patterns: Export only the names matching any of the shell patterns.
+    """
+    HEADER: str = "# xkeys-export "
+
+    def __init__(self, ring: SSHKeyRing,
+                 options: Optional[str] = None,
+                 comment: Optional[str] = None,
+                 patterns: Iterable[str] = ()):
+        self.__patterns: Tuple[str, ...] = tuple(patterns)
+        self.__options: Optional[str] = options
+        self.__comment: Optional[str] = comment
+        self.__ring: SSHKeyRing = ring
+
+    @property
+    def ring(self) -> SSHKeyRing:
+        return self.__ring
+
+    @property
+    def options(self) -> Optional[str]:
+        return self.__options
+
+    @property
+    def comment(self) -> Optional[str]:
+        return self.__comment
+
+    @property
+    def patterns(self) -> Tuple[str, ...]:
+        return self.__patterns
+
+    def select(self) -> List[str]:
+        """Sorted names of SSH key pairs to export"""
+        return sorted(name for name in self.ring if not self.patterns or
+                      any(fnmatchcase(name, pattern) for pattern in self.patterns))  # noqa:E501
+
+    def line(self, name: str) -> str:
+        """Line of the public key of SSH key pair"""
+        fields: List[str] = self.ring.public(name).split(maxsplit=2)
+        comment: str = fields[2] if len(fields) > 2 else ""
+        if self.comment is not None:
+            comment = self.comment.replace("{name}", name)
+        return " ".join(field for field in (self.options, *fields[:2], comment) if field)  # noqa:E501
+
+    def signature(self, names: Iterable[str]) -> str:
+        """Digest of export options and the stamps of SSH key pairs"""
+        digest = sha256(repr((self.options, self.comment)).encode("utf-8"))
+        for name in names:
+            digest.update(f"\0{name}\0{self.ring.stamp(name)}".encode("utf-8"))  # noqa:E501
+        return digest.hexdigest()
+
+    def write(self, whdl: TextIO, names: Optional[Iterable[str]] = None) -> int:  # noqa:E501
+        """Write lines to a file-like object, return the number of lines"""
+        lines: int = 0
+        for name in (self.select() if names is None else names):
+            whdl.write(f"{self.line(name)}\n")
+            lines += 1
+        return lines
+
+    def export(self, path: str) -> bool:
+        """Write lines to a file if the selected SSH key pairs changed
+
+        The first line of the file records the signature of its contents,
+        return False if the file is up to date and not rewritten.
+        """
+        header: str = f"{self.HEADER}{self.signature(names := self.select())}"  # noqa:E501
+        if isfile(path):
+            with open(path, "r", encoding="utf-8") as rhdl:
+                if rhdl.readline().rstrip("\n") == header:
+                    return False
+
+        from xkits_file import SafeWrite  # pylint: disable=C0415
+        with SafeWrite(path, encoding="utf-8", truncate=True) as whdl:
+            whdl.write(f"{header}\n")
+            self.write(whdl, names)
+        return True
@@ -0,0 +1,48 @@
+# coding:utf-8
+
+from typing import Dict
+from typing import Optional
+
+from xkeys_util.journal import JournalIndex
+
+
+class SSHKeyIndex(JournalIndex):
+    """Persistent fingerprint to name index of SSH key ring
+
+    The index is an append-only journal in the base directory of the ring,
+    each line records a name and its fingerprint (null means the name has
+    been removed). The ring holds its index lock while using the index.
+    """
+    FILENAME: str = ".fingerprints"
+
+    def __init__(self, base: str):
+        self.__fingerprints: Dict[str, str] = {}  # fingerprint -> name
+        super().__init__(base=base, filename=self.FILENAME)
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        """Get the name of SSH key pair by fingerprint"""
+        return self.__fingerprints.get(fingerprint)
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        """Get the fingerprint of SSH key pair by name"""
+        return self.value(name)
+
+    def rename(self, origin: str, target: str) -> None:
+        if (fingerprint := self.fingerprint(origin)) is not None:
+            self.delete(origin)
+            self.put(target, fingerprint)
+
+    def refresh(self, name: str, value: Optional[str]) -> None:
+        if value is not None and (other := self.get(value)) not in (None, name):  # noqa:E501
+            super().refresh(other, None)  # fingerprint moved to the name
+        super().refresh(name, value)
+
+    def on_put(self, name: str, value: str) -> None:
+        self.__fingerprints[value] = name
+
+    def on_delete(self, name: str, value: str) -> None:
+        if self.__fingerprints.get(value) == name:
+            del self.__fingerprints[value]
+
+    def on_clear(self) -> None:
+        self.__fingerprints.clear()
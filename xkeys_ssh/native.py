@@ -0,0 +1,159 @@
+# coding:utf-8
+
+from base64 import b64decode
+from base64 import b64encode
+import binascii
+from hashlib import sha256
+from struct import error as StructError
+from struct import unpack_from
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+NativeAttr = Tuple[int, str, str, str]
+
+
+class SSHKeyNative:
+    """In-process SSH key backend built on cryptography
+
+    Each method returns None for any key it cannot handle (for example
+    encrypted, DSA or security key types), and the caller should fall
+    back to ssh-keygen.
+    """
+    OPENSSH_MAGIC: bytes = b"openssh-key-v1\0"
+    PRIVATE_FIELDS: Dict[str, int] = {
+        "ssh-rsa": 6,
+        "ssh-ed25519": 2,
+        "ecdsa-sha2-nistp256": 3,
+        "ecdsa-sha2-nistp384": 3,
+        "ecdsa-sha2-nistp521": 3,
+    }
+
+    @classmethod
+    def parser(cls, private: str) -> Optional[str]:
+        """Parse public key from private key"""
+        from cryptography.exceptions import \
+            UnsupportedAlgorithm  # pylint:disable=C0415
+        from cryptography.hazmat.primitives import \
+            serialization  # pylint:disable=C0415
+
+        data: bytes = f"{private.strip()}\n".encode("utf-8")
+        comment: Optional[str] = None
+
+        try:
+            if b"BEGIN OPENSSH PRIVATE KEY" in data:
+                comment = cls.comment(private)
+                if comment is None:
+                    return None  # encrypted or unsupported key type
+                key = serialization.load_ssh_private_key(data, password=None)
+            else:
+                key = serialization.load_pem_private_key(data, password=None)
+        except (TypeError, ValueError,
+                UnsupportedAlgorithm):
+            return None
+
+        public: bytes = key.public_key().public_bytes(
+            encoding=serialization.Encoding.OpenSSH,
+            format=serialization.PublicFormat.OpenSSH)
+        if public.split(b" ")[0].decode("utf-8") not in cls.PRIVATE_FIELDS:
+            return None
+        return f"{public.decode('utf-8')} {comment}" if comment else public.decode("utf-8")  # noqa:E501
+
+    @classmethod
+    def extract(cls, public: str) -> Optional[NativeAttr]:
+        """Extract attributes from public key
+
+        Tuple[bits, fingerprint, comment, algorithm]
+        """
+        from cryptography.hazmat.primitives.asymmetric import \
+            ec  # pylint:disable=C0415
+        from cryptography.hazmat.primitives.asymmetric import \
+            ed25519  # pylint:disable=C0415
+        from cryptography.hazmat.primitives.asymmetric import \
+            rsa  # pylint:disable=C0415
+        from cryptography.exceptions import \
+            UnsupportedAlgorithm  # pylint:disable=C0415
+        from cryptography.hazmat.primitives import \
+            serialization  # pylint:disable=C0415
+
+        fields: List[str] = public.strip().split(maxsplit=2)
+        if len(fields) < 2 or fields[0] not in cls.PRIVATE_FIELDS:
+            return None
+
+        try:
+            blob: bytes = b64decode(fields[1], validate=True)
+            key = serialization.load_ssh_public_key(f"{fields[0]} {fields[1]}".encode("utf-8"))  # noqa:E501
+        except (binascii.Error, ValueError,
+                UnsupportedAlgorithm):
+            return None
+
+        bits: int
+        algo: str
+        if isinstance(key, rsa.RSAPublicKey):
+            bits, algo = key.key_size, "rsa"
+        elif isinstance(key, ec.EllipticCurvePublicKey):
+            bits, algo = key.curve.key_size, "ecdsa"
+        elif isinstance(key, ed25519.Ed25519PublicKey):
+            bits, algo = 256, "ed25519"
+        else:
+            return None  # pragma: no cover
+
+        comment: str = fields[2].strip() if len(fields) > 2 else ""
+        return bits, cls.fingerprint(blob), comment or "no comment", algo
+
+    @classmethod
+    def fingerprint(cls, blob: bytes) -> str:
+        """SHA256 fingerprint of public key blob"""
+        digest: str = b64encode(sha256(blob).digest()).decode("utf-8")
+        return f"SHA256:{digest.rstrip('=')}"
+
+    @classmethod
+    def comment(cls, private: str) -> Optional[str]:
+        """Read comment from unencrypted OpenSSH private key"""
+        if (section := cls.__private_section(private)) is None:
+            return None
+
+        try:
+            offset: int = 8  # checkint * 2
+            keytype, offset = cls.__string(section, offset)
+            if (count := cls.PRIVATE_FIELDS.get(keytype.decode("utf-8"))) is None:  # noqa:E501
+                return None
+            for _ in range(count):
+                _, offset = cls.__string(section, offset)
+            comment, _ = cls.__string(section, offset)
+            return comment.decode("utf-8")
+        except (StructError, ValueError):
+            return None
+
+    @classmethod
+    def __private_section(cls, private: str) -> Optional[bytes]:
+        """Private key section of unencrypted OpenSSH private key envelope"""
+        lines: List[str] = [line.strip() for line in private.strip().splitlines()]  # noqa:E501
+        try:
+            data: bytes = b64decode("".join(lines[1:-1]), validate=True)
+        except binascii.Error:
+            return None
+
+        if not data.startswith(cls.OPENSSH_MAGIC):
+            return None
+
+        try:
+            offset: int = len(cls.OPENSSH_MAGIC)
+            cipher, offset = cls.__string(data, offset)
+            _, offset = cls.__string(data, offset)  # kdfname
+            _, offset = cls.__string(data, offset)  # kdfoptions
+            if cipher != b"none" or unpack_from(">I", data, offset)[0] != 1:
+                return None
+            _, offset = cls.__string(data, offset + 4)  # public key
+            return cls.__string(data, offset)[0]
+        except (StructError, ValueError):
+            return None
+
+    @classmethod
+    def __string(cls, data: bytes, offset: int) -> Tuple[bytes, int]:
+        """Read an SSH string, return it and the offset after it"""
+        length: int = unpack_from(">I", data, offset)[0]
+        if offset + 4 + length > len(data):
+            raise ValueError("truncated OpenSSH private key")
+        return data[offset + 4:offset + 4 + length], offset + 4 + length
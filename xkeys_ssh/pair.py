@@ -2,22 +2,31 @@
 
 from os import chmod
 from os import makedirs
-from os import popen
 from os import remove
 from os import rename
-from os import system
 from os.path import dirname
 from os.path import exists
 from os.path import isfile
 from os.path import join
+from sys import getsizeof
 import tarfile
 from tempfile import TemporaryDirectory
+from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Literal
 from typing import Optional
 from typing import Tuple
+from typing import Union
+from zlib import compress
+from zlib import decompress
 
 from xkeys_attr import __project__
+from xkeys_ssh.native import SSHKeyNative
+from xkeys_util.archive import Archive
+from xkeys_util.metrics import Metrics
+from xkeys_util.runner import Command
 
 SSHKeyAlgo = Literal[
     "rsa",
@@ -29,16 +38,30 @@ SSHKeyAlgo = Literal[
 ]
 
 SSHKeyAttr = Tuple[int, str, str, SSHKeyAlgo]
+SSHKeyData = Union[str, Callable[[], str]]
 
 
-class SSHKeyPair:
-    def __init__(self, private: str, public: Optional[str] = None,
-                 attributes: Optional[SSHKeyAttr] = None):
+class SSHKeyPair:  # pylint: disable=R0904
+    __slots__ = ("__attributes", "__public", "__attributes_is_valid",
+                 "__public_is_valid", "__private", "__compact")
+
+    def __init__(self, private: SSHKeyData, public: Optional[SSHKeyData] = None,  # noqa:E501
+                 attributes: Optional[SSHKeyAttr] = None,
+                 compact: bool = False):
+        """SSH key pair
+
+        The private key and public key can be callables, which are called to
+        read the key on first access.
+
+        compact: Hold the private key as compressed bytes, which are
+        decompressed on every access instead of kept as a string.
+        """
         self.__attributes: Optional[SSHKeyAttr] = attributes
-        self.__public: Optional[str] = public.strip() if public else None
+        self.__public: Optional[SSHKeyData] = public.strip() if isinstance(public, str) else public  # noqa:E501
         self.__attributes_is_valid: Optional[bool] = None
         self.__public_is_valid: Optional[bool] = None
-        self.__private: str = private.strip()
+        self.__private: Union[SSHKeyData, bytes] = self.__hold(private.strip(), compact) if isinstance(private, str) else private  # noqa:E501
+        self.__compact: bool = compact
 
     def __bool__(self) -> bool:
         return self.public_is_valid and self.attributes_is_valid
@@ -86,13 +109,35 @@ class SSHKeyPair:
         if self.__public is None:  # lazy loading
             self.__public = self.parser(self.private)
             self.__public_is_valid = True
+        elif not isinstance(self.__public, str):  # lazy reading
+            self.__public = self.__public().strip()
         return self.__public
 
     @property
     def private(self) -> str:
         """Private key"""
+        if isinstance(self.__private, bytes):
+            return decompress(self.__private).decode()
+        if not isinstance(self.__private, str):  # lazy reading
+            private: str = self.__private().strip()
+            self.__private = self.__hold(private, self.compact)
+            return private
         return self.__private
 
+    @property
+    def compact(self) -> bool:
+        return self.__compact
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the private key and public key"""
+        private = self.__private if isinstance(self.__private, bytes) else self.private  # noqa:E501
+        return getsizeof(private) + getsizeof(self.public)
+
+    @classmethod
+    def __hold(cls, private: str, compact: bool) -> Union[str, bytes]:
+        return compress(private.encode()) if compact else private
+
     @property
     def attributes_is_valid(self) -> bool:
         if self.__attributes_is_valid is None:  # lazy checking
@@ -108,6 +153,7 @@ class SSHKeyPair:
         return self.__public_is_valid
 
     @classmethod
+    @Metrics.timed("ssh.pair.generate")
     def generate(cls,  # pylint: disable=R0913,R0917
                  algo: SSHKeyAlgo = "rsa",
                  bits: Optional[int] = None,
@@ -128,70 +174,159 @@ class SSHKeyPair:
         -b flag will be ignored.
         """
         with TemporaryDirectory() as tmpdir:
-            if not comment:
-                comment = f"{__project__}-generate"
-
-            if not passphrase:
-                passphrase = "\"\""
-
-            from typing import get_args  # pylint: disable=C0415
-            if algo not in get_args(SSHKeyAlgo):
-                raise ValueError(f"unsupported SSH key algorithm: {algo}")
-
             keyfile: str = join(tmpdir, __project__)
-            command: str = f"ssh-keygen -t {algo} -f {keyfile} -C {comment} -N {passphrase}"  # noqa:E501
+            Command.run(*cls.keygen(keyfile, algo, bits, comment, passphrase)).check()  # noqa:E501
+            return cls.read(keyfile)
 
-            if isinstance(bits, int) and algo not in ("ecdsa-sk", "ed25519", "ed25519-sk"):  # noqa:E501
-                if algo == "rsa":
-                    bits = max(1024, bits)
-                elif algo == "dsa":
-                    bits = 1024
-                elif algo == "ecdsa":
-                    if bits not in (256, 384, 521):
-                        raise ValueError(f"unsupported ECDSA key length: {bits}")  # noqa:E501
-                command += f" -b {bits}"
+    @classmethod
+    async def agenerate(cls,  # pylint: disable=R0913,R0917
+                        algo: SSHKeyAlgo = "rsa",
+                        bits: Optional[int] = None,
+                        comment: Optional[str] = None,
+                        passphrase: Optional[str] = None
+                        ) -> "SSHKeyPair":
+        """Generate SSH key pair without blocking the event loop"""
+        from asyncio import get_running_loop  # pylint: disable=C0415
+
+        def read(keyfile: str) -> "SSHKeyPair":
+            pair: SSHKeyPair = cls.read(keyfile)  # extract attributes here
+            return cls(private=pair.private, public=pair.public, attributes=pair.attributes)  # noqa:E501
 
-            if system(command) != 0:
-                raise RuntimeError("failed to generate SSH key pair")  # noqa:E501, pragma: no cover
+        with TemporaryDirectory() as tmpdir:
+            keyfile: str = join(tmpdir, __project__)
+            command = await Command.arun(*cls.keygen(keyfile, algo, bits, comment, passphrase))  # noqa:E501
+            command.check()
+            return await get_running_loop().run_in_executor(None, read, keyfile)  # noqa:E501
 
-            return cls.read(keyfile)
+    @classmethod
+    def keygen(cls,  # pylint: disable=R0913,R0917
+               keyfile: str,
+               algo: SSHKeyAlgo = "rsa",
+               bits: Optional[int] = None,
+               comment: Optional[str] = None,
+               passphrase: Optional[str] = None
+               ) -> List[str]:
+        """Arguments of ssh-keygen to generate SSH key pair"""
+        from typing import get_args  # pylint: disable=C0415
+        if algo not in get_args(SSHKeyAlgo):
+            raise ValueError(f"unsupported SSH key algorithm: {algo}")
+
+        arguments: List[str] = ["ssh-keygen", "-q", "-t", algo, "-f", keyfile,
+                                "-C", comment or f"{__project__}-generate",
+                                "-N", passphrase or ""]
+
+        if isinstance(bits, int) and algo not in ("ecdsa-sk", "ed25519", "ed25519-sk"):  # noqa:E501
+            if algo == "rsa":
+                bits = max(1024, bits)
+            elif algo == "dsa":
+                bits = 1024
+            elif algo == "ecdsa":
+                if bits not in (256, 384, 521):
+                    raise ValueError(f"unsupported ECDSA key length: {bits}")  # noqa:E501
+            arguments.extend(["-b", str(bits)])
+
+        return arguments
 
     @classmethod
+    @Metrics.timed("ssh.pair.extract")
     def extract(cls, public: str) -> SSHKeyAttr:
         """Extract attributes from public key"""
+        if (attributes := SSHKeyNative.extract(public)) is None:
+            return cls.__extract(public)  # fallback to ssh-keygen
+
+        from typing import cast  # pylint: disable=C0415
+        bits, fingerprint, comment, keytype = attributes
+        return bits, fingerprint, comment, cast(SSHKeyAlgo, keytype)
+
+    @classmethod
+    def __extract(cls, public: str) -> SSHKeyAttr:
+        if (attributes := cls.__extract_many({0: public}).get(0)) is None:
+            raise ValueError(f"invalid public key: '{public}'")  # noqa:E501, pragma: no cover
+        return attributes
+
+    @classmethod
+    @Metrics.timed("ssh.pair.extract_many")
+    def extract_many(cls, publics: Iterable[str]) -> List[Optional[SSHKeyAttr]]:  # noqa:E501
+        """Extract attributes from many public keys
+
+        Public keys not supported natively are fingerprinted together by a
+        single ssh-keygen call. Invalid public keys get None.
+        """
+        from typing import cast  # pylint: disable=C0415
+
+        results: List[Optional[SSHKeyAttr]] = []
+        pending: Dict[int, str] = {}
+        for index, public in enumerate(publics):
+            if (attributes := SSHKeyNative.extract(public)) is None:
+                pending[index] = public
+                results.append(None)
+                continue
+            bits, fingerprint, comment, keytype = attributes
+            results.append((bits, fingerprint, comment, cast(SSHKeyAlgo, keytype)))  # noqa:E501
+
+        if pending:  # fallback to ssh-keygen
+            for index, attributes in cls.__extract_many(pending).items():
+                results[index] = attributes
+        return results
+
+    @classmethod
+    def __extract_many(cls, publics: Dict[int, str]) -> Dict[int, SSHKeyAttr]:  # noqa:E501
+        """Fingerprint public keys with one ssh-keygen call
+
+        Each key is written with its index as the comment, because
+        ssh-keygen skips invalid lines.
+        """
+        from typing import cast  # pylint: disable=C0415
+        from typing import get_args  # pylint: disable=C0415
+
+        comments: Dict[int, str] = {}
         with TemporaryDirectory() as tmpdir:
             with open(path := join(tmpdir, "public"), "w", encoding="utf-8") as whdl:  # noqa:E501
-                whdl.write(f"{public.strip()}\n")
-
-            with popen(f"ssh-keygen -l -f {path}") as phdl:
-                output: List[str] = phdl.read().split()
-                if len(output) != 4:
-                    raise ValueError(f"invalid public key: '{public}'")  # noqa:E501, pragma: no cover
-                bits: int = int(output[0])
-                fingerprint: str = output[1].strip()
-                comment: str = output[2].strip()
-                keytype: str = output[3].strip().lstrip("(").rstrip(")").lower()  # noqa:E501
-
-                from typing import cast  # pylint: disable=C0415
-                from typing import get_args  # pylint: disable=C0415
-                if keytype not in get_args(SSHKeyAlgo):
-                    raise ValueError(f"unsupported SSH key algorithm: {keytype}")  # noqa:E501, pragma: no cover
-                return bits, fingerprint, comment, cast(SSHKeyAlgo, keytype)
+                for index, public in publics.items():
+                    if len(fields := public.strip().split(maxsplit=2)) < 2:
+                        continue
+                    comments[index] = fields[2].strip() if len(fields) > 2 else ""  # noqa:E501
+                    whdl.write(f"{fields[0]} {fields[1]} {index}\n")
+
+            output: str = Command.run("ssh-keygen", "-l", "-f", path).stdout
+
+        results: Dict[int, SSHKeyAttr] = {}
+        for line in output.splitlines():
+            # bits fingerprint index (TYPE)
+            if len(fields := line.split()) != 4 or not fields[2].isdigit():
+                continue  # pragma: no cover
+            if (index := int(fields[2])) not in comments:
+                continue  # pragma: no cover
+            keytype: str = fields[3].strip().lstrip("(").rstrip(")").lower()
+            if keytype not in get_args(SSHKeyAlgo):
+                continue  # pragma: no cover
+            results[index] = (int(fields[0]), fields[1], comments[index] or "no comment", cast(SSHKeyAlgo, keytype))  # noqa:E501
+        return results
 
     @classmethod
+    @Metrics.timed("ssh.pair.parser")
     def parser(cls, private: str) -> str:
         """Parse public key from private key"""
+        if (public := SSHKeyNative.parser(private)) is None:
+            return cls.__parser(private)  # fallback to ssh-keygen
+        return public
+
+    @classmethod
+    def __parser(cls, private: str) -> str:
         with TemporaryDirectory() as tmpdir:
             with open(path := join(tmpdir, "private"), "w", encoding="utf-8") as whdl:  # noqa:E501
                 whdl.write(f"{private.strip()}\n")
 
             chmod(path, 0o600)  # bad permissions
 
-            with popen(f"ssh-keygen -y -f {path}") as phdl:
-                public: str = phdl.read().strip()
-                assert isinstance(public, str)
-                return public
+            return Command.run("ssh-keygen", "-y", "-f", path).stdout.strip()
+
+    async def adump(self, name: str) -> None:
+        """Dump SSH key pair to a file without blocking the event loop"""
+        from asyncio import get_running_loop  # pylint: disable=C0415
+        await get_running_loop().run_in_executor(None, self.dump, name)
 
+    @Metrics.timed("ssh.pair.dump")
     def dump(self, name: str) -> None:
         """Dump SSH key pair to a file"""
         if not exists(base := dirname(name)):
@@ -200,65 +335,81 @@ class SSHKeyPair:
         if exists(name):
             raise FileExistsError(f"SSH key pair '{name}' already exists")
 
-        with TemporaryDirectory() as tmpdir:
-            with open(attribute := join(tmpdir, "attributes"), "w", encoding="utf-8") as whdl:  # noqa:E501
-                whdl.write(f"{self.fingerprint}\n")
-                whdl.write(f"{self.comment}\n")
-                whdl.write(f"{self.algo}\n")
-                whdl.write(f"{self.bits}\n")
+        if exists(temp := f"{name}.tmp"):
+            remove(temp)  # pragma: no cover
 
-            with open(private := join(tmpdir, "private"), "w", encoding="utf-8") as whdl:  # noqa:E501
-                whdl.write(f"{self.private}\n")
+        self.archive(temp)
+        rename(temp, name)
+        assert not exists(temp)
+        assert isfile(name)
 
-            with open(public := join(tmpdir, "public"), "w", encoding="utf-8") as whdl:  # noqa:E501
-                whdl.write(f"{self.public}\n")
+    def archive(self, path: str) -> None:
+        """Write SSH key pair archive to the path (overwrite)"""
+        attributes: str = f"{self.fingerprint}\n{self.comment}\n{self.algo}\n{self.bits}\n"  # noqa:E501
 
-            chmod(attribute, 0o644)
-            chmod(private, 0o600)
-            chmod(public, 0o644)
+        with tarfile.open(path, "w") as thdl:
+            Archive.addfile(thdl, "attributes.txt", attributes, 0o644)
+            Archive.addfile(thdl, "key.pub", f"{self.public}\n", 0o644)
+            Archive.addfile(thdl, "key", f"{self.private}\n", 0o600)
 
-            if exists(temp := f"{name}.tmp"):
-                remove(name)  # pragma: no cover
+    @classmethod
+    def member(cls, name: str, arcname: str) -> str:
+        """Read a member of SSH key pair file"""
+        if not exists(name) or not isfile(name):
+            raise FileNotFoundError(f"sshkey '{name}' not exists")
 
-            with tarfile.open(temp, "w") as thdl:
-                thdl.add(attribute, arcname="attributes.txt")
-                thdl.add(public, arcname="key.pub")
-                thdl.add(private, arcname="key")
+        with tarfile.open(name, "r") as thdl:
+            return Archive.readfile(thdl, arcname)
 
-            rename(temp, name)
-            assert not exists(temp)
-            assert isfile(name)
+    @classmethod
+    def peek(cls, name: str) -> SSHKeyAttr:
+        """Load attributes of SSH key pair from file
+
+        Only the attributes member is read, neither the private key nor the
+        public key.
+        """
+        return cls.__read_attributes(cls.member(name, "attributes.txt"))
 
     @classmethod
-    def load(cls, name: str) -> "SSHKeyPair":
-        """Load SSH key pair from file"""
+    def __read_attributes(cls, data: str) -> SSHKeyAttr:
+        fingerprint, comment, keytype, bits = data.splitlines()[:4]
+
+        from typing import cast  # pylint: disable=import-outside-toplevel
+        from typing import get_args  # pylint: disable=C0415
+        if (keytype := keytype.strip()) not in get_args(SSHKeyAlgo):
+            raise ValueError(f"unsupported SSH key algorithm: {keytype}")  # noqa:E501, pragma: no cover
+        return int(bits.strip()), fingerprint.strip(), comment.strip(), cast(SSHKeyAlgo, keytype)  # noqa:E501
+
+    @classmethod
+    async def aload(cls, name: str, lazy: bool = False) -> "SSHKeyPair":
+        """Load SSH key pair from file without blocking the event loop"""
+        from asyncio import get_running_loop  # pylint: disable=C0415
+        return await get_running_loop().run_in_executor(None, cls.load, name, lazy)  # noqa:E501
+
+    @classmethod
+    @Metrics.timed("ssh.pair.load")
+    def load(cls, name: str, lazy: bool = False, compact: bool = False) -> "SSHKeyPair":  # noqa:E501
+        """Load SSH key pair from file
+
+        lazy: Read only the attributes, and defer reading the public key
+        and private key until they are accessed.
+
+        compact: Hold the private key as compressed bytes.
+        """
+        if lazy:
+            return cls(private=lambda: cls.member(name, "key"),
+                       public=lambda: cls.member(name, "key.pub"),
+                       attributes=cls.peek(name), compact=compact)
+
         if not exists(name) or not isfile(name):
             raise FileNotFoundError(f"sshkey '{name}' not exists")
 
-        with TemporaryDirectory() as tmpdir:
-            with tarfile.open(name, "r") as thdl:
-                thdl.extract("attributes.txt", path=tmpdir)
-                thdl.extract("key.pub", path=tmpdir)
-                thdl.extract("key", path=tmpdir)
-
-            with open(join(tmpdir, "attributes.txt"), encoding="utf-8") as rhdl:  # noqa:E501
-                fingerprint = rhdl.readline().strip()
-                comment = rhdl.readline().strip()
-                keytype = rhdl.readline().strip()
-                bits = int(rhdl.readline().strip())
-
-            with open(join(tmpdir, "key.pub"), encoding="utf-8") as rhdl:
-                public = rhdl.read()
-
-            with open(join(tmpdir, "key"), encoding="utf-8") as rhdl:
-                private = rhdl.read()
+        with tarfile.open(name, "r") as thdl:
+            attributes: SSHKeyAttr = cls.__read_attributes(Archive.readfile(thdl, "attributes.txt"))  # noqa:E501
+            public: str = Archive.readfile(thdl, "key.pub")
+            private: str = Archive.readfile(thdl, "key")
 
-            from typing import cast  # pylint: disable=import-outside-toplevel
-            from typing import get_args  # pylint: disable=C0415
-            if keytype not in get_args(SSHKeyAlgo):
-                raise ValueError(f"unsupported SSH key algorithm: {keytype}")  # noqa:E501, pragma: no cover
-            attributes: SSHKeyAttr = (bits, fingerprint, comment, cast(SSHKeyAlgo, keytype))  # noqa:E501
-            return cls(private=private, public=public, attributes=attributes)
+        return cls(private=private, public=public, attributes=attributes, compact=compact)  # noqa:E501
 
     @classmethod
     def read(cls, keyfile: str) -> "SSHKeyPair":
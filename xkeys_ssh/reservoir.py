@@ -0,0 +1,159 @@
+# coding:utf-8
+
+from os import link
+from os import listdir
+from os import makedirs
+from os import remove
+from os import rename
+from os.path import isdir
+from os.path import join
+from threading import Event
+from threading import Lock
+from threading import Thread
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from uuid import uuid4
+
+from xkeys_ssh.pair import SSHKeyAlgo
+from xkeys_ssh.pair import SSHKeyPair
+
+SSHKeySpec = Tuple[SSHKeyAlgo, Optional[int]]
+
+
+class SSHKeyReservoir:  # pylint: disable=R0902
+    """Pre-generated SSH key pairs in a hidden subdirectory of the ring
+
+    A background thread keeps the number of key pairs of each (algo, bits)
+    between the low and high watermarks, generate() claims one atomically
+    by rename instead of waiting for ssh-keygen.
+    """
+    DIRNAME: str = ".reservoir"
+
+    def __init__(self, base: str, low: int = 2, high: int = 8,
+                 specs: Iterable[SSHKeySpec] = ()):
+        if low < 1 or high < low:
+            raise ValueError(f"invalid watermarks: low={low}, high={high}")
+        self.__specs: Set[SSHKeySpec] = set(specs)
+        self.__base: str = join(base, self.DIRNAME)
+        self.__thread: Optional[Thread] = None
+        self.__wakeup: Event = Event()
+        self.__stopped: Event = Event()
+        self.__lock: Lock = Lock()
+        self.__misses: int = 0
+        self.__hits: int = 0
+        self.__high: int = high
+        self.__low: int = low
+
+    @property
+    def base(self) -> str:
+        return self.__base
+
+    @property
+    def low(self) -> int:
+        return self.__low
+
+    @property
+    def high(self) -> int:
+        return self.__high
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def folder(self, algo: SSHKeyAlgo, bits: Optional[int] = None) -> str:
+        return join(self.base, f"{algo}-{bits or 'default'}")
+
+    def count(self, algo: SSHKeyAlgo, bits: Optional[int] = None) -> int:
+        if not isdir(folder := self.folder(algo, bits)):
+            return 0
+        return sum(1 for item in listdir(folder) if item.endswith(".tar"))
+
+    def claim(self, target: str, algo: SSHKeyAlgo = "rsa",
+              bits: Optional[int] = None) -> Optional[SSHKeyPair]:
+        """Move a pre-generated SSH key pair to target
+
+        Return None if the reservoir is empty, the caller should generate
+        a new SSH key pair instead.
+        """
+        from typing import get_args  # pylint: disable=C0415
+        if algo not in get_args(SSHKeyAlgo):
+            raise ValueError(f"unsupported SSH key algorithm: {algo}")
+
+        with self.__lock:
+            self.__specs.add((algo, bits))
+
+        folder: str = self.folder(algo, bits)
+        for item in listdir(folder) if isdir(folder) else []:
+            if not item.endswith(".tar"):
+                continue
+            try:  # claimed by others if the file has gone
+                rename(origin := join(folder, item), claimed := f"{origin}.claimed")  # noqa:E501
+            except FileNotFoundError:  # pragma: no cover
+                continue
+            try:
+                link(claimed, target)  # never overwrite an existing target
+            except FileExistsError:
+                rename(claimed, origin)
+                raise
+            remove(claimed)
+            with self.__lock:
+                self.__hits += 1
+            self.__wakeup.set()
+            return SSHKeyPair.load(target)
+
+        with self.__lock:
+            self.__misses += 1
+        self.__wakeup.set()
+        return None
+
+    def refill(self, algo: SSHKeyAlgo = "rsa", bits: Optional[int] = None) -> int:  # noqa:E501
+        """Generate SSH key pairs up to the high watermark"""
+        generated: int = 0
+        makedirs(folder := self.folder(algo, bits), mode=0o700, exist_ok=True)
+        while not self.__stopped.is_set() and self.count(algo, bits) < self.high:  # noqa:E501
+            SSHKeyPair.generate(algo=algo, bits=bits).dump(join(folder, f"{uuid4()}.tar"))  # noqa:E501
+            generated += 1
+        return generated
+
+    def start(self) -> None:
+        """Start the background refill thread"""
+        if not self.running:
+            self.__stopped.clear()
+            self.__thread = Thread(target=self.__run, name="xkeys-reservoir", daemon=True)  # noqa:E501
+            self.__thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background refill thread"""
+        self.__stopped.set()
+        self.__wakeup.set()
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+            self.__thread = None
+
+    def __run(self) -> None:
+        while not self.__stopped.is_set():
+            self.__wakeup.clear()
+            with self.__lock:
+                specs = list(self.__specs)
+            for algo, bits in specs:
+                if self.count(algo, bits) < self.low:
+                    try:
+                        self.refill(algo, bits)
+                    except Exception:  # noqa:E501, pylint: disable=broad-exception-caught
+                        pass  # try again on the next wakeup
+            self.__wakeup.wait(timeout=60.0)
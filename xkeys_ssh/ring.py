@@ -1,101 +1,323 @@
 # coding:utf-8
 
-from os import listdir
+from hashlib import sha256
+from os import makedirs
 from os import remove
 from os import rename
+from os import replace
+from os import rmdir
+from os import scandir
+from os import stat
 from os.path import exists
 from os.path import isfile
 from os.path import join
+from tarfile import TarError
+from threading import Lock
+from typing import Dict
+from typing import Iterable
 from typing import Iterator
+from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
 from uuid import uuid4
+from weakref import WeakValueDictionary
 
-from xkits_lib.cache import CachePool
+from xkits_lib.cache import CacheMiss
 
+from xkeys_ssh.backend import SSHKeyBackend
+from xkeys_ssh.cache import SSHKeyCache
+from xkeys_ssh.index import SSHKeyIndex
 from xkeys_ssh.pair import SSHKeyAlgo
+from xkeys_ssh.pair import SSHKeyAttr
 from xkeys_ssh.pair import SSHKeyPair
+from xkeys_ssh.reservoir import SSHKeyReservoir
+from xkeys_ssh.reservoir import SSHKeySpec
+from xkeys_util.lock import FileLock
+from xkeys_util.metrics import Metrics
 
 
-class SSHKeyRing():
-    def __init__(self, base: Optional[str] = None):
-        self.__cache: CachePool[str, SSHKeyPair] = CachePool(lifetime=0)
+class SSHKeyRing(SSHKeyBackend):  # pylint: disable=R0902,R0904
+    LOCKDIR: str = ".locks"
+    MAX_SHARD: int = 4
+
+    def __init__(self, base: Optional[str] = None,
+                 cache: Optional[SSHKeyCache] = None,
+                 shard: int = 0, compact: bool = False):
+        """SSH key ring
+
+        shard: The number of hash prefix characters of the subdirectory
+        each key pair is stored in, 0 means a flat layout.
+
+        compact: Load key pairs holding the private key as compressed bytes,
+        to fit more key pairs into the cache.
+
+        Mutations hold a per-name file lock and, while checking and updating
+        the fingerprint index, a ring-level index lock, so threads and
+        processes sharing the ring can mutate different names in parallel.
+        """
+        super().__init__(cache=cache, compact=compact)
         self.__base: str = base or "."
+        self.__index: SSHKeyIndex = SSHKeyIndex(self.__base)
+        self.__reservoir: Optional[SSHKeyReservoir] = None
+        self.__scanned: Dict[str, Tuple[Tuple[int, int], Set[str]]] = {}
+        self.__shard: int = self.check_shard(shard)
+        self.__locks: WeakValueDictionary[str, FileLock] = WeakValueDictionary()  # noqa:E501
+        self.__guard: Lock = Lock()
 
     @property
     def base(self) -> str:
         return self.__base
 
+    @property
+    def shard(self) -> int:
+        return self.__shard
+
+    @property
+    def reservoir(self) -> Optional[SSHKeyReservoir]:
+        return self.__reservoir
+
+    @property
+    def index(self) -> SSHKeyIndex:
+        """Fingerprint index (loaded on first use)"""
+        if not self.__index.loaded:
+            with self.index_lock:  # may compact the journal
+                if not self.__index.loaded:
+                    self.__index.load(names=self, fetch=lambda name: SSHKeyPair.peek(self.join(name))[1])  # noqa:E501
+        return self.__index
+
+    @property
+    def index_lock(self) -> FileLock:
+        """Exclusive lock of the fingerprint index across processes"""
+        return self.__filelock(f"{self.__index.path}.lock")
+
+    def lock(self, name: str) -> FileLock:
+        """Exclusive lock of SSH key pair across processes"""
+        return self.__filelock(join(self.folder(name), self.LOCKDIR, f"{name}.lock"))  # noqa:E501
+
+    def __filelock(self, path: str) -> FileLock:
+        with self.__guard:
+            if (lock := self.__locks.get(path)) is None:
+                self.__locks[path] = lock = FileLock(path)
+            return lock
+
     def __len__(self) -> int:
-        return sum(1 for _ in self)
+        return sum(len(self.scan(folder)) for folder in self.folders())
 
     def __iter__(self) -> Iterator[str]:
-        for item in listdir(self.base):
-            if item.endswith(".tar") and isfile(self.join(name := item[:-4])):
-                yield name
+        for folder in self.folders():
+            yield from list(self.scan(folder))
 
     def __contains__(self, name: str) -> bool:
-        return name in self.__cache or isfile(self.join(name))
+        return name in self.cache or name in self.scan(self.folder(name))
+
+    def join(self, name: str) -> str:
+        return join(self.folder(name), f"{name}.tar")
 
-    def __getitem__(self, name: str) -> SSHKeyPair:
-        if name not in self.__cache:
-            self.__cache.put(name, self.load(name))
-        return self.__cache.get(name)
+    def folder(self, name: str) -> str:
+        """The directory where the SSH key pair is stored"""
+        if self.shard <= 0:
+            return self.base
+        return join(self.base, sha256(name.encode("utf-8")).hexdigest()[:self.shard])  # noqa:E501
 
-    def __delitem__(self, name: str):
-        self.remove(name)
+    def folders(self) -> Iterator[str]:
+        """All directories where SSH key pairs are stored"""
+        if self.shard <= 0:
+            yield self.base
+            return
 
-    def join(self, name: str) -> str:
-        return join(self.base, f"{name}.tar")
+        try:
+            with scandir(self.base) as entries:
+                shards: List[str] = sorted(entry.path for entry in entries if self.is_shard(entry.name) and entry.is_dir())  # noqa:E501
+        except FileNotFoundError:
+            return
+        yield from shards
+
+    def is_shard(self, name: str) -> bool:
+        return len(name) == self.shard and all(c in "0123456789abcdef" for c in name)  # noqa:E501
+
+    def scan(self, folder: Optional[str] = None) -> Set[str]:
+        """Names of SSH key pairs in a folder (all folders by default)
+
+        The result of each folder is cached until its inode or mtime
+        changes, or the ring itself changes it.
+        """
+        if folder is None:
+            return {name for item in self.folders() for name in self.scan(item)}  # noqa:E501
+
+        try:
+            stats = stat(folder)
+        except FileNotFoundError:
+            self.__scanned.pop(folder, None)
+            return set()
+
+        key: Tuple[int, int] = (stats.st_ino, stats.st_mtime_ns)
+        if (scanned := self.__scanned.get(folder)) is None or scanned[0] != key:  # noqa:E501
+            with Metrics.timer("ssh.ring.scan"), scandir(folder) as entries:
+                names: Set[str] = {entry.name[:-4] for entry in entries
+                                   if entry.name.endswith(".tar") and entry.is_file()}  # noqa:E501
+            self.__scanned[folder] = scanned = (key, names)
+        return scanned[1]
+
+    def migrate(self, shard: int) -> int:
+        """Move all SSH key pairs to another layout in place
+
+        Return the number of SSH key pairs moved.
+        """
+        if (shard := self.check_shard(shard)) == self.shard:
+            return 0
+
+        folders: List[str] = list(self.folders())
+        origins: Dict[str, str] = {name: self.join(name) for name in self}
+        locks: Dict[str, FileLock] = {name: self.lock(name) for name in origins}  # noqa:E501
+        self.__shard = shard
+        self.__scanned.clear()
+
+        for name, origin in origins.items():
+            with locks[name] as lock:
+                makedirs(self.folder(name), mode=0o700, exist_ok=True)
+                rename(origin, self.join(name))
+                lock.unlink()
+
+        for folder in folders:
+            for path in (join(folder, self.LOCKDIR), folder):
+                if path != self.base:
+                    try:
+                        rmdir(path)
+                    except OSError:  # pragma: no cover
+                        pass  # not empty
+        return len(origins)
+
+    def invalidate(self, *names: str) -> None:
+        """Forget the cached state of SSH key pairs changed by others
+
+        The cache entries and scanned folders are dropped, and the loaded
+        fingerprint index is refreshed from the attributes on disk.
+        """
+        for name in names:
+            self.cache.delete(name)
+        with self.index_lock:  # called from the watcher thread
+            self.__invalidate(*names)
+            if not self.__index.loaded:
+                return
+            for name in names:
+                try:
+                    fingerprint: Optional[str] = SSHKeyPair.peek(self.join(name))[1]  # noqa:E501
+                except (OSError, KeyError, TarError, ValueError):
+                    fingerprint = None  # removed or partially written
+                self.__index.refresh(name, fingerprint)
+
+    def refresh(self) -> None:
+        """Forget the cached state of all SSH key pairs"""
+        self.cache.clear()
+        with self.index_lock:
+            self.__scanned.clear()
+            self.__index.clear()
+
+    def __invalidate(self, *names: str) -> None:
+        for name in names:
+            self.__scanned.pop(self.folder(name), None)
+
+    @classmethod
+    def check_shard(cls, shard: int) -> int:
+        if not 0 <= shard <= cls.MAX_SHARD:
+            raise ValueError(f"shard must be between 0 and {cls.MAX_SHARD}")
+        return shard
 
     def seek(self, fingerprint: str) -> Optional[str]:
-        return next((key for key in self if self[key].fingerprint == fingerprint), None)  # noqa:E501
+        with self.index_lock:
+            self.index.sync()  # records of other processes
+            if (name := self.index.get(fingerprint)) is not None and not isfile(self.join(name)):  # noqa:E501
+                self.index.delete(name)  # removed by others
+                return None
+        return name
 
     def dump(self, name: str, pair: SSHKeyPair) -> SSHKeyPair:
-        if (key := self.seek(pair.fingerprint)) is not None:
-            raise FileExistsError(f"Same fingerprint as SSH key pair '{key}'")
+        with self.lock(name):
+            if exists(path := self.join(name)):
+                raise FileExistsError(f"SSH key pair '{path}' already exists")
+            self.__write(name, pair)
+        return pair
+
+    def __write(self, name: str, pair: SSHKeyPair) -> None:
+        """Write SSH key pair file atomically (the name lock is held)
 
-        pair.dump(self.join(name))
-        self.__cache.put(name, pair)
-        return self.__cache.get(name)
+        The archive is written to a temporary file, and replaces the file
+        only if no other SSH key pair has the same fingerprint.
+        """
+        makedirs(self.folder(name), mode=0o700, exist_ok=True)
+        pair.archive(temp := f"{self.join(name)}.tmp")
+        try:
+            with self.index_lock:
+                if (key := self.seek(pair.fingerprint)) is not None:
+                    raise FileExistsError(f"Same fingerprint as SSH key pair '{key}'")  # noqa:E501
+                replace(temp, self.join(name))
+                self.index.put(name, pair.fingerprint)
+        finally:
+            if exists(temp):
+                remove(temp)
+        self.__invalidate(name)
+        self.cache.put(name, pair)
 
     def load(self, name: str) -> SSHKeyPair:
-        return SSHKeyPair.load(self.join(name))
+        return SSHKeyPair.load(self.join(name), compact=self.compact)
+
+    def attributes(self, name: str) -> SSHKeyAttr:
+        """Attributes of SSH key pair without loading the private key"""
+        try:
+            return self.cache.get(name).attributes
+        except CacheMiss:
+            return SSHKeyPair.peek(self.join(name))
+
+    def public(self, name: str) -> str:
+        """Public key of SSH key pair without loading the private key"""
+        try:
+            return self.cache.get(name).public
+        except CacheMiss:
+            return SSHKeyPair.member(self.join(name), "key.pub").strip()
+
+    def stamp(self, name: str) -> str:
+        """Changes whenever the SSH key pair file is replaced or modified"""
+        stats = stat(self.join(name))
+        return f"{stats.st_ino}:{stats.st_mtime_ns}:{stats.st_size}"
 
     def remove(self, name: str) -> bool:
-        self.__cache.delete(name)
-        if exists(path := self.join(name)) and isfile(path):
-            remove(path)
+        self.cache.delete(name)
+        with self.lock(name) as lock:
+            if exists(path := self.join(name)) and isfile(path):
+                remove(path)
+            with self.index_lock:
+                self.index.delete(name)
+            lock.unlink()
+        self.__invalidate(name)
         return not exists(path)
 
     def rename(self, origin: str, target: str) -> bool:
-        self.__cache.delete(origin)
+        self.cache.delete(origin)
 
-        if not isfile(src := self.join(origin)) or exists(dst := self.join(target)):  # noqa:E501
-            return False  # pragma: no cover
+        first, second = sorted((origin, target))  # avoid deadlock
+        with self.lock(first), self.lock(second):
+            if not isfile(src := self.join(origin)) or exists(dst := self.join(target)):  # noqa:E501
+                return False  # pragma: no cover
 
-        rename(src=src, dst=dst)
+            makedirs(self.folder(target), mode=0o700, exist_ok=True)
+            rename(src=src, dst=dst)
+            with self.index_lock:
+                self.index.sync()
+                self.index.rename(origin, target)
+            self.lock(origin).unlink()
+        self.__invalidate(origin, target)
         return not exists(src) and isfile(dst)
 
     def update(self, name: str, private: str) -> None:
-        if not self.rename(origin=name, target=(backup := f"{name}.old")):
-            raise ValueError(f"failed to create '{name}' backup")  # noqa:E501, pragma: no cover
-
-        try:
-            self.create(private=private, name=name)
-        except Exception:
-            self.rename(origin=backup, target=name)
-            raise
-
-        if not self.remove(name=backup):
-            raise ValueError(f"failed to delete '{name}' backup")  # noqa:E501, pragma: no cover
-
-    def create(self, private: str, name: Optional[str] = None) -> str:
+        """Replace the private key of SSH key pair atomically"""
         if not (value := SSHKeyPair(private=private)):
             raise ValueError("invalid private key")  # pragma: no cover
 
-        index: str = name or value.comment or str(uuid4())
-        self.dump(name=index, pair=value)
-        return index
+        with self.lock(name):
+            if not isfile(self.join(name)):
+                raise FileNotFoundError(f"sshkey '{name}' not exists")
+            self.__write(name, value)
 
     def generate(self,  # pylint: disable=R0913,R0917
                  algo: SSHKeyAlgo = "rsa",
@@ -104,10 +326,32 @@ class SSHKeyRing():
                  comment: Optional[str] = None,
                  passphrase: Optional[str] = None
                  ) -> str:
-        value = SSHKeyPair.generate(algo=algo, bits=bits, comment=comment, passphrase=passphrase)  # noqa:E501
         index = name or comment or str(uuid4())
-        self.dump(name=index, pair=value)
-        return index
+        if self.reservoir is not None and not comment and not passphrase:
+            makedirs(self.folder(index), mode=0o700, exist_ok=True)
+            with self.lock(index):
+                if (value := self.reservoir.claim(self.join(index), algo, bits)) is not None:  # noqa:E501
+                    with self.index_lock:
+                        self.index.put(index, value.fingerprint)
+                    self.cache.put(index, value)
+                    self.__invalidate(index)
+                    return index
+
+        return super().generate(algo=algo, bits=bits, name=index, comment=comment, passphrase=passphrase)  # noqa:E501
+
+    def reserve(self, low: int = 2, high: int = 8,
+                specs: Iterable[SSHKeySpec] = ()) -> SSHKeyReservoir:
+        """Enable pre-generated SSH key pairs for generate()
+
+        low, high: Refill the reservoir of each (algo, bits) up to the high
+        watermark when it falls below the low watermark.
+        specs: The (algo, bits) to pre-generate, others are added on their
+        first generate() call.
+        """
+        if self.__reservoir is None:
+            self.__reservoir = SSHKeyReservoir(self.base, low=low, high=high, specs=specs)  # noqa:E501
+        self.__reservoir.start()
+        return self.__reservoir
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+# coding:utf-8
+
+from os import makedirs
+from os.path import abspath
+from os.path import dirname
+import sqlite3
+from threading import RLock
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from xkeys_ssh.backend import SSHKeyBackend
+from xkeys_ssh.cache import SSHKeyCache
+from xkeys_ssh.pair import SSHKeyAlgo
+from xkeys_ssh.pair import SSHKeyAttr
+from xkeys_ssh.pair import SSHKeyPair
+from xkeys_ssh.ring import SSHKeyRing
+
+
+class SSHKeyStore(SSHKeyBackend):
+    """SSH key pairs stored in a single SQLite database file"""
+    SCHEMA: str = """
+        CREATE TABLE IF NOT EXISTS sshkeys (
+            name TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL UNIQUE,
+            comment TEXT NOT NULL,
+            algo TEXT NOT NULL,
+            bits INTEGER NOT NULL,
+            public TEXT NOT NULL,
+            private TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sshkeys_comment ON sshkeys (comment);
+        CREATE INDEX IF NOT EXISTS sshkeys_algo ON sshkeys (algo);
+    """
+
+    def __init__(self, path: str, cache: Optional[SSHKeyCache] = None,
+                 compact: bool = False):
+        super().__init__(cache=cache, compact=compact)
+        self.__conn: Optional[sqlite3.Connection] = None
+        self.__lock: RLock = RLock()
+        self.__path: str = path
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sshkeys").fetchone()[0]  # noqa:E501
+
+    def __iter__(self) -> Iterator[str]:
+        with self.__lock:
+            names = self.conn.execute("SELECT name FROM sshkeys ORDER BY name").fetchall()  # noqa:E501
+        return iter([row[0] for row in names])
+
+    def __contains__(self, name: str) -> bool:
+        with self.__lock:
+            return self.conn.execute("SELECT 1 FROM sshkeys WHERE name = ?", (name,)).fetchone() is not None  # noqa:E501
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self.__conn is None:
+            makedirs(dirname(abspath(self.path)), mode=0o700, exist_ok=True)
+            self.__conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.__conn.executescript(self.SCHEMA)
+        return self.__conn
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__conn is not None:
+                self.__conn.close()
+                self.__conn = None
+
+    def query(self, algo: Optional[SSHKeyAlgo] = None,
+              comment: Optional[str] = None) -> List[str]:
+        """Names of SSH key pairs with the algorithm and/or comment"""
+        clauses: List[str] = []
+        values: List[str] = []
+        if algo is not None:
+            clauses.append("algo = ?")
+            values.append(algo)
+        if comment is not None:
+            clauses.append("comment = ?")
+            values.append(comment)
+        where: str = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.__lock:
+            rows = self.conn.execute(f"SELECT name FROM sshkeys{where} ORDER BY name", values).fetchall()  # noqa:E501
+        return [row[0] for row in rows]
+
+    def attributes(self, name: str) -> SSHKeyAttr:
+        """Attributes of SSH key pair without loading the private key"""
+        with self.__lock:
+            row = self.conn.execute("SELECT bits, fingerprint, comment, algo FROM sshkeys WHERE name = ?", (name,)).fetchone()  # noqa:E501
+        if row is None:
+            raise FileNotFoundError(f"sshkey '{name}' not exists")
+        return row[0], row[1], row[2], row[3]
+
+    def public(self, name: str) -> str:
+        with self.__lock:
+            row = self.conn.execute("SELECT public FROM sshkeys WHERE name = ?", (name,)).fetchone()  # noqa:E501
+        if row is None:
+            raise FileNotFoundError(f"sshkey '{name}' not exists")
+        return row[0]
+
+    def stamp(self, name: str) -> str:
+        with self.__lock:
+            row = self.conn.execute("SELECT fingerprint FROM sshkeys WHERE name = ?", (name,)).fetchone()  # noqa:E501
+        if row is None:
+            raise FileNotFoundError(f"sshkey '{name}' not exists")
+        return row[0]
+
+    def seek(self, fingerprint: str) -> Optional[str]:
+        with self.__lock:
+            row = self.conn.execute("SELECT name FROM sshkeys WHERE fingerprint = ?", (fingerprint,)).fetchone()  # noqa:E501
+        return row[0] if row is not None else None
+
+    def dump(self, name: str, pair: SSHKeyPair) -> SSHKeyPair:
+        with self.__lock:
+            if (key := self.seek(pair.fingerprint)) is not None:
+                raise FileExistsError(f"Same fingerprint as SSH key pair '{key}'")  # noqa:E501
+            if name in self:
+                raise FileExistsError(f"SSH key pair '{name}' already exists")
+            with self.conn:
+                self.conn.execute("INSERT INTO sshkeys VALUES (?, ?, ?, ?, ?, ?, ?)",  # noqa:E501
+                                  (name, pair.fingerprint, pair.comment, pair.algo,  # noqa:E501
+                                   pair.bits, pair.public, pair.private))
+        self.cache.put(name, pair)
+        return pair
+
+    def load(self, name: str) -> SSHKeyPair:
+        with self.__lock:
+            row = self.conn.execute("SELECT bits, fingerprint, comment, algo, public, private FROM sshkeys WHERE name = ?", (name,)).fetchone()  # noqa:E501
+        if row is None:
+            raise FileNotFoundError(f"sshkey '{name}' not exists")
+        return SSHKeyPair(private=row[5], public=row[4], attributes=(row[0], row[1], row[2], row[3]), compact=self.compact)  # noqa:E501
+
+    def remove(self, name: str) -> bool:
+        self.cache.delete(name)
+        with self.__lock, self.conn:
+            self.conn.execute("DELETE FROM sshkeys WHERE name = ?", (name,))
+        return name not in self
+
+    def rename(self, origin: str, target: str) -> bool:
+        self.cache.delete(origin)
+        with self.__lock:
+            if origin not in self or target in self:
+                return False
+            with self.conn:
+                self.conn.execute("UPDATE sshkeys SET name = ? WHERE name = ?", (target, origin))  # noqa:E501
+        return True
+
+    def update(self, name: str, private: str) -> None:
+        if not (value := SSHKeyPair(private=private)):
+            raise ValueError("invalid private key")  # pragma: no cover
+
+        with self.__lock:
+            if name not in self:
+                raise FileNotFoundError(f"sshkey '{name}' not exists")
+            if (key := self.seek(value.fingerprint)) is not None:
+                raise FileExistsError(f"Same fingerprint as SSH key pair '{key}'")  # noqa:E501
+            with self.conn:
+                self.conn.execute("UPDATE sshkeys SET fingerprint = ?, comment = ?, algo = ?, bits = ?, public = ?, private = ? WHERE name = ?",  # noqa:E501
+                                  (value.fingerprint, value.comment, value.algo,  # noqa:E501
+                                   value.bits, value.public, value.private, name))  # noqa:E501
+        self.cache.put(name, value)
+
+    def import_ring(self, ring: SSHKeyRing) -> int:
+        """Import SSH key pairs from a tar-per-key ring
+
+        Existing names and fingerprints are skipped, return the number of
+        SSH key pairs imported.
+        """
+        imported: int = 0
+        for name in ring:
+            if name in self or self.seek((pair := ring.load(name)).fingerprint) is not None:  # noqa:E501
+                continue
+            self.dump(name, pair)
+            imported += 1
+        return imported
+
+    def export_ring(self, ring: SSHKeyRing) -> int:
+        """Export SSH key pairs to a tar-per-key ring
+
+        Existing names and fingerprints are skipped, return the number of
+        SSH key pairs exported.
+        """
+        exported: int = 0
+        for name in self:
+            if name in ring or ring.seek((pair := self.load(name)).fingerprint) is not None:  # noqa:E501
+                continue
+            ring.dump(name, pair)
+            exported += 1
+        return exported
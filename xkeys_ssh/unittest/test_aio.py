@@ -0,0 +1,69 @@
+# coding:utf-8
+
+from asyncio import gather
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase
+from unittest import main
+from unittest import mock
+
+from xkeys_ssh import aio
+from xkeys_ssh import reservoir
+
+
+class TestAsyncSSHKeyRing(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_concurrency(self):
+        self.assertRaises(ValueError, aio.AsyncSSHKeyRing, aio.SSHKeyRing(self.temp.name), concurrency=0)  # noqa:E501
+
+    async def test_pair(self):
+        item = await aio.SSHKeyPair.agenerate(algo="ed25519", comment="async key")  # noqa:E501
+        self.assertEqual(item.comment, "async key")
+        await item.adump(path := join(self.temp.name, "demo.tar"))
+        self.assertEqual((await aio.SSHKeyPair.aload(path)).private, item.private)  # noqa:E501
+        self.assertEqual((await aio.SSHKeyPair.aload(path, lazy=True)).attributes, item.attributes)  # noqa:E501
+
+    async def test_all_in_one(self):
+        async with aio.AsyncSSHKeyRing(aio.SSHKeyRing(self.temp.name), concurrency=2) as keys:  # noqa:E501
+            self.assertEqual(keys.concurrency, 2)
+            names = await gather(*[keys.generate(algo="ed25519") for _ in range(4)])  # noqa:E501
+            self.assertEqual(sorted(await keys.names()), sorted(names))
+            self.assertEqual(await keys.length(), 4)
+            self.assertTrue(await keys.contains(name := names[0]))
+            self.assertIsInstance(item := await keys.get(name), aio.SSHKeyPair)
+            self.assertEqual((await keys.load(name)).private, item.private)
+            self.assertEqual(await keys.attributes(name), item.attributes)
+            self.assertEqual(len(await keys.inventory()), 4)
+            self.assertEqual(await keys.seek(item.fingerprint), name)
+            with self.assertRaises(FileExistsError):
+                await keys.dump("test", item)
+            with self.assertRaises(FileExistsError):
+                await keys.create(item.private)
+            self.assertIsNone(await keys.update(name, aio.SSHKeyPair.generate(algo="ed25519").private))  # noqa:E501
+            self.assertTrue(await keys.rename(name, "test"))
+            self.assertTrue(await keys.remove("test"))
+            self.assertIsInstance(await keys.create(aio.SSHKeyPair.generate(algo="ed25519").private, "new"), str)  # noqa:E501
+            self.assertEqual(await keys.length(), 4)
+
+    async def test_reservoir(self):
+        ring = aio.SSHKeyRing(self.temp.name)
+        # no refill thread, the reservoir holds exactly one key pair
+        with mock.patch.object(reservoir.SSHKeyReservoir, "start"):
+            pool = ring.reserve(low=1, high=1, specs=[("ed25519", None)])
+        self.assertFalse(pool.running)
+        self.assertEqual(pool.refill("ed25519"), 1)
+        async with aio.AsyncSSHKeyRing(ring) as keys:
+            self.assertEqual(await keys.generate(algo="ed25519", name="a"), "a")  # noqa:E501
+            self.assertEqual(await keys.generate(algo="ed25519", name="b"), "b")  # noqa:E501
+        self.assertEqual(pool.stats, {"hits": 1, "misses": 1})
+        self.assertEqual(sorted(ring), ["a", "b"])
+
+
+if __name__ == "__main__":
+    main()
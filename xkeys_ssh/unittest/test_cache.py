@@ -0,0 +1,69 @@
+# coding:utf-8
+
+from time import sleep
+from unittest import TestCase
+from unittest import main
+
+from xkeys_ssh import cache
+
+
+class TestSSHKeyCache(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pairs = [cache.SSHKeyPair.generate(algo="ed25519") for _ in range(3)]  # noqa:E501
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_entries(self):
+        item = cache.SSHKeyCache(entries=2)
+        item.put("a", self.pairs[0])
+        item.put("b", self.pairs[1])
+        self.assertIs(item.get("a"), self.pairs[0])
+        item.put("c", self.pairs[2])
+        self.assertEqual(list(item), ["a", "c"])
+        self.assertNotIn("b", item)
+        self.assertRaises(cache.CacheMiss, item.get, "b")
+        self.assertEqual(item.stats, {"hits": 1, "misses": 1, "evictions": 1,
+                                      "expirations": 0, "entries": 2,
+                                      "bytes": item.bytes})
+
+    def test_size(self):
+        size = cache.SSHKeyCache.sizeof(self.pairs[0])
+        item = cache.SSHKeyCache(size=size + 1)
+        self.assertEqual(item.size, size + 1)
+        item.put("a", self.pairs[0])
+        item.put("a", self.pairs[0])
+        self.assertEqual(item.bytes, size)
+        item.put("b", self.pairs[1])
+        self.assertEqual(len(item), 1)
+        self.assertIn("b", item)
+        item.delete("b")
+        self.assertEqual(item.bytes, 0)
+
+    def test_lifetime(self):
+        item = cache.SSHKeyCache(lifetime=0.01)
+        self.assertEqual(item.lifetime, 0.01)
+        self.assertEqual(item.entries, 0)
+        item.put("a", self.pairs[0])
+        item.put("b", self.pairs[1])
+        sleep(0.02)
+        self.assertNotIn("a", item)
+        self.assertRaises(cache.CacheMiss, item.get, "b")
+        self.assertEqual(item.stats["expirations"], 2)
+        item.put("c", self.pairs[2])
+        item.clear()
+        self.assertEqual(len(item), 0)
+        self.assertEqual(item.bytes, 0)
+
+
+if __name__ == "__main__":
+    main()
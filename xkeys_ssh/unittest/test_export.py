@@ -0,0 +1,72 @@
+# coding:utf-8
+
+from io import StringIO
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from xkeys_ssh import export
+
+
+class TestSSHKeyExporter(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+        self.ring = export.SSHKeyRing(join(self.temp.name, "ring"))
+        self.ring.generate(algo="ed25519", name="web-1", comment="web 1")
+        self.ring.generate(algo="ed25519", name="web-2")
+        self.ring.generate(algo="ed25519", name="db-1")
+        self.ring.cache.clear()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_write(self):
+        exporter = export.SSHKeyExporter(self.ring)
+        self.assertEqual(exporter.write(whdl := StringIO()), 3)
+        self.assertEqual(whdl.getvalue().splitlines(), [self.ring.public(name) for name in ("db-1", "web-1", "web-2")])  # noqa:E501
+        self.assertEqual(len(self.ring.cache), 0)
+        self.assertTrue(whdl.getvalue().splitlines()[1].endswith(" web 1"))
+
+    def test_options(self):
+        exporter = export.SSHKeyExporter(self.ring, options="no-pty", comment="{name}@xkeys", patterns=["web-*"])  # noqa:E501
+        self.assertEqual(exporter.patterns, ("web-*",))
+        self.assertEqual(exporter.select(), ["web-1", "web-2"])
+        self.assertEqual(exporter.write(whdl := StringIO()), 2)
+        fields = whdl.getvalue().splitlines()[0].split()
+        self.assertEqual(fields[0], "no-pty")
+        self.assertEqual(fields[1:3], self.ring.public("web-1").split()[:2])
+        self.assertEqual(fields[3], "web-1@xkeys")
+        exporter = export.SSHKeyExporter(self.ring, comment="")
+        self.assertEqual(exporter.line("web-1"), " ".join(self.ring.public("web-1").split()[:2]))  # noqa:E501
+
+    def test_export(self):
+        exporter = export.SSHKeyExporter(self.ring, patterns=["web-*"])
+        self.assertTrue(exporter.export(path := join(self.temp.name, "authorized_keys")))  # noqa:E501
+        with open(path, "r", encoding="utf-8") as rhdl:
+            lines = rhdl.read().splitlines()
+        self.assertTrue(lines[0].startswith(exporter.HEADER))
+        self.assertEqual(len(lines), 3)
+        self.assertFalse(exporter.export(path))
+        self.ring.generate(algo="ed25519", name="db-2")
+        self.assertFalse(exporter.export(path))
+        private = self.ring.load("db-2").private
+        self.assertTrue(self.ring.remove("db-2"))
+        self.ring.update("web-2", private)
+        self.assertTrue(exporter.export(path))
+        self.assertTrue(self.ring.rename("web-1", "web-3"))
+        self.assertTrue(exporter.export(path))
+        self.assertTrue(export.SSHKeyExporter(self.ring, patterns=["web-*"], options="no-pty").export(path))  # noqa:E501
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# coding:utf-8
+
+from os.path import isdir
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from xkeys_ssh import index
+
+
+class TestSSHKeyIndex(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_not_exists(self):
+        item = index.SSHKeyIndex(join(self.temp.name, "test"))
+        self.assertIsNone(item.load(names=[], fetch=str))
+        self.assertIsNone(item.put("demo", "SHA256:demo"))
+        self.assertEqual(item.get("SHA256:demo"), "demo")
+        self.assertFalse(isdir(join(self.temp.name, "test")))
+
+    def test_journal(self):
+        item = index.SSHKeyIndex(self.temp.name)
+        self.assertFalse(item.loaded)
+        self.assertIsNone(item.load(names=["a"], fetch=lambda name: f"SHA256:{name}"))  # noqa:E501
+        self.assertTrue(item.loaded)
+        self.assertEqual(item.get("SHA256:a"), "a")
+        item.put("b", "SHA256:b")
+        item.rename("b", "c")
+        item.rename("b", "d")
+        item.put("c", "SHA256:c")
+        item.delete("a")
+        item.delete("a")
+        self.assertEqual(list(item), ["c"])
+        self.assertEqual(item.fingerprint("c"), "SHA256:c")
+        self.assertIsNone(item.get("SHA256:a"))
+        self.assertIsNone(item.get("SHA256:b"))
+        with open(item.path, "a", encoding="utf-8") as whdl:
+            whdl.write("[\"corrupted\"]\n[\"broken\", ")
+
+        again = index.SSHKeyIndex(self.temp.name)
+        again.load(names=["c", "e"], fetch=lambda name: f"SHA256:{name}")
+        self.assertEqual(len(again), 2)
+        self.assertIn("c", again)
+        self.assertIn("e", again)
+        self.assertEqual(again.get("SHA256:e"), "e")
+        with open(again.path, "r", encoding="utf-8") as rhdl:
+            self.assertEqual(len(rhdl.readlines()), 2)
+
+        again.load(names=["e"], fetch=lambda name: f"SHA256:{name}")
+        self.assertEqual(list(again), ["e"])
+        again.refresh("f", "SHA256:e")  # renamed by another process
+        self.assertEqual(list(again), ["f"])
+        self.assertEqual(again.get("SHA256:e"), "f")
+
+    def test_sync(self):
+        first = index.SSHKeyIndex(self.temp.name)
+        second = index.SSHKeyIndex(self.temp.name)  # another process
+        self.assertFalse(first.sync())
+        first.load(names=[], fetch=str)
+        second.load(names=[], fetch=str)
+        self.assertFalse(first.sync())
+        first.put("a", "SHA256:a")
+        self.assertTrue(second.sync())
+        self.assertEqual(second.get("SHA256:a"), "a")
+        self.assertFalse(second.sync())
+        with open(first.path, "a", encoding="utf-8") as whdl:
+            whdl.write("[\"b\", \"SHA256:b\"]")  # partially written
+        self.assertTrue(second.sync())
+        self.assertNotIn("b", second)
+        with open(first.path, "a", encoding="utf-8") as whdl:
+            whdl.write("\n")
+        self.assertTrue(second.sync())
+        self.assertEqual(second.fingerprint("b"), "SHA256:b")
+        first.delete("a")
+        first.compact()
+        self.assertTrue(second.sync())
+        self.assertEqual(list(second), [])
+        self.assertFalse(first.sync())
+        second.put("c", "SHA256:c")
+        self.assertTrue(first.sync())
+        self.assertEqual(first.get("SHA256:c"), "c")
+
+
+if __name__ == "__main__":
+    main()
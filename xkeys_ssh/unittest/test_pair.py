@@ -1,5 +1,6 @@
 # coding:utf-8
 
+import tarfile
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest import main
@@ -47,6 +48,21 @@ class TestSSHKeyPair(TestCase):
         self.assertEqual(str(item), item.fingerprint)
         self.assertEqual(item.bits, 1024)
 
+    def test_generate_comment(self):
+        item = ring.SSHKeyPair.generate(algo="dsa", comment="unit test; $HOME")
+        self.assertEqual(item.comment, "unit test; $HOME")
+        self.assertTrue(item)
+
+    def test_extract_many(self):
+        ed25519 = ring.SSHKeyPair.generate(algo="ed25519", comment="a b")
+        dsa = ring.SSHKeyPair.generate(algo="dsa", comment="c d")
+        anonymous = " ".join(dsa.public.split()[:2])
+        self.assertEqual(ring.SSHKeyPair.extract_many([]), [])
+        self.assertEqual(ring.SSHKeyPair.extract_many([ed25519.public, "invalid", dsa.public, anonymous]),  # noqa:E501
+                         [ed25519.attributes, None, dsa.attributes,
+                          (1024, dsa.fingerprint, "no comment", "dsa")])
+        self.assertEqual(ring.SSHKeyPair.extract(anonymous)[2], "no comment")
+
     def test_generate_type_error(self):
         self.assertRaises(ValueError, ring.SSHKeyPair.generate, algo="RSA")
 
@@ -62,6 +78,39 @@ class TestSSHKeyPair(TestCase):
 
     def test_load(self):
         self.assertRaises(FileNotFoundError, ring.SSHKeyPair.load, "test")
+        item = ring.SSHKeyPair.generate(algo="ed25519")
+        with TemporaryDirectory() as temp:
+            item.dump(path := ring.join(temp, "demo"))
+            with tarfile.open(path, "r") as thdl:
+                self.assertEqual({i.name: i.mode for i in thdl.getmembers()},
+                                 {"attributes.txt": 0o644, "key.pub": 0o644, "key": 0o600})  # noqa:E501
+            self.assertIsInstance(load := ring.SSHKeyPair.load(path), ring.SSHKeyPair)  # noqa:E501
+            self.assertEqual(load.private, item.private)
+            self.assertEqual(load.public, item.public)
+            self.assertEqual(load.attributes, item.attributes)
+            self.assertTrue(load)
+            self.assertEqual(ring.SSHKeyPair.peek(path), item.attributes)
+            lazy = ring.SSHKeyPair.load(path, lazy=True)
+            self.assertEqual(lazy.attributes, item.attributes)
+            self.assertEqual(lazy.public, item.public)
+            self.assertEqual(lazy.private, item.private)
+            self.assertTrue(lazy)
+            self.assertRaises(FileNotFoundError, ring.SSHKeyPair.load, "test", lazy=True)  # noqa:E501
+
+    def test_compact(self):
+        item = ring.SSHKeyPair.generate(algo="ed25519")
+        self.assertFalse(hasattr(item, "__dict__"))
+        self.assertFalse(item.compact)
+        with TemporaryDirectory() as temp:
+            item.dump(path := ring.join(temp, "demo"))
+            for lazy in (False, True):
+                load = ring.SSHKeyPair.load(path, lazy=lazy, compact=True)
+                self.assertTrue(load.compact)
+                self.assertEqual(load.private, item.private)
+                self.assertEqual(load.private, item.private)
+                self.assertEqual(load.public, item.public)
+                self.assertLess(load.nbytes, item.nbytes)
+                self.assertTrue(load)
 
 
 if __name__ == "__main__":
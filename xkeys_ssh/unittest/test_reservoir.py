@@ -0,0 +1,72 @@
+# coding:utf-8
+
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import TestCase
+from unittest import main
+
+from xkeys_ssh import reservoir
+from xkeys_ssh import ring
+
+
+class TestSSHKeyReservoir(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_watermarks(self):
+        self.assertRaises(ValueError, reservoir.SSHKeyReservoir, self.temp.name, low=0)  # noqa:E501
+        self.assertRaises(ValueError, reservoir.SSHKeyReservoir, self.temp.name, low=3, high=2)  # noqa:E501
+
+    def test_claim(self):
+        pool = reservoir.SSHKeyReservoir(self.temp.name, low=1, high=2)
+        self.assertRaises(ValueError, pool.claim, "test", algo="RSA")
+        self.assertIsNone(pool.claim(reservoir.join(self.temp.name, "a.tar"), algo="ed25519"))  # noqa:E501
+        self.assertEqual(pool.stats, {"hits": 0, "misses": 1})
+        self.assertEqual(pool.refill(algo="ed25519"), 2)
+        self.assertEqual(pool.count(algo="ed25519"), 2)
+        with open(reservoir.join(pool.folder("ed25519"), "0.tar.tmp"), "w", encoding="utf-8"):  # noqa:E501
+            pass
+        self.assertIsInstance(pool.claim(target := reservoir.join(self.temp.name, "a.tar"), algo="ed25519"), ring.SSHKeyPair)  # noqa:E501
+        self.assertEqual(pool.count(algo="ed25519"), 1)
+        self.assertRaises(FileExistsError, pool.claim, target, algo="ed25519")
+        self.assertEqual(pool.count(algo="ed25519"), 1)
+        self.assertEqual(pool.stats, {"hits": 1, "misses": 1})
+
+    def test_ring(self):
+        keys = ring.SSHKeyRing(self.temp.name)
+        self.assertIsNone(keys.reservoir)
+        pool = keys.reserve(low=1, high=1, specs=[("ecdsa", 128), ("ed25519", None)])
+        self.assertIs(keys.reserve(), pool)
+        self.assertTrue(pool.running)
+        for _ in range(300):
+            if pool.count("ed25519") >= pool.high:
+                break
+            sleep(0.1)
+        self.assertEqual(pool.count("ed25519"), 1)
+        self.assertIsInstance(name := keys.generate(algo="ed25519"), str)
+        self.assertEqual(pool.hits, 1)
+        self.assertEqual(keys.seek(keys[name].fingerprint), name)
+        self.assertEqual(list(keys), [name])
+        self.assertIsInstance(keys.generate(algo="ed25519", comment="test"), str)  # noqa:E501
+        self.assertEqual(pool.hits, 1)
+        pool.stop()
+        self.assertFalse(pool.running)
+        self.assertIsInstance(keys.generate(algo="ecdsa"), str)
+        self.assertEqual(pool.misses, 1)
+        self.assertEqual(pool.refill("ecdsa"), 0)
+
+
+if __name__ == "__main__":
+    main()
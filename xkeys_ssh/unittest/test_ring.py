@@ -1,10 +1,18 @@
 # coding:utf-8
 
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir
+from os import makedirs
+from os.path import dirname
+from os.path import isfile
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest import main
+from unittest import mock
 
 from xkeys_ssh import ring
+from xkeys_util.metrics import Metrics
+from xkeys_util.metrics import MetricsCollector
 
 
 class TestSSHKeyRing(TestCase):
@@ -44,6 +52,203 @@ class TestSSHKeyRing(TestCase):
             del keys["test"]
             self.assertEqual(len(keys), 0)
 
+    def test_generate_many(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp)
+            results = keys.generate_many([{"algo": "ed25519", "name": "a"},
+                                          {"algo": "ecdsa", "comment": "b"},
+                                          {"algo": "RSA", "name": "c"}],
+                                         workers=2)
+            self.assertEqual(set(results), {"a", "b", "c"})
+            self.assertIsInstance(results["a"], ring.SSHKeyPair)
+            self.assertIsInstance(results["b"], ring.SSHKeyPair)
+            self.assertIsInstance(results["c"], ValueError)
+            self.assertEqual(keys["b"].comment, "b")
+            self.assertEqual(sorted(keys), ["a", "b"])
+            self.assertRaises(ValueError, keys.generate_many, [{"name": "a"}, {"name": "a"}])  # noqa:E501
+
+    def test_cache(self):
+        collector = MetricsCollector()
+        Metrics.register(collector)
+        self.addCleanup(Metrics.unregister, collector)
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp, cache=ring.SSHKeyCache(entries=1))
+            self.assertIsInstance(a := keys.generate(algo="ed25519"), str)
+            self.assertIsInstance(b := keys.generate(algo="ed25519"), str)
+            self.assertEqual(list(keys.cache), [b])
+            self.assertIsInstance(keys[a], ring.SSHKeyPair)
+            self.assertIsInstance(keys[a], ring.SSHKeyPair)
+            self.assertEqual(keys.cache.stats["misses"], 1)
+            self.assertEqual(keys.cache.stats["hits"], 1)
+            self.assertEqual(keys.cache.stats["evictions"], 2)
+            self.assertEqual(collector.counter("ssh.ring.cache", result="miss"), 1)  # noqa:E501
+            self.assertEqual(collector.counter("ssh.ring.cache", result="hit"), 1)  # noqa:E501
+
+    def test_compact(self):
+        with TemporaryDirectory() as temp:
+            self.assertIsInstance(name := ring.SSHKeyRing(temp).generate(algo="ed25519"), str)  # noqa:E501
+            keys = ring.SSHKeyRing(temp, compact=True)
+            self.assertTrue(keys.compact)
+            self.assertTrue(keys[name].compact)
+            self.assertTrue(keys[name])
+
+    def test_inventory(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp)
+            self.assertIsInstance(name := keys.generate(algo="ed25519", name="a"), str)  # noqa:E501
+            attributes = keys[name].attributes
+            self.assertEqual(ring.SSHKeyRing(temp).attributes(name), attributes)  # noqa:E501
+            self.assertEqual(keys.attributes(name), attributes)
+            self.assertEqual(list(ring.SSHKeyRing(temp).inventory()), [(name, attributes)])  # noqa:E501
+
+    def test_scan(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(ring.join(temp, "keys"))
+            self.assertEqual(len(keys), 0)
+            self.assertNotIn("a", keys)
+            ring.SSHKeyPair.generate(algo="ed25519").dump(ring.join(temp, "keys", "a.tar"))  # noqa:E501
+            self.assertIs(keys.scan(keys.base), keys.scan(keys.base))
+            self.assertEqual(list(keys), ["a"])
+            self.assertIn("a", keys)
+            makedirs(ring.join(temp, "keys", "b.tar"))
+            self.assertEqual(len(keys), 1)
+            self.assertIsInstance(keys.generate(algo="ed25519", name="c"), str)
+            self.assertEqual(sorted(keys), ["a", "c"])
+
+    def test_shard(self):
+        self.assertRaises(ValueError, ring.SSHKeyRing, shard=5)
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(ring.join(temp, "keys"), shard=2)
+            self.assertEqual(len(keys), 0)
+            self.assertEqual(list(keys.folders()), [])
+            self.assertIsInstance(keys.generate(algo="ed25519", name="a"), str)  # noqa:E501
+            self.assertIsInstance(keys.generate(algo="ed25519", name="b"), str)  # noqa:E501
+            self.assertEqual(dirname(keys.join("a")), keys.folder("a"))
+            self.assertEqual(len(keys.folder("a")), len(keys.base) + 3)
+            self.assertEqual(sorted(keys), ["a", "b"])
+            self.assertEqual(keys.scan(), {"a", "b"})
+            self.assertIn("a", keys)
+            self.assertTrue(keys.rename("b", "c"))
+            self.assertEqual(sorted(keys), ["a", "c"])
+            self.assertTrue(isfile(keys.join("c")))
+            self.assertEqual(keys.migrate(2), 0)
+            self.assertEqual(keys.migrate(0), 2)
+            self.assertEqual(sorted(i for i in listdir(keys.base) if not i.startswith(".")), ["a.tar", "c.tar"])  # noqa:E501
+            self.assertEqual(sorted(ring.SSHKeyRing(keys.base)), ["a", "c"])
+            self.assertEqual(keys.migrate(1), 2)
+            self.assertEqual(sorted(ring.SSHKeyRing(keys.base, shard=1)), ["a", "c"])  # noqa:E501
+            self.assertEqual(len(ring.SSHKeyRing(keys.base)), 0)
+            self.assertTrue(keys.remove("a"))
+            self.assertEqual(len(keys), 1)
+            self.assertIsInstance(keys["c"], ring.SSHKeyPair)
+
+    def test_seek(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp)
+            self.assertIsInstance(name := keys.generate(algo="ed25519"), str)
+            self.assertEqual(keys.seek(fingerprint := keys[name].fingerprint), name)  # noqa:E501
+            self.assertEqual(ring.SSHKeyRing(temp).seek(fingerprint), name)
+            ring.remove(keys.index.path)
+            with mock.patch.object(ring.SSHKeyRing, "load", side_effect=AssertionError("private key loaded")):  # noqa:E501
+                self.assertEqual(ring.SSHKeyRing(temp).seek(fingerprint), name)  # noqa:E501
+            keys.refresh()
+            self.assertNotIn(name, keys.cache)
+            self.assertEqual(keys.seek(fingerprint), name)
+            ring.remove(keys.join(name))
+            self.assertIsNone(keys.seek(fingerprint))
+            self.assertNotIn(name, keys.index)
+
+    def test_verify_all(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp)
+            self.assertEqual(keys.verify_all(), {})
+            keys.generate(algo="ed25519", name="a")
+            keys.generate(algo="dsa", name="b")
+            other = ring.SSHKeyPair.generate(algo="ed25519")
+            item = ring.SSHKeyPair(private=other.private, public=other.public,
+                                   attributes=(256, "SHA256:forged", "c", "ed25519"))  # noqa:E501
+            item.dump(keys.join("c"))
+            with open(keys.join("d"), "w", encoding="utf-8") as whdl:
+                whdl.write("broken")
+            self.assertEqual(keys.public("a"), keys["a"].public)
+            self.assertEqual(ring.SSHKeyRing(temp).public("b"), keys["b"].public)  # noqa:E501
+            self.assertEqual(ring.SSHKeyRing(temp).verify_all(), {"a": True, "b": True, "c": False, "d": False})  # noqa:E501
+
+    def test_audit(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp)
+            self.assertEqual(list(keys.audit()), [])
+            keys.generate(algo="ed25519", name="a")
+            keys.generate(algo="dsa", name="b")
+            other = ring.SSHKeyPair.generate(algo="ed25519")
+            ring.SSHKeyPair(private=keys["a"].private, public=other.public,
+                            attributes=other.attributes).dump(keys.join("c"))
+            ring.SSHKeyPair(private=other.private, public=other.public,
+                            attributes=(256, "SHA256:forged", "d", "ed25519")).dump(keys.join("d"))  # noqa:E501
+            with open(keys.join("e"), "w", encoding="utf-8") as whdl:
+                whdl.write("broken")
+            results = {name: (ok, reason) for name, ok, reason in keys.audit(workers=2)}  # noqa:E501
+            self.assertEqual(results["a"], (True, ""))
+            self.assertEqual(results["b"], (True, ""))
+            self.assertEqual(results["c"], (False, "public key does not match private key"))  # noqa:E501
+            self.assertEqual(results["d"], (False, "attributes do not match public key"))  # noqa:E501
+            self.assertFalse(results["e"][0])
+            self.assertTrue(results["e"][1].startswith("failed to load: "))
+
+    def test_update(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp)
+            other = ring.SSHKeyRing(temp)  # another process
+            keys.generate(algo="ed25519", name="a")
+            keys.generate(algo="ed25519", name="b")
+            item = ring.SSHKeyPair.generate(algo="ed25519")
+            self.assertRaises(FileNotFoundError, keys.update, "c", item.private)  # noqa:E501
+            self.assertRaises(FileExistsError, other.update, "a", keys["b"].private)  # noqa:E501
+            self.assertRaises(FileExistsError, other.dump, "a", item)
+            self.assertIsNone(other.update("a", item.private))
+            self.assertEqual(sorted(listdir(temp)), [".fingerprints", ".fingerprints.lock", ".locks", "a.tar", "b.tar"])  # noqa:E501
+            self.assertEqual(keys.seek(item.fingerprint), "a")
+            self.assertRaises(FileExistsError, keys.dump, "c", item)
+            self.assertEqual(ring.SSHKeyRing(temp)["a"].fingerprint, item.fingerprint)  # noqa:E501
+
+    def test_lock(self):
+        with TemporaryDirectory() as temp:
+            keys = ring.SSHKeyRing(temp, shard=1)
+            self.assertIs(item := keys.lock("a"), keys.lock("a"))
+            self.assertEqual(dirname(item.path), ring.join(keys.folder("a"), keys.LOCKDIR))  # noqa:E501
+            del item
+            keys.generate(algo="ed25519", name="a")
+            keys.generate(algo="ed25519", name="b")
+            self.assertTrue(isfile(path := keys.lock("a").path))
+            self.assertTrue(keys.rename("a", "c"))
+            self.assertFalse(isfile(path))
+            self.assertTrue(isfile(path := keys.lock("b").path))
+            self.assertTrue(keys.remove("b"))
+            self.assertFalse(isfile(path))
+            self.assertEqual(keys.migrate(0), 1)
+            self.assertEqual(sorted(listdir(temp)), [".fingerprints", ".fingerprints.lock", "c.tar"])  # noqa:E501
+
+    def test_concurrent(self):
+        items = [ring.SSHKeyPair.generate(algo="ed25519") for _ in range(5)]
+        with TemporaryDirectory() as temp:
+            rings = [ring.SSHKeyRing(temp) for _ in range(4)]
+
+            def dump(index: int) -> int:
+                rings[index].dump(f"unique-{index}", items[index])
+                try:  # only one ring can dump the same key pair
+                    rings[index].dump(f"shared-{index}", items[4])
+                except FileExistsError:
+                    return 0
+                return 1
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                self.assertEqual(sum(executor.map(dump, range(4))), 1)
+            keys = ring.SSHKeyRing(temp)
+            self.assertEqual(len(keys), 5)
+            self.assertEqual(sorted(keys.seek(item.fingerprint) for item in items[:4]),  # noqa:E501
+                             ["unique-0", "unique-1", "unique-2", "unique-3"])
+            self.assertTrue(keys.seek(items[4].fingerprint).startswith("shared-"))  # noqa:E501
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+# coding:utf-8
+
+from os import listdir
+from os.path import dirname
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from xkeys_ssh import store
+
+
+class TestSSHKeyStore(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+        self.keys = store.SSHKeyStore(join(self.temp.name, "db", "keys.db"))  # noqa:E501
+
+    def tearDown(self):
+        self.keys.close()
+        self.temp.cleanup()
+
+    def test_all_in_one(self):
+        keys = self.keys
+        self.assertEqual(len(keys), 0)
+        self.assertIsInstance(name := keys.generate(algo="ed25519"), str)
+        self.assertIsInstance(item := keys[name], store.SSHKeyPair)
+        self.assertEqual(keys.seek(item.fingerprint), name)
+        self.assertEqual(keys.attributes(name), item.attributes)
+        self.assertEqual(keys.public(name), item.public)
+        self.assertEqual(keys.verify_all(), {name: True})
+        self.assertEqual(keys.stamp(name), item.fingerprint)
+        self.assertEqual(len(keys), 1)
+        self.assertRaises(FileExistsError, keys.create, item.private)
+        self.assertRaises(FileExistsError, keys.dump, name, store.SSHKeyPair.generate(algo="ed25519"))  # noqa:E501
+        self.assertRaises(FileExistsError, keys.update, name, item.private)
+        self.assertRaises(FileNotFoundError, keys.update, "unknown", item.private)  # noqa:E501
+        self.assertIsNone(keys.update(name, store.SSHKeyPair.generate(algo="ecdsa").private))  # noqa:E501
+        self.assertEqual(keys[name].algo, "ecdsa")
+        self.assertEqual(keys.query(algo="ecdsa"), [name])
+        self.assertEqual(keys.query(algo="ecdsa", comment="unknown"), [])
+        self.assertEqual(keys.query(), [name])
+        self.assertTrue(keys.rename(name, "test"))
+        self.assertFalse(keys.rename(name, "test"))
+        self.assertIsInstance(keys["test"], store.SSHKeyPair)
+        self.assertEqual(list(keys), ["test"])
+        self.assertTrue(keys.remove("test"))
+        self.assertNotIn("test", keys)
+        self.assertEqual(len(keys), 0)
+        self.assertRaises(FileNotFoundError, keys.load, "test")
+        self.assertRaises(FileNotFoundError, keys.attributes, "test")
+        self.assertRaises(FileNotFoundError, keys.public, "test")
+        self.assertRaises(FileNotFoundError, keys.stamp, "test")
+
+    def test_import_export(self):
+        ring = store.SSHKeyRing(join(self.temp.name, "ring"))
+        ring.generate(algo="ed25519", name="a")
+        ring.generate(algo="ed25519", name="b")
+        self.assertEqual(self.keys.import_ring(ring), 2)
+        self.assertEqual(self.keys.import_ring(ring), 0)
+        self.assertEqual(list(self.keys), ["a", "b"])
+        self.assertEqual(dict(self.keys.inventory()), dict(ring.inventory()))
+        self.keys.generate(algo="ed25519", name="c")
+        self.assertEqual(self.keys.export_ring(ring), 1)
+        self.assertEqual(sorted(ring), ["a", "b", "c"])
+        self.assertEqual(ring["c"].fingerprint, self.keys["c"].fingerprint)
+        self.keys.close()
+        self.assertEqual(len(store.SSHKeyStore(self.keys.path)), 3)
+
+    def test_compact(self):
+        keys = store.SSHKeyStore(self.keys.path, compact=True)
+        name = keys.generate(algo="ed25519")
+        self.assertTrue((item := keys.load(name)).compact)
+        self.assertEqual(item.private, keys[name].private)
+        self.assertFalse(self.keys.load(name).compact)
+        self.assertNotIn(".locks", listdir(dirname(keys.path)))
+        keys.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# coding:utf-8
+
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+from time import sleep
+from time import time
+from unittest import TestCase
+from unittest import main
+
+from xkeys_ssh import pair
+from xkeys_ssh import watch
+
+
+class TestSSHKeyWatcher(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def wait(self, condition, timeout: float = 5.0) -> bool:
+        deadline = time() + timeout
+        while not condition():
+            if time() > deadline:
+                return False
+            sleep(0.02)
+        return True
+
+    def test_interval_error(self):
+        self.assertRaises(ValueError, watch.SSHKeyWatcher, watch.SSHKeyRing(self.temp.name), interval=0)  # noqa:E501
+
+    def test_poll(self):
+        local = watch.SSHKeyRing(self.temp.name)
+        other = watch.SSHKeyRing(self.temp.name)  # another process
+        other.generate(algo="ed25519", name="a")
+        other.generate(algo="ed25519", name="b")
+        watcher = watch.SSHKeyWatcher(local, interval=0.05, inotify=False)
+        self.assertEqual(watcher.backend, "polling")
+        self.assertEqual(watcher.poll(), {"a", "b"})
+        self.assertEqual(watcher.poll(), set())
+        fingerprint = local["a"].fingerprint
+        self.assertEqual(local.seek(fingerprint), "a")
+        other.update("a", (item := pair.SSHKeyPair.generate(algo="ed25519")).private)  # noqa:E501
+        self.assertIn("a", local.cache)
+        self.assertIn("a", watcher.poll())
+        self.assertNotIn("a", local.cache)
+        self.assertEqual(local["a"].fingerprint, item.fingerprint)
+        self.assertIsNone(local.seek(fingerprint))
+        self.assertEqual(local.seek(item.fingerprint), "a")
+        self.assertTrue(other.remove("b"))
+        self.assertEqual(watcher.poll(), {"b"})
+        self.assertNotIn("b", local)
+        watcher.start()
+        watcher.start()
+        self.assertTrue(watcher.running)
+        self.assertIsInstance(local["a"], pair.SSHKeyPair)
+        other.update("a", pair.SSHKeyPair.generate(algo="ed25519").private)
+        self.assertTrue(self.wait(lambda: "a" not in local.cache))
+        watcher.stop()
+        self.assertFalse(watcher.running)
+
+    def test_poll_shard(self):
+        local = watch.SSHKeyRing(self.temp.name, shard=1)
+        other = watch.SSHKeyRing(self.temp.name, shard=1)
+        other.generate(algo="ed25519", name="a")
+        watcher = watch.SSHKeyWatcher(local, inotify=False)
+        self.assertEqual(watcher.poll(), {"a"})
+        self.assertIn("a", local)
+        self.assertEqual(other.migrate(0), 1)
+        self.assertEqual(watcher.poll(), {"a"})
+        self.assertNotIn("a", local)
+
+    def test_inotify(self):
+        self.assertTrue(watch.INotify.available())
+        local = watch.SSHKeyRing(self.temp.name, shard=1)
+        other = watch.SSHKeyRing(self.temp.name, shard=1)
+        other.generate(algo="ed25519", name="a")
+        watcher = watch.SSHKeyWatcher(local, interval=0.05)
+        self.assertEqual(watcher.backend, "inotify")
+        self.assertEqual(local.seek(fingerprint := local["a"].fingerprint), "a")  # noqa:E501
+        watcher.start()
+        self.assertTrue(watcher.running)
+        sleep(0.1)  # idle
+        makedirs(join(self.temp.name, "unknown"))
+        self.assertTrue(other.rename("a", "b"))
+        self.assertTrue(self.wait(lambda: "a" not in local.cache))
+        self.assertEqual(local.seek(fingerprint), "b")
+        for name in ("c", "d", "e", "f", "g", "h"):  # create shard folders
+            other.generate(algo="ed25519", name=name)
+        self.assertTrue(self.wait(lambda: all(local.seek(other[name].fingerprint) == name for name in ("c", "d", "e", "f", "g", "h"))))  # noqa:E501
+        other.migrate(0)
+        self.assertTrue(self.wait(lambda: local.seek(fingerprint) is None))
+        watcher.stop()
+        self.assertFalse(watcher.running)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# coding:utf-8
+
+import ctypes
+from os import close
+from os import makedirs
+from os import read
+from os import scandir
+from os import strerror
+from os.path import join
+from select import select
+from struct import calcsize
+from struct import unpack_from
+from threading import Event
+from threading import Thread
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from xkeys_ssh.ring import SSHKeyRing
+
+INotifyEvent = Tuple[int, int, str]  # wd, mask, name
+SSHKeyStamp = Tuple[int, int, int]  # st_ino, st_mtime_ns, st_size
+
+
+class INotify:
+    """Minimal Linux inotify binding through ctypes"""
+    IN_MODIFY: int = 0x00000002
+    IN_ATTRIB: int = 0x00000004
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_FROM: int = 0x00000040
+    IN_MOVED_TO: int = 0x00000080
+    IN_CREATE: int = 0x00000100
+    IN_DELETE: int = 0x00000200
+    IN_Q_OVERFLOW: int = 0x00004000
+    IN_IGNORED: int = 0x00008000
+    IN_ONLYDIR: int = 0x01000000
+    IN_ISDIR: int = 0x40000000
+    IN_NONBLOCK: int = 0o0004000
+    IN_CLOEXEC: int = 0o2000000
+    EVENT: str = "iIII"  # wd, mask, cookie, len
+
+    def __init__(self):
+        self.__libc = ctypes.CDLL(None, use_errno=True)
+        self.__fd: int = self.__check(self.__libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC))  # noqa:E501
+
+    @property
+    def fd(self) -> int:
+        return self.__fd
+
+    def add(self, path: str, mask: int) -> int:
+        """Watch a path, return the watch descriptor"""
+        return self.__check(self.__libc.inotify_add_watch(self.fd, path.encode(), mask))  # noqa:E501
+
+    def read(self, timeout: Optional[float] = None) -> List[INotifyEvent]:
+        """Wait for and read the pending events"""
+        if not select([self.fd], [], [], timeout)[0]:
+            return []
+
+        try:
+            data: bytes = read(self.fd, 65536)
+        except BlockingIOError:  # pragma: no cover
+            return []
+
+        events: List[INotifyEvent] = []
+        offset: int = 0
+        while offset < len(data):
+            wd, mask, _, length = unpack_from(self.EVENT, data, offset)
+            offset += calcsize(self.EVENT)
+            name: bytes = data[offset:offset + length].rstrip(b"\0")
+            events.append((wd, mask, name.decode("utf-8", "replace")))
+            offset += length
+        return events
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            close(self.fd)
+            self.__fd = -1
+
+    @classmethod
+    def available(cls) -> bool:
+        return hasattr(ctypes.CDLL(None), "inotify_init1")
+
+    @classmethod
+    def __check(cls, result: int) -> int:
+        if result < 0:
+            raise OSError(errno := ctypes.get_errno(), strerror(errno))  # noqa:E501, pragma: no cover
+        return result
+
+
+class SSHKeyWatcher:
+    """Invalidate the cached state of SSH key pairs changed by others
+
+    A background thread watches the ring directory with inotify, or polls
+    the stat of the key pair files every interval seconds where inotify is
+    not available, and drops changed names from the cache, scanned folders
+    and fingerprint index of the ring. Changes made by the ring itself are
+    also seen, the key pairs are reloaded on next access.
+    """
+    FILE_EVENTS: int = (INotify.IN_CLOSE_WRITE | INotify.IN_MOVED_FROM |
+                        INotify.IN_MOVED_TO | INotify.IN_CREATE |
+                        INotify.IN_DELETE | INotify.IN_ATTRIB |
+                        INotify.IN_MODIFY)
+
+    def __init__(self, ring: SSHKeyRing, interval: float = 1.0,
+                 inotify: Optional[bool] = None):
+        if interval <= 0:
+            raise ValueError(f"invalid interval: {interval}")
+        self.__inotify: bool = INotify.available() if inotify is None else inotify  # noqa:E501
+        self.__stamps: Dict[str, Dict[str, SSHKeyStamp]] = {}
+        self.__thread: Optional[Thread] = None
+        self.__stopped: Event = Event()
+        self.__interval: float = interval
+        self.__ring: SSHKeyRing = ring
+
+    @property
+    def ring(self) -> SSHKeyRing:
+        return self.__ring
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self.__inotify else "polling"
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background watch thread"""
+        if not self.running:
+            makedirs(self.ring.base, mode=0o700, exist_ok=True)
+            self.__stopped.clear()
+            if self.__inotify:
+                notify: INotify = INotify()
+                watches: Dict[int, str] = {notify.add(self.ring.base, self.FILE_EVENTS | INotify.IN_ONLYDIR): self.ring.base}  # noqa:E501
+                for folder in self.ring.folders():
+                    if folder != self.ring.base:
+                        watches[notify.add(folder, self.FILE_EVENTS | INotify.IN_ONLYDIR)] = folder  # noqa:E501
+                self.__thread = Thread(target=self.__watch, args=(notify, watches), name="xkeys-watcher", daemon=True)  # noqa:E501
+            else:
+                self.poll()  # baseline
+                self.__thread = Thread(target=self.__poll, name="xkeys-watcher", daemon=True)  # noqa:E501
+            self.__thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the background watch thread"""
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+            self.__thread = None
+
+    def poll(self) -> Set[str]:
+        """Compare the stat of key pair files with the last poll
+
+        Return and invalidate the names of changed SSH key pairs.
+        """
+        changed: Set[str] = set()
+        stamps: Dict[str, Dict[str, SSHKeyStamp]] = {}
+        for folder in self.ring.folders():
+            stamps[folder] = self.stamps(folder)
+            previous: Dict[str, SSHKeyStamp] = self.__stamps.get(folder, {})
+            changed.update(name for name in stamps[folder].keys() | previous.keys()  # noqa:E501
+                           if stamps[folder].get(name) != previous.get(name))  # noqa:E501
+        for folder in self.__stamps.keys() - stamps.keys():
+            changed.update(self.__stamps[folder])  # removed shard folder
+        self.__stamps = stamps
+        if changed:
+            self.ring.invalidate(*changed)
+        return changed
+
+    @classmethod
+    def stamps(cls, folder: str) -> Dict[str, SSHKeyStamp]:
+        stamps: Dict[str, SSHKeyStamp] = {}
+        try:
+            with scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".tar") and entry.is_file():
+                        stats = entry.stat()
+                        stamps[entry.name[:-4]] = (stats.st_ino, stats.st_mtime_ns, stats.st_size)  # noqa:E501
+        except FileNotFoundError:  # pragma: no cover
+            pass
+        return stamps
+
+    def __poll(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            self.poll()
+
+    def __watch(self, notify: INotify, watches: Dict[int, str]) -> None:
+        try:
+            while not self.__stopped.is_set():
+                changed: Set[str] = set()
+                for wd, mask, name in notify.read(self.interval):
+                    if mask & INotify.IN_Q_OVERFLOW:
+                        self.ring.refresh()  # pragma: no cover
+                    elif mask & INotify.IN_IGNORED:
+                        watches.pop(wd, None)
+                    elif mask & INotify.IN_ISDIR:
+                        if watches.get(wd) == self.ring.base and mask & (INotify.IN_CREATE | INotify.IN_MOVED_TO):  # noqa:E501
+                            changed.update(self.__subscribe(notify, watches, name))  # noqa:E501
+                    elif name.endswith(".tar"):
+                        changed.add(name[:-4])
+                if changed:
+                    self.ring.invalidate(*changed)
+        finally:
+            notify.close()
+
+    def __subscribe(self, notify: INotify, watches: Dict[int, str], name: str) -> Set[str]:  # noqa:E501
+        """Watch a new shard folder, return the names created before"""
+        if not self.ring.is_shard(name):
+            return set()
+
+        folder: str = join(self.ring.base, name)
+        try:
+            watches[notify.add(folder, self.FILE_EVENTS | INotify.IN_ONLYDIR)] = folder  # noqa:E501
+        except FileNotFoundError:  # pragma: no cover
+            return set()  # removed before watched
+        return set(self.stamps(folder))
@@ -0,0 +1,9 @@
+# coding:utf-8
+
+from xkeys_util.archive import Archive  # noqa:F401
+from xkeys_util.journal import JournalIndex  # noqa:F401
+from xkeys_util.lock import FileLock  # noqa:F401
+from xkeys_util.metrics import Metrics  # noqa:F401
+from xkeys_util.metrics import MetricsCollector  # noqa:F401
+from xkeys_util.runner import Command  # noqa:F401
+from xkeys_util.runner import CommandError  # noqa:F401
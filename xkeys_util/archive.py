@@ -0,0 +1,27 @@
+# coding:utf-8
+
+from io import BytesIO
+import tarfile
+from time import time
+
+
+class Archive:
+    """Members of tar archives in memory, never extracted to disk"""
+
+    @classmethod
+    def addfile(cls, thdl: tarfile.TarFile, arcname: str, data: str, mode: int = 0o400) -> None:  # noqa:E501
+        """Add a member to the archive from memory, read-only by default"""
+        content: bytes = data.encode("utf-8")
+        info: tarfile.TarInfo = tarfile.TarInfo(name=arcname)
+        info.mtime = int(time())
+        info.size = len(content)
+        info.mode = mode
+        thdl.addfile(info, BytesIO(content))
+
+    @classmethod
+    def readfile(cls, thdl: tarfile.TarFile, arcname: str) -> str:
+        """Read a member of the archive into memory"""
+        if (rhdl := thdl.extractfile(arcname)) is None:
+            raise ValueError(f"'{arcname}' is not a regular file")
+        with rhdl:
+            return rhdl.read().decode("utf-8")
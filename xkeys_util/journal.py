@@ -0,0 +1,216 @@
+# coding:utf-8
+
+from contextlib import nullcontext
+from json import dumps
+from json import loads
+from os import fstat
+from os import stat
+from os.path import isdir
+from os.path import join
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+
+from xkeys_util.lock import FileLock
+
+
+class JournalIndex:  # pylint: disable=R0902
+    """Persistent name to value index kept in an append-only journal
+
+    Each line of the journal records a name and its value as JSON (null
+    means the name has been removed). The journal is compacted when it is
+    loaded, and records appended by other processes are applied by sync().
+
+    Subclasses keep their reverse lookups in on_put(), on_delete() and
+    on_clear(), and turn a JSON value back into a value in decode().
+    lock: Held while reading or rewriting the journal, None if the caller
+    holds its own lock.
+    """
+
+    def __init__(self, base: str, filename: str, lock: Optional[FileLock] = None):  # noqa:E501
+        self.__values: Dict[str, Any] = {}
+        self.__path: str = join(base, filename)
+        self.__lock: Optional[FileLock] = lock
+        self.__loaded: bool = False
+        self.__records: int = 0
+        self.__offset: int = 0  # bytes of the journal replayed
+        self.__inode: int = 0
+        self.__base: str = base
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__values)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__values
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def loaded(self) -> bool:
+        return self.__loaded
+
+    def value(self, name: str) -> Optional[Any]:
+        return self.__values.get(name)
+
+    def put(self, name: str, value: Any) -> None:
+        self.refresh(name, value)
+        self.__append(name, value)
+
+    def delete(self, name: str) -> None:
+        if name in self or not self.loaded:  # may be indexed by others
+            self.refresh(name, None)
+            self.__append(name, None)
+
+    def refresh(self, name: str, value: Optional[Any]) -> None:
+        """Update a name in memory only
+
+        The journal already has the record, appended by another process.
+        """
+        if (origin := self.__values.pop(name, None)) is not None:
+            self.on_delete(name, origin)
+        if value is not None:
+            self.__values[name] = value
+            self.on_put(name, value)
+
+    def clear(self) -> None:
+        self.__reset()
+        self.__loaded = False
+        self.__inode = 0
+
+    def load(self, names: Iterable[str], fetch: Callable[[str], Any]) -> None:  # noqa:E501
+        """Load the journal and reconcile it with the names on disk
+
+        fetch: Called to get the value of an unindexed name.
+        """
+        self.clear()
+        self.__loaded = True
+
+        if not isdir(self.__base):
+            return
+
+        with self.__locked():
+            try:
+                with open(self.path, "rb") as rhdl:
+                    self.__inode = fstat(rhdl.fileno()).st_ino
+                    self.__offset = self.__replay(rhdl.read())
+            except FileNotFoundError:
+                pass
+
+            self.__reconcile(names, fetch)
+            if self.__records != len(self):
+                self.compact()
+
+    def reconcile(self, names: Iterable[str], fetch: Callable[[str], Any]) -> bool:  # noqa:E501
+        """Apply the names on disk changed by others to the loaded journal
+
+        Return False if the journal already indexes exactly the names.
+        """
+        if not self.loaded or not isdir(self.__base):
+            return False
+
+        with self.__locked():
+            self.sync()
+            if changed := self.__reconcile(names, fetch):
+                self.compact()
+        return changed
+
+    def sync(self) -> bool:
+        """Apply the records appended by other processes since last read
+
+        The journal is replayed from the start if another process has
+        compacted it. Return False if there is nothing new.
+        """
+        if not self.loaded:
+            return False
+
+        try:
+            stats = stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        if stats.st_ino != self.__inode or stats.st_size < self.__offset:
+            self.__reset()
+            self.__inode = stats.st_ino
+        elif stats.st_size == self.__offset:
+            return False
+
+        with open(self.path, "rb") as rhdl:
+            rhdl.seek(self.__offset)
+            self.__offset += self.__replay(rhdl.read())
+        return True
+
+    def compact(self) -> None:
+        """Rewrite the journal with one record per name"""
+        from xkits_file import SafeWrite  # pylint: disable=C0415
+        with self.__locked():
+            with SafeWrite(self.path, encoding="utf-8", truncate=True) as whdl:  # noqa:E501
+                for name, value in self.__values.items():
+                    whdl.write(f"{dumps([name, value])}\n")
+            stats = stat(self.path)
+        self.__records = len(self.__values)
+        self.__offset = stats.st_size
+        self.__inode = stats.st_ino
+
+    def decode(self, value: Any) -> Any:
+        """Value of a JSON record, raise TypeError or ValueError if invalid"""
+        return value
+
+    def on_put(self, name: str, value: Any) -> None:
+        """Called after the name is set to the value"""
+
+    def on_delete(self, name: str, value: Any) -> None:
+        """Called after the name (with the value) is removed"""
+
+    def on_clear(self) -> None:
+        """Called after all names are removed"""
+
+    def __locked(self) -> ContextManager:
+        return self.__lock if self.__lock is not None else nullcontext()
+
+    def __reset(self) -> None:
+        self.__values.clear()
+        self.on_clear()
+        self.__records = 0
+        self.__offset = 0
+
+    def __reconcile(self, names: Iterable[str], fetch: Callable[[str], Any]) -> bool:  # noqa:E501
+        existing = set(names)
+        stale = [name for name in self.__values if name not in existing]
+        for name in stale:
+            self.refresh(name, None)
+        missing = [name for name in existing if name not in self.__values]
+        for name in missing:
+            self.refresh(name, fetch(name))
+        return bool(stale or missing)
+
+    def __replay(self, data: bytes) -> int:
+        """Apply complete records, return the number of bytes consumed"""
+        consumed: int = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # partially written record, read again by sync()
+            consumed += len(line)
+            try:
+                name, value = loads(line)
+                value = None if value is None else self.decode(value)
+            except (TypeError, ValueError):
+                continue  # corrupted record
+            self.__records += 1
+            self.refresh(name, value)
+        return consumed
+
+    def __append(self, name: str, value: Optional[Any]) -> None:
+        if not isdir(self.__base):
+            return
+        with self.__locked():  # not interleaved with compaction
+            with open(self.path, "a", encoding="utf-8") as whdl:
+                whdl.write(f"{dumps([name, value])}\n")  # replayed by sync()
@@ -0,0 +1,98 @@
+# coding:utf-8
+
+import os
+from os import O_CREAT
+from os import O_RDWR
+from os import close
+from os import fstat
+from os import makedirs
+from os import open as os_open
+from os import remove
+from os import stat
+from os.path import dirname
+from threading import RLock
+
+try:
+    from fcntl import LOCK_EX
+    from fcntl import LOCK_UN
+    from fcntl import flock
+except ImportError:  # pragma: no cover
+    flock = None  # pylint: disable=C0103
+
+O_CLOEXEC: int = getattr(os, "O_CLOEXEC", 0)  # not on Windows
+
+
+class FileLock:
+    """Exclusive lock across threads and processes
+
+    A reentrant thread lock guards an flock() on the lock file, so the
+    owner thread can acquire it again. The lock file is kept on release,
+    unless the owner unlinks it. Without fcntl (e.g. on Windows) only the
+    thread lock is held.
+    """
+
+    def __init__(self, path: str):
+        self.__lock: RLock = RLock()
+        self.__path: str = path
+        self.__count: int = 0
+        self.__fd: int = -1
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def locked(self) -> bool:
+        return self.__count > 0
+
+    def acquire(self) -> None:
+        self.__lock.acquire()  # pylint: disable=R1732
+        try:
+            if self.__count == 0 and flock is not None:
+                makedirs(dirname(self.path) or ".", mode=0o700, exist_ok=True)
+                self.__fd = self.__flock()
+            self.__count += 1
+        except BaseException:
+            self.__lock.release()
+            raise
+
+    def __flock(self) -> int:
+        """Lock the lock file, again if its owner unlinked it meanwhile"""
+        while True:
+            fd: int = os_open(self.path, O_RDWR | O_CREAT | O_CLOEXEC, 0o600)  # noqa:E501
+            try:
+                flock(fd, LOCK_EX)
+                if fstat(fd).st_ino == stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            except BaseException:  # pragma: no cover
+                close(fd)
+                raise
+            close(fd)
+
+    def release(self) -> None:
+        if self.__count <= 0:
+            raise RuntimeError(f"release unlocked '{self.path}'")
+        self.__count -= 1
+        if self.__count == 0 and self.__fd >= 0:
+            flock(self.__fd, LOCK_UN)
+            close(self.__fd)
+            self.__fd = -1
+        self.__lock.release()
+
+    def unlink(self) -> None:
+        """Remove the lock file, only while holding the lock"""
+        if self.__count <= 0:
+            raise RuntimeError(f"unlink unlocked '{self.path}'")
+        try:
+            remove(self.path)
+        except FileNotFoundError:
+            pass
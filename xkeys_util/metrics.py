@@ -0,0 +1,158 @@
+# coding:utf-8
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextlib import nullcontext
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+from typing import TypeVar
+
+FT = TypeVar("FT", bound=Callable[..., Any])
+MetricLabels = Tuple[Tuple[str, str], ...]
+
+
+class MetricEvent(NamedTuple):
+    kind: str  # "counter" or "timer"
+    name: str
+    value: float  # increment, or seconds of timer
+    labels: MetricLabels
+
+
+MetricCallback = Callable[[MetricEvent], None]
+
+
+class Metrics:
+    """Registry of metric callbacks
+
+    Instrumented code checks CALLBACKS before measuring anything, so there
+    is nothing timed or allocated while no callback is registered.
+    """
+    CALLBACKS: Tuple[MetricCallback, ...] = ()  # copy on write
+    __lock: Lock = Lock()
+    __null: ContextManager[None] = nullcontext()
+
+    @classmethod
+    def register(cls, callback: MetricCallback) -> None:
+        with cls.__lock:
+            if callback not in cls.CALLBACKS:
+                cls.CALLBACKS = cls.CALLBACKS + (callback,)
+
+    @classmethod
+    def unregister(cls, callback: MetricCallback) -> None:
+        with cls.__lock:
+            cls.CALLBACKS = tuple(item for item in cls.CALLBACKS if item != callback)  # noqa:E501
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return bool(cls.CALLBACKS)
+
+    @classmethod
+    def emit(cls, kind: str, name: str, value: float, labels: Dict[str, Any]) -> None:  # noqa:E501
+        event = MetricEvent(kind, name, value, tuple(sorted((k, str(v)) for k, v in labels.items())))  # noqa:E501
+        for callback in cls.CALLBACKS:
+            callback(event)
+
+    @classmethod
+    def count(cls, name: str, value: float = 1, **labels: Any) -> None:
+        """Increase a counter"""
+        if cls.CALLBACKS:
+            cls.emit("counter", name, value, labels)
+
+    @classmethod
+    def observe(cls, name: str, seconds: float, **labels: Any) -> None:
+        """Record a latency"""
+        if cls.CALLBACKS:
+            cls.emit("timer", name, seconds, labels)
+
+    @classmethod
+    def timer(cls, name: str, **labels: Any) -> ContextManager[None]:
+        """Time the block of a with statement"""
+        return cls.__timer(name, labels) if cls.CALLBACKS else cls.__null
+
+    @classmethod
+    @contextmanager
+    def __timer(cls, name: str, labels: Dict[str, Any]) -> Iterator[None]:
+        start: float = perf_counter()
+        try:
+            yield
+        except BaseException as error:
+            cls.observe(name, perf_counter() - start, error=type(error).__name__, **labels)  # noqa:E501
+            raise
+        cls.observe(name, perf_counter() - start, **labels)
+
+    @classmethod
+    def timed(cls, name: str) -> Callable[[FT], FT]:
+        """Decorator to time every call of a function"""
+        def decorator(func: FT) -> FT:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not cls.CALLBACKS:
+                    return func(*args, **kwargs)
+                with cls.__timer(name, {}):
+                    return func(*args, **kwargs)
+            return wrapper  # type: ignore
+        return decorator
+
+
+class MetricsCollector:
+    """Aggregate counters and latency histograms in memory
+
+    Register an instance with Metrics.register(), and export snapshot()
+    to other metrics systems.
+    """
+    BUCKETS: Tuple[float, ...] = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05,
+                                  0.1, 0.5, 1.0, 5.0, 10.0)
+
+    def __init__(self):
+        self.__histograms: Dict[Tuple[str, MetricLabels], List[float]] = {}
+        self.__counters: Dict[Tuple[str, MetricLabels], float] = {}
+        self.__lock: Lock = Lock()
+
+    def __call__(self, event: MetricEvent) -> None:
+        key = (event.name, event.labels)
+        with self.__lock:
+            if event.kind == "counter":
+                self.__counters[key] = self.__counters.get(key, 0) + event.value  # noqa:E501
+                return
+
+            if (histogram := self.__histograms.get(key)) is None:
+                # count, sum, then one count per bucket and overflow
+                self.__histograms[key] = histogram = [0.0] * (len(self.BUCKETS) + 3)  # noqa:E501
+            histogram[0] += 1
+            histogram[1] += event.value
+            histogram[2 + bisect_left(self.BUCKETS, event.value)] += 1
+
+    def counter(self, name: str, **labels: Any) -> float:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self.__lock:
+            return self.__counters.get(key, 0)
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Counters and histograms with cumulative bucket counts"""
+        with self.__lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}  # noqa:E501
+                        for (name, labels), value in self.__counters.items()]
+            histograms: List[Dict[str, Any]] = []
+            for (name, labels), histogram in self.__histograms.items():
+                cumulative: List[float] = []
+                for count in histogram[2:]:
+                    cumulative.append((cumulative[-1] if cumulative else 0) + count)  # noqa:E501
+                buckets = dict(zip([*map(str, self.BUCKETS), "+Inf"], cumulative))  # noqa:E501
+                histograms.append({"name": name, "labels": dict(labels),
+                                   "count": histogram[0], "sum": histogram[1],
+                                   "buckets": buckets})
+        return {"counters": counters, "histograms": histograms}
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__histograms.clear()
+            self.__counters.clear()
@@ -0,0 +1,138 @@
+# coding:utf-8
+
+from os.path import basename
+from subprocess import DEVNULL
+from subprocess import PIPE
+from subprocess import TimeoutExpired
+from subprocess import run
+from threading import Lock
+from time import perf_counter
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from xkeys_util.metrics import Metrics
+
+
+class CommandError(RuntimeError):
+    def __init__(self, command: "Command"):
+        message: str = f"'{command.program}' exited with {command.returncode}"
+        if stderr := command.stderr.strip():
+            message += f": {stderr}"
+        super().__init__(message)
+        self.command: Command = command
+
+
+class Command:
+    """Subprocess executed directly with an argv list (no shell)
+
+    Every invocation captures stdout and stderr, is killed after timeout
+    seconds, and reports its wall time to the registered observers.
+    """
+    DEFAULT_TIMEOUT: float = 60.0
+    OBSERVERS: List[Callable[["Command"], None]] = []
+    __lock: Lock = Lock()
+
+    def __init__(self, argv: Sequence[str], returncode: int,  # noqa:E501, pylint: disable=R0913,R0917
+                 stdout: str, stderr: str, elapsed: float):
+        self.__argv: Tuple[str, ...] = tuple(argv)
+        self.__returncode: int = returncode
+        self.__elapsed: float = elapsed
+        self.__stdout: str = stdout
+        self.__stderr: str = stderr
+
+    def __str__(self) -> str:
+        return f"{self.program} exited with {self.returncode} in {self.elapsed:.3f}s"  # noqa:E501
+
+    @property
+    def argv(self) -> Tuple[str, ...]:
+        return self.__argv
+
+    @property
+    def program(self) -> str:
+        return self.argv[0]
+
+    @property
+    def returncode(self) -> int:
+        return self.__returncode
+
+    @property
+    def stdout(self) -> str:
+        return self.__stdout
+
+    @property
+    def stderr(self) -> str:
+        return self.__stderr
+
+    @property
+    def elapsed(self) -> float:
+        """Wall time in seconds"""
+        return self.__elapsed
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0
+
+    def check(self) -> "Command":
+        """Raise CommandError if the command failed"""
+        if not self.succeeded:
+            raise CommandError(self)
+        return self
+
+    @classmethod
+    def observe(cls, observer: Callable[["Command"], None]) -> None:
+        """Register a callback called after every invocation"""
+        with cls.__lock:
+            if observer not in cls.OBSERVERS:
+                cls.OBSERVERS.append(observer)
+
+    @classmethod
+    def unobserve(cls, observer: Callable[["Command"], None]) -> None:
+        with cls.__lock:
+            if observer in cls.OBSERVERS:
+                cls.OBSERVERS.remove(observer)
+
+    @classmethod
+    def notify(cls, command: "Command") -> "Command":
+        Metrics.observe("subprocess", command.elapsed, program=basename(command.program), returncode=command.returncode)  # noqa:E501
+        for observer in list(cls.OBSERVERS):
+            observer(command)
+        return command
+
+    @classmethod
+    def run(cls, *argv: str, stdin: Optional[str] = None,
+            timeout: Optional[float] = DEFAULT_TIMEOUT) -> "Command":
+        """Execute the command and wait for it to complete"""
+        start: float = perf_counter()
+        try:
+            process = run(list(argv), input=stdin, stdin=None if stdin is not None else DEVNULL,  # noqa:E501
+                          stdout=PIPE, stderr=PIPE, timeout=timeout,
+                          check=False, text=True)
+        except TimeoutExpired as error:
+            cls.notify(cls(argv, -1, "", f"timed out after {timeout}s", perf_counter() - start))  # noqa:E501
+            raise TimeoutError(f"'{argv[0]}' timed out after {timeout}s") from error  # noqa:E501
+        return cls.notify(cls(argv, process.returncode, process.stdout, process.stderr, perf_counter() - start))  # noqa:E501
+
+    @classmethod
+    async def arun(cls, *argv: str, stdin: Optional[str] = None,
+                   timeout: Optional[float] = DEFAULT_TIMEOUT) -> "Command":
+        """Execute the command without blocking the event loop"""
+        from asyncio import TimeoutError as AsyncTimeoutError  # noqa:E501, pylint: disable=C0415,W0622
+        from asyncio import create_subprocess_exec  # pylint: disable=C0415
+        from asyncio import wait_for  # pylint: disable=C0415
+
+        start: float = perf_counter()
+        process = await create_subprocess_exec(
+            *argv, stdin=PIPE if stdin is not None else DEVNULL,
+            stdout=PIPE, stderr=PIPE)
+        try:
+            stdout, stderr = await wait_for(process.communicate(stdin.encode() if stdin is not None else None), timeout)  # noqa:E501
+        except AsyncTimeoutError as error:
+            process.kill()
+            await process.wait()
+            cls.notify(cls(argv, -1, "", f"timed out after {timeout}s", perf_counter() - start))  # noqa:E501
+            raise TimeoutError(f"'{argv[0]}' timed out after {timeout}s") from error  # noqa:E501
+        return cls.notify(cls(argv, process.returncode if process.returncode is not None else -1,  # noqa:E501
+                              stdout.decode(), stderr.decode(), perf_counter() - start))  # noqa:E501
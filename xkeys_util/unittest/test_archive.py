@@ -0,0 +1,43 @@
+# coding:utf-8
+
+from os.path import join
+import tarfile
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from xkeys_util import archive
+
+
+class TestArchive(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_member(self):
+        with tarfile.open(path := join(self.temp.name, "test.tar"), "w") as thdl:  # noqa:E501
+            archive.Archive.addfile(thdl, "key", "secret\n")
+            archive.Archive.addfile(thdl, "key.pub", "public\n", 0o644)
+            (folder := tarfile.TarInfo(name="folder")).type = tarfile.DIRTYPE
+            thdl.addfile(folder)
+        with tarfile.open(path, "r") as thdl:
+            self.assertEqual(thdl.getmember("key").mode, 0o400)
+            self.assertEqual(thdl.getmember("key.pub").mode, 0o644)
+            self.assertEqual(archive.Archive.readfile(thdl, "key"), "secret\n")  # noqa:E501
+            self.assertRaises(KeyError, archive.Archive.readfile, thdl, "none")  # noqa:E501
+            self.assertRaises(ValueError, archive.Archive.readfile, thdl, "folder")  # noqa:E501
+
+
+if __name__ == "__main__":
+    main()
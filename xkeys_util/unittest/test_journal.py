@@ -0,0 +1,59 @@
+# coding:utf-8
+
+from os.path import isfile
+from os.path import join
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+
+from xkeys_util import journal
+from xkeys_util import lock
+
+
+class TestJournalIndex(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_reconcile(self):
+        item = journal.JournalIndex(self.temp.name, ".test", lock.FileLock(join(self.temp.name, ".test.lock")))  # noqa:E501
+        self.assertFalse(item.reconcile(["a"], str.upper))  # not loaded
+        item.load(["a", "b"], str.upper)
+        self.assertEqual(sorted(item), ["a", "b"])
+        self.assertEqual(item.value("b"), "B")
+        self.assertTrue(isfile(item.path))
+        self.assertFalse(item.reconcile(["a", "b"], str.upper))
+        self.assertTrue(item.reconcile(["b", "c"], str.upper))
+        self.assertEqual(sorted(item), ["b", "c"])
+
+        other = journal.JournalIndex(self.temp.name, ".test")
+        other.load(["b", "c"], str.lower)
+        self.assertEqual(other.value("c"), "C")  # indexed by the journal
+        other.put("d", "D")
+        other.delete("b")
+        self.assertFalse(item.reconcile(["c", "d"], str.lower))  # by sync()
+        self.assertEqual(sorted(item), ["c", "d"])
+
+    def test_without_base(self):
+        item = journal.JournalIndex(join(self.temp.name, "none"), ".test")
+        item.load(["a"], str.upper)
+        self.assertEqual(len(item), 0)
+        self.assertFalse(item.reconcile(["a"], str.upper))
+        item.put("a", "A")
+        self.assertIn("a", item)
+        self.assertFalse(isfile(item.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# coding:utf-8
+
+from os import remove
+from os.path import isfile
+from os.path import join
+import sys
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest import main
+from unittest import mock
+
+from xkeys_util import lock
+from xkeys_util import runner
+
+FLOCK = lock.flock
+PROBE = "import fcntl, os, sys; fcntl.flock(os.open(sys.argv[1], os.O_RDWR), fcntl.LOCK_EX | fcntl.LOCK_NB)"  # noqa:E501
+
+
+class TestFileLock(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.temp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def probe(self, path: str) -> bool:
+        """Whether another process can take the lock"""
+        return runner.Command.run(sys.executable, "-c", PROBE, path).succeeded
+
+    def test_lock(self):
+        item = lock.FileLock(path := join(self.temp.name, "locks", "test.lock"))  # noqa:E501
+        self.assertEqual(item.path, path)
+        self.assertFalse(item.locked)
+        with item:
+            self.assertTrue(item.locked)
+            self.assertFalse(self.probe(path))
+            with item:  # reentrant
+                self.assertTrue(item.locked)
+            self.assertTrue(item.locked)
+            self.assertFalse(self.probe(path))
+        self.assertFalse(item.locked)
+        self.assertTrue(self.probe(path))
+        self.assertRaises(RuntimeError, item.release)
+
+    def test_unlink(self):
+        item = lock.FileLock(path := join(self.temp.name, "test.lock"))
+        self.assertRaises(RuntimeError, item.unlink)
+        calls = []
+
+        def flock(fd, operation):
+            FLOCK(fd, operation)
+            if not calls:  # unlinked by its owner meanwhile
+                calls.append(remove(path))
+
+        with mock.patch.object(lock, "flock", side_effect=flock):
+            with item:
+                self.assertTrue(isfile(path))
+        self.assertEqual(len(calls), 1)
+        with item:
+            item.unlink()
+            item.unlink()
+            self.assertFalse(isfile(path))
+        self.assertFalse(item.locked)
+
+    def test_fallback(self):
+        item = lock.FileLock(path := join(self.temp.name, "test.lock"))
+        with mock.patch.object(lock, "flock", None):
+            with item:
+                self.assertTrue(item.locked)
+            self.assertFalse(item.locked)
+        self.assertFalse(isfile(path))
+
+    def test_error(self):
+        with open(path := join(self.temp.name, "file"), "w", encoding="utf-8"):  # noqa:E501
+            pass
+        item = lock.FileLock(join(path, "test.lock"))
+        self.assertRaises(OSError, item.acquire)
+        self.assertFalse(item.locked)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# coding:utf-8
+
+from unittest import TestCase
+from unittest import main
+
+from xkeys_util import metrics
+from xkeys_util import runner
+
+
+class TestMetrics(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.collector = metrics.MetricsCollector()
+        self.events = []
+        metrics.Metrics.register(self.collector)
+        metrics.Metrics.register(self.collector)
+        metrics.Metrics.register(self.events.append)
+
+    def tearDown(self):
+        metrics.Metrics.unregister(self.collector)
+        metrics.Metrics.unregister(self.events.append)
+
+    def test_disabled(self):
+        metrics.Metrics.unregister(self.collector)
+        metrics.Metrics.unregister(self.events.append)
+        self.assertFalse(metrics.Metrics.enabled())
+        metrics.Metrics.count("test")
+        metrics.Metrics.observe("test", 1.0)
+        with metrics.Metrics.timer("test"):
+            pass
+        self.assertEqual(metrics.Metrics.timed("test")(lambda: 1)(), 1)
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.collector.snapshot(), {"counters": [], "histograms": []})  # noqa:E501
+
+    def test_counter(self):
+        self.assertTrue(metrics.Metrics.enabled())
+        metrics.Metrics.count("test", result="hit")
+        metrics.Metrics.count("test", 2, result="hit")
+        metrics.Metrics.count("test", result="miss")
+        self.assertEqual(self.collector.counter("test", result="hit"), 3)
+        self.assertEqual(self.collector.counter("test", result="miss"), 1)
+        self.assertEqual(self.collector.counter("test"), 0)
+        self.assertEqual(self.events[0], metrics.MetricEvent("counter", "test", 1, (("result", "hit"),)))  # noqa:E501
+        self.collector.reset()
+        self.assertEqual(self.collector.counter("test", result="hit"), 0)
+
+    def test_timer(self):
+        metrics.Metrics.observe("test", 0.002, kind="a")
+        metrics.Metrics.observe("test", 20.0, kind="a")
+        with metrics.Metrics.timer("block"):
+            pass
+        with self.assertRaises(KeyError):
+            with metrics.Metrics.timer("block"):
+                raise KeyError("test")
+        self.assertEqual(metrics.Metrics.timed("func")(lambda value: value)(1), 1)  # noqa:E501
+        histograms = {(item["name"], tuple(item["labels"].items())): item
+                      for item in self.collector.snapshot()["histograms"]}
+        self.assertEqual(set(histograms), {("test", (("kind", "a"),)), ("block", ()),  # noqa:E501
+                                           ("block", (("error", "KeyError"),)), ("func", ())})  # noqa:E501
+        test = histograms[("test", (("kind", "a"),))]
+        self.assertEqual(test["count"], 2)
+        self.assertAlmostEqual(test["sum"], 20.002)
+        self.assertEqual(test["buckets"]["0.001"], 0)
+        self.assertEqual(test["buckets"]["0.005"], 1)
+        self.assertEqual(test["buckets"]["10.0"], 1)
+        self.assertEqual(test["buckets"]["+Inf"], 2)
+
+    def test_subprocess(self):
+        runner.Command.run("true")
+        self.assertEqual([(event.kind, event.name, event.labels) for event in self.events],  # noqa:E501
+                         [("timer", "subprocess", (("program", "true"), ("returncode", "0")))])  # noqa:E501
+
+
+if __name__ == "__main__":
+    main()
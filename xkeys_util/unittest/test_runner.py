@@ -0,0 +1,61 @@
+# coding:utf-8
+
+from asyncio import run
+from unittest import TestCase
+from unittest import main
+
+from xkeys_util import runner
+
+
+class TestCommand(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
+    def setUp(self):
+        self.commands = []
+        runner.Command.observe(self.commands.append)
+        runner.Command.observe(self.commands.append)
+
+    def tearDown(self):
+        runner.Command.unobserve(self.commands.append)
+        runner.Command.unobserve(self.commands.append)
+
+    def test_run(self):
+        command = runner.Command.run("echo", "a b", "c")
+        self.assertIs(command.check(), command)
+        self.assertEqual(command.argv, ("echo", "a b", "c"))
+        self.assertEqual(command.stdout, "a b c\n")
+        self.assertTrue(command.succeeded)
+        self.assertGreaterEqual(command.elapsed, 0)
+        self.assertIn("echo exited with 0", str(command))
+        self.assertEqual(self.commands, [command])
+
+    def test_stdin(self):
+        self.assertEqual(runner.Command.run("cat", stdin="unittest").stdout, "unittest")  # noqa:E501
+        self.assertEqual(run(runner.Command.arun("cat", stdin="unittest")).stdout, "unittest")  # noqa:E501
+
+    def test_error(self):
+        command = runner.Command.run("sh", "-c", "echo failed >&2; exit 3")
+        self.assertEqual(command.returncode, 3)
+        self.assertRaisesRegex(runner.CommandError, "'sh' exited with 3: failed", command.check)  # noqa:E501
+        self.assertRaisesRegex(runner.CommandError, "'false' exited with 1$", runner.Command.run("false").check)  # noqa:E501
+
+    def test_timeout(self):
+        self.assertRaises(TimeoutError, runner.Command.run, "sleep", "5", timeout=0.1)  # noqa:E501
+        self.assertRaises(TimeoutError, run, runner.Command.arun("sleep", "5", timeout=0.1))  # noqa:E501
+        self.assertEqual([command.returncode for command in self.commands], [-1, -1])  # noqa:E501
+
+    def test_arun(self):
+        command = run(runner.Command.arun("echo", "unittest"))
+        self.assertEqual(command.stdout, "unittest\n")
+        self.assertEqual(self.commands, [command])
+
+
+if __name__ == "__main__":
+    main()